@@ -0,0 +1,261 @@
+"""Admission control for the routes that wait on OpenAI and ElevenLabs.
+
+Each route group has a concurrency limit and a bounded FIFO wait queue.
+A request that finds the group full joins the queue, unless the queue is
+full or its predicted wait (position / limit * recent service time)
+exceeds the request deadline; then it is answered 503 with Retry-After
+straight away rather than timing out later with everyone else.
+
+Limits adapt to the measured latency of the admitted requests that made
+an upstream call (answers from a cache, validation errors and async
+enqueues say nothing about upstream load and are left out). That latency
+is dominated by the upstream call: when recent latency rises above the
+long-run baseline the limit shrinks in proportion, and it grows back
+(by about sqrt(limit) per completion) while latency stays at the
+baseline. Limits, queues and counts are per process.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .config import get_settings
+from .deadline import remaining
+from .metrics import (
+    ADMISSION_IN_FLIGHT, ADMISSION_LIMIT, ADMISSION_QUEUED, ADMISSION_SHED, ADMISSION_WAITING, tally_upstream
+)
+
+# (group, path prefix); only POSTs are limited, GETs like /api/practice/languages never call upstream
+ROUTE_GROUPS: List[Tuple[str, str]] = [
+    ("practice", "/api/practice/"),
+    ("scenario_generate", "/api/scenario/generate")
+]
+
+
+class AdaptiveLimiter:
+    """Concurrency limit with a bounded wait queue for one route group."""
+
+    # Smoothing of the recent and baseline latency averages
+    RECENT_WEIGHT = 0.2
+    BASELINE_WEIGHT = 0.02
+    # How far one completion can move the limit towards its new target
+    LIMIT_SMOOTHING = 0.2
+
+    def __init__(self, group: str, initial_limit: int, min_limit: int, max_limit: int, max_queue: int):
+        self.group = group
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self.recent_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self.admitted = 0
+        self.queued = 0
+        self.shed: Dict[str, int] = {}
+        self._waiters: Deque[asyncio.Future] = deque()
+        ADMISSION_LIMIT.labels(group).set(self.limit)
+
+    def predicted_wait(self, position: int) -> float:
+        """Seconds until the request at this queue position (1-based) gets a slot."""
+        if self.recent_latency is None:
+            return 0.0
+        return position / max(self.limit, 1.0) * self.recent_latency
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _admit(self) -> None:
+        self.in_flight += 1
+        self.admitted += 1
+        ADMISSION_IN_FLIGHT.labels(self.group).set(self.in_flight)
+
+    def _shed(self, reason: str) -> None:
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        ADMISSION_SHED.labels(self.group, reason).inc()
+
+    async def acquire(self, deadline: float) -> Optional[float]:
+        """
+        Take a slot, waiting at most `deadline` seconds. Returns None once
+        admitted, or the suggested Retry-After in seconds if the request is shed.
+        """
+        if self._has_capacity() and not self._waiters:
+            self._admit()
+            return None
+
+        position = len(self._waiters) + 1
+        predicted = self.predicted_wait(position)
+        if len(self._waiters) >= self.max_queue:
+            self._shed("queue_full")
+            return predicted
+        if predicted > deadline:
+            self._shed("deadline")
+            return predicted
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        ADMISSION_QUEUED.labels(self.group).inc()
+        ADMISSION_WAITING.labels(self.group).set(len(self._waiters))
+        try:
+            # Shielded so a timeout leaves the future alone and we can see whether a slot came anyway
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=deadline)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._drop(waiter)
+                self._shed("timeout")
+                return self.predicted_wait(len(self._waiters) + 1)
+        except asyncio.CancelledError:
+            if waiter.done():
+                # Handed a slot just as the request went away
+                self.release()
+            else:
+                self._drop(waiter)
+            raise
+        return None
+
+    def _drop(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        self._waiters.remove(waiter)
+        ADMISSION_WAITING.labels(self.group).set(len(self._waiters))
+
+    def release(self) -> None:
+        """Free a slot and hand it to the oldest waiter, if any."""
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.labels(self.group).set(self.in_flight)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            self._admit()
+            waiter.set_result(None)
+        ADMISSION_WAITING.labels(self.group).set(len(self._waiters))
+
+    def record(self, latency: float) -> None:
+        """Fold one admitted request's latency into the averages and adjust the limit."""
+        if self.recent_latency is None:
+            self.recent_latency = self.baseline_latency = latency
+            return
+        self.recent_latency += self.RECENT_WEIGHT * (latency - self.recent_latency)
+        self.baseline_latency += self.BASELINE_WEIGHT * (latency - self.baseline_latency)
+
+        # Below 1 while recent requests are slower than usual; never cut more than half at once
+        gradient = min(max(self.baseline_latency / self.recent_latency, 0.5), 1.0)
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit + self.LIMIT_SMOOTHING * (target - self.limit)
+        self.limit = min(max(limit, float(self.min_limit)), float(self.max_limit))
+        ADMISSION_LIMIT.labels(self.group).set(self.limit)
+        self._wake()
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 1),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": dict(self.shed),
+            "recent_latency_ms": round(self.recent_latency * 1000) if self.recent_latency is not None else None,
+            "baseline_latency_ms": round(self.baseline_latency * 1000) if self.baseline_latency is not None else None
+        }
+
+
+class AdmissionController:
+    """The limiters for all route groups, and the request deadline."""
+
+    def __init__(self, deadline: float, limiters: Dict[str, AdaptiveLimiter]):
+        self.deadline = deadline
+        self.limiters = limiters
+
+    def limiter_for(self, method: str, path: str) -> Optional[AdaptiveLimiter]:
+        if method != "POST":
+            return None
+        for group, prefix in ROUTE_GROUPS:
+            if path.startswith(prefix):
+                return self.limiters[group]
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "deadline_seconds": self.deadline,
+            "groups": {group: limiter.stats() for group, limiter in self.limiters.items()}
+        }
+
+
+@lru_cache(maxsize=None)
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide controller, creating it on first use."""
+    settings = get_settings()
+    limiters = {
+        group: AdaptiveLimiter(
+            group,
+            initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+            min_limit=settings.ADMISSION_MIN_LIMIT,
+            max_limit=settings.ADMISSION_MAX_LIMIT,
+            max_queue=settings.ADMISSION_MAX_QUEUE
+        )
+        for group, _ in ROUTE_GROUPS
+    }
+    return AdmissionController(settings.ADMISSION_DEADLINE_SECONDS, limiters)
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the route group limits; other requests pass straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_settings().ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        controller = get_admission_controller()
+        limiter = controller.limiter_for(scope["method"], scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Never queue past the request's own deadline
+        left = remaining()
+        retry_after = await limiter.acquire(controller.deadline if left is None else min(controller.deadline, left))
+        if retry_after is not None:
+            await _send_overloaded(send, retry_after)
+            return
+
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            with tally_upstream() as tally:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            # Only requests that waited on an upstream call say anything about upstream latency;
+            # validation errors, config errors, async enqueues (202) and cancelled requests don't
+            if tally.calls and status is not None and status != 202 and not 400 <= status < 500:
+                limiter.record(time.perf_counter() - start)
+            limiter.release()
+
+
+async def _send_overloaded(send, retry_after: float) -> None:
+    body = json.dumps({"detail": "The service is busy. Please try again shortly."}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(max(math.ceil(retry_after), 1)).encode("latin-1"))
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
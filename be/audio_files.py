@@ -0,0 +1,201 @@
+"""Cache-friendly serving of generated audio files."""
+import asyncio
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+from .config import get_settings
+from .metrics import AUDIO_BYTES_SERVED
+from .services.audio_lifecycle_service import get_audio_manager
+
+# Files named after a content hash never change, so they can be cached forever
+CONTENT_HASH_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "no-cache"
+CHUNK_SIZE = 256 * 1024
+
+mimetypes.add_type("audio/mpeg", ".mp3")
+mimetypes.add_type("audio/webm", ".webm")
+mimetypes.add_type("audio/ogg", ".opus")  # Ogg Opus from ElevenLabs opus_* output formats
+
+
+def _parse_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored (malformed or multiple
+    ranges, served as a full response) and raises ValueError when the range
+    cannot be satisfied.
+    """
+    units, _, ranges = range_header.partition("=")
+    if units.strip().lower() != "bytes" or "," in ranges:
+        return None
+    start_text, sep, end_text = ranges.strip().partition("-")
+    if not sep or not (start_text.isdigit() or start_text == ""):
+        return None
+    if not end_text.isdigit() and not (start_text and end_text == ""):
+        return None
+
+    if not start_text:
+        # Suffix range: the last N bytes
+        suffix = int(end_text)
+        if suffix == 0 or file_size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(file_size - suffix, 0), file_size - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else file_size - 1
+    if start >= file_size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, file_size - 1)
+
+
+class AudioFiles:
+    """
+    ASGI app serving the audio directory with long-lived caching.
+
+    Content-hash filenames are sent as immutable with a strong ETag, so
+    replays cost at most a 304. Byte ranges are supported for seeking, and
+    when the server offers the ASGI zero-copy or pathsend extensions the
+    file is handed to it instead of being read through Python.
+
+    Every file is pinned with the audio lifecycle manager for the duration
+    of the response.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        # Resolved from settings on first request when not given
+        self._directory = Path(directory) if directory is not None else None
+
+    @property
+    def directory(self) -> Path:
+        if self._directory is None:
+            self._directory = get_settings().AUDIO_DIR
+        return self._directory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send_empty(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+
+        name = scope["path"].rsplit("/", 1)[-1]
+        if not name or name.startswith(".") or "\\" in name:
+            await self._send_empty(send, 404)
+            return
+
+        path = self.directory / name
+        audio_manager = get_audio_manager()
+        with audio_manager.pin(name):
+            try:
+                stat = await asyncio.to_thread(os.stat, path)
+            except (FileNotFoundError, NotADirectoryError):
+                await self._send_empty(send, 404)
+                return
+            audio_manager.touch(name)
+            await self._serve(scope, send, path, stat)
+
+    async def _serve(self, scope: Scope, send: Send, path: Path, stat: os.stat_result) -> None:
+        request_headers = Headers(scope=scope)
+        file_size = stat.st_size
+        etag = f'"{path.stem[:16]}-{file_size:x}-{stat.st_mtime_ns:x}"'
+        cache_control = (
+            IMMUTABLE_CACHE_CONTROL if CONTENT_HASH_NAME.match(path.name) else MUTABLE_CACHE_CONTROL
+        )
+        headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", cache_control.encode()),
+            (b"last-modified", formatdate(stat.st_mtime, usegmt=True).encode()),
+            (b"accept-ranges", b"bytes"),
+        ]
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and self._etag_matches(if_none_match, etag):
+            await self._send_empty(send, 304, headers)
+            return
+
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        headers.append((b"content-type", content_type.encode()))
+
+        status = 200
+        start, end = 0, file_size - 1
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (not if_range or if_range == etag):
+            try:
+                byte_range = _parse_range(range_header, file_size)
+            except ValueError:
+                await self._send_empty(
+                    send, 416, headers + [(b"content-range", f"bytes */{file_size}".encode())]
+                )
+                return
+            if byte_range is not None:
+                status = 206
+                start, end = byte_range
+                headers.append((b"content-range", f"bytes {start}-{end}/{file_size}".encode()))
+
+        length = end - start + 1 if file_size else 0
+        headers.append((b"content-length", str(length).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+
+        if scope["method"] == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        AUDIO_BYTES_SERVED.labels("static", path.suffix.lstrip(".")).inc(length)
+        extensions = scope.get("extensions") or {}
+        if status == 200 and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(path)})
+            return
+
+        with open(path, "rb") as f:
+            if "http.response.zerocopy" in extensions:
+                # The server transfers the bytes with sendfile()
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f,
+                    "offset": start,
+                    "count": length,
+                    "more_body": False
+                })
+                return
+
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0
+                })
+            if remaining > 0:
+                # File shrank underneath us; close the response cleanly
+                await send({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    def _etag_matches(if_none_match: str, etag: str) -> bool:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison is allowed for If-None-Match
+        return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+    @staticmethod
+    async def _send_empty(send: Send, status: int, headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": (headers or []) + [(b"content-length", b"0")]
+        })
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1 @@
+"""Benchmarks for the backend, runnable with `python -m be.benchmarks.<name>`."""
@@ -0,0 +1,88 @@
+"""Helpers shared by the benchmarks: child servers, scratch environments, percentiles."""
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def bench_env(scratch_dir: str, overrides: Optional[Dict[str, str]] = None) -> dict:
+    """Environment for child processes; generated files go to a scratch directory."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(PROJECT_ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    env["STORAGE_DIR"] = os.path.join(scratch_dir, "storage")
+    env["AUDIO_DIR"] = os.path.join(scratch_dir, "audio")
+    # Warm-up calls the upstream APIs; it runs in the background but would add noise
+    env.setdefault("TTS_WARMUP_ENABLED", "false")
+    env.update(overrides or {})
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app: str, port: int, env: dict, workers: int = 1) -> subprocess.Popen:
+    """
+    Spawn `uvicorn <app>` on 127.0.0.1:<port>. stderr goes to a temp file
+    rather than a pipe so a chatty server can never block on a full pipe.
+    """
+    command = [
+        sys.executable, "-m", "uvicorn", app,
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+    ]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    error_log = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        command,
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=error_log
+    )
+    process.error_log = error_log
+    return process
+
+
+def wait_until_ready(process: subprocess.Popen, url: str, timeout: float) -> float:
+    """Poll url until it answers 200; return the seconds waited."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            process.error_log.seek(0)
+            error = process.error_log.read().decode("utf-8", "replace")
+            raise RuntimeError(f"Server exited early: {error[-500:]}")
+        try:
+            with urllib.request.urlopen(url, timeout=1.0) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"No response from {url} within {timeout}s")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+    process.error_log.close()
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(math.ceil(fraction * len(sorted_samples)) - 1, 0)
+    return sorted_samples[rank]
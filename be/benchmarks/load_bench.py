@@ -0,0 +1,208 @@
+"""
+Load-test benchmark against a local mock of OpenAI and ElevenLabs.
+
+Starts be.benchmarks.mock_upstream and the app (with OPENAI_BASE_URL and
+ELEVENLABS_BASE_URL pointed at the mock and scratch storage), then drives
+each endpoint at each concurrency level and prints a JSON report with
+p50/p95/p99 latency, requests per second and error counts.
+
+Run from the project root:
+
+    python -m be.benchmarks.load_bench --concurrency 1,8,32 --requests 200 \\
+        --mock-latency "openai_chat=lognormal:0.8:0.4" --mock-error-rate "openai_chat=0.01" \\
+        --output report.json
+
+Use --app-url to benchmark an app that is already running (it must be
+configured against the mock, or real providers will be called).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from .harness import bench_env, free_port, percentile, start_server, stop_server, wait_until_ready
+
+TOPICS = [
+    "ordering coffee", "job interview", "travel directions", "checking into a hotel",
+    "buying train tickets", "visiting the doctor", "shopping for clothes", "making a reservation"
+]
+PRACTICE_TEXTS = [
+    "Yesterday I go to the market and buy many apple.",
+    "I want go store for buy some bread.",
+    "She don't like coffee but she drink tea every morning.",
+    "We was very happy when the train arrive on time."
+]
+# Stand-in for a few seconds of browser-recorded audio
+VOICE_UPLOAD = bytes(48 * 1024)
+
+Call = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+def _practice_body() -> dict:
+    return {"text": random.choice(PRACTICE_TEXTS), "topic": "General", "practice_language": "en", "native_language": "en"}
+
+
+ENDPOINTS: Dict[str, Call] = {
+    "practice_chat": lambda client: client.post("/api/practice/chat", json=_practice_body()),
+    "practice_submit": lambda client: client.post("/api/practice/submit", json=_practice_body()),
+    "practice_voice": lambda client: client.post(
+        "/api/practice/voice",
+        files={"file": ("recording.webm", VOICE_UPLOAD, "audio/webm")},
+        data={"topic": "General", "practice_language": "en", "native_language": "en"}
+    ),
+    "scenario_generate": lambda client: client.post(
+        "/api/scenario/generate",
+        json={"user_input": random.choice(TOPICS), "practice_language": "en", "native_language": "en"}
+    ),
+    "notes_list": lambda client: client.get("/api/notes/")
+}
+
+
+async def run_level(base_url: str, name: str, concurrency: int, total: int, timeout: float) -> dict:
+    """Send `total` requests to one endpoint from `concurrency` workers."""
+    call = ENDPOINTS[name]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    remaining = total
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await call(client)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "endpoint": name,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "status_counts": statuses,
+        "duration_seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1)
+        }
+    }
+
+
+async def run_benchmark(base_url: str, endpoints: List[str], levels: List[int], args) -> List[dict]:
+    results = []
+    for name in endpoints:
+        if args.warmup:
+            await run_level(base_url, name, 1, args.warmup, args.timeout)
+        for concurrency in levels:
+            result = await run_level(base_url, name, concurrency, args.requests, args.timeout)
+            results.append(result)
+            print(
+                f"{name:<18} c={concurrency:<4} rps={result['requests_per_second']:<8} "
+                f"p50={result['latency_ms']['p50']}ms p99={result['latency_ms']['p99']}ms errors={result['errors']}",
+                file=sys.stderr
+            )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint and level")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests per endpoint first")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated subset of: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--mock-latency", default="", help="Latency specs, e.g. openai_chat=lognormal:0.8:0.4")
+    parser.add_argument("--mock-error-rate", default="", help="Error rates, e.g. openai_chat=0.01,whisper=0.05")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    parser.add_argument("--app-url", help="Benchmark an already running app instead of starting one")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    processes = []
+    with tempfile.TemporaryDirectory(prefix="load-bench-") as scratch_dir:
+        try:
+            base_url = args.app_url
+            if base_url is None:
+                mock_port = free_port()
+                mock_env = bench_env(scratch_dir, {
+                    "MOCK_LATENCY": args.mock_latency,
+                    "MOCK_ERROR_RATE": args.mock_error_rate,
+                    "MOCK_SEED": str(args.seed)
+                })
+                processes.append(start_server("be.benchmarks.mock_upstream:app", mock_port, mock_env))
+                wait_until_ready(processes[-1], f"http://127.0.0.1:{mock_port}/", 30.0)
+
+                mock_url = f"http://127.0.0.1:{mock_port}/v1"
+                app_port = free_port()
+                app_env = bench_env(scratch_dir, {
+                    "OPENAI_BASE_URL": mock_url,
+                    "ELEVENLABS_BASE_URL": mock_url,
+                    "OPENAI_API_KEY": "bench",
+                    "ELEVENLABS_API_KEY": "bench",
+                    "ELEVENLABS_VOICE_ID": "bench-voice",
+                    "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING")
+                })
+                processes.append(start_server("be.main:app", app_port, app_env, workers=args.workers))
+                base_url = f"http://127.0.0.1:{app_port}"
+                wait_until_ready(processes[-1], base_url + "/", 30.0)
+
+            results = asyncio.run(run_benchmark(base_url, endpoints, levels, args))
+        finally:
+            for process in processes:
+                stop_server(process)
+
+    report = {
+        "config": {
+            "concurrency": levels,
+            "requests": args.requests,
+            "workers": args.workers,
+            "mock_latency": args.mock_latency or "defaults",
+            "mock_error_rate": args.mock_error_rate or "none",
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "started_app": args.app_url is None
+        },
+        "results": results
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
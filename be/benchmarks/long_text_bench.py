@@ -0,0 +1,163 @@
+"""
+Long-text benchmark: chunked, concurrent analysis against the single-call path.
+
+Starts be.benchmarks.mock_upstream with output-proportional latency
+(MOCK_OUTPUT_TOKENS_PER_SECOND), then calls analyze_text in process on
+synthetic essays of increasing length in two modes:
+
+- single: the whole text in one call (long-text mode switched off)
+- chunked: long-text mode forced on for every size
+
+The sentence cache is emptied before every call, so each run sends the
+full text. The mock cuts answers off at max_tokens like the real API;
+those runs show up as failures of the single-call path.
+
+Run from the project root:
+
+    python -m be.benchmarks.long_text_bench --sentences 10,40,120 --runs 3 \\
+        --base-latency 0.5 --output-rate 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+from .harness import bench_env, free_port, start_server, stop_server, wait_until_ready
+
+SENTENCES = [
+    "On day {n} I want go to the store for buy some bread.",
+    "My friend {n} don't like the rain but she walk to school every morning.",
+    "We was very happy when the train number {n} arrive on time.",
+    "Yesterday I go to the market {n} and buy many apple.",
+    "In the evening {n} I am reading a book about the history of my city."
+]
+PARAGRAPH_SENTENCES = 5
+
+
+def make_essay(count: int) -> str:
+    """Unique sentences (so none are deduplicated), in paragraphs of five."""
+    sentences = [SENTENCES[n % len(SENTENCES)].format(n=n) for n in range(count)]
+    paragraphs = [
+        " ".join(sentences[start:start + PARAGRAPH_SENTENCES])
+        for start in range(0, count, PARAGRAPH_SENTENCES)
+    ]
+    return "\n\n".join(paragraphs)
+
+
+def _reset_cache() -> None:
+    from be import cache
+    cache._caches.clear()
+    cache.get_cache_backend.cache_clear()
+
+
+async def run_mode(text: str, long_text_chars: int, runs: int) -> dict:
+    from be.config import get_settings
+    from be.services.analyze_service import analyze_text
+
+    get_settings().ANALYSIS_LONG_TEXT_CHARS = long_text_chars
+    latencies: List[float] = []
+    failures = 0
+    reuse = {}
+    for _ in range(runs):
+        _reset_cache()
+        start = time.perf_counter()
+        try:
+            result = await analyze_text(text, practice_language="en", native_language="zh")
+            reuse = result["reuse"]
+        except Exception:
+            failures += 1
+            continue
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return {
+        "median_ms": round(statistics.median(latencies) * 1000, 1),
+        "failures": failures,
+        "chunks": reuse.get("chunks"),
+        "tokens_used": reuse.get("tokens_used")
+    }
+
+
+async def run_benchmark(sizes: List[int], runs: int) -> List[dict]:
+    results = []
+    for count in sizes:
+        text = make_essay(count)
+        single = await run_mode(text, sys.maxsize, runs)
+        chunked = await run_mode(text, 0, runs)
+        results.append({
+            "sentences": count,
+            "chars": len(text),
+            "single": single,
+            "chunked": chunked,
+            "speedup": round(single["median_ms"] / chunked["median_ms"], 2) if chunked["median_ms"] else None
+        })
+        print(
+            f"sentences={count:<5} single={single['median_ms']}ms (failures={single['failures']}) "
+            f"chunked={chunked['median_ms']}ms (chunks={chunked['chunks']}, failures={chunked['failures']})",
+            file=sys.stderr
+        )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", default="10,40,120", help="Comma-separated essay lengths in sentences")
+    parser.add_argument("--runs", type=int, default=3, help="Calls per essay and mode (median is reported)")
+    parser.add_argument("--base-latency", type=float, default=0.5, help="Mock time to first token in seconds")
+    parser.add_argument("--output-rate", type=float, default=60.0, help="Mock output tokens per second")
+    parser.add_argument("--chunk-tokens", type=int, help="Override ANALYSIS_CHUNK_TOKENS")
+    parser.add_argument("--concurrency", type=int, help="Override ANALYSIS_CHUNK_CONCURRENCY")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sentences.split(",")]
+
+    with tempfile.TemporaryDirectory(prefix="long-text-bench-") as scratch_dir:
+        mock_port = free_port()
+        mock = start_server("be.benchmarks.mock_upstream:app", mock_port, bench_env(scratch_dir, {
+            "MOCK_LATENCY": f"openai_chat=fixed:{args.base_latency}",
+            "MOCK_OUTPUT_TOKENS_PER_SECOND": str(args.output_rate)
+        }))
+        try:
+            wait_until_ready(mock, f"http://127.0.0.1:{mock_port}/", 30.0)
+            overrides = {
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{mock_port}/v1",
+                "OPENAI_API_KEY": "bench",
+                "CACHE_BACKEND": "memory",
+                "LOG_LEVEL": os.getenv("LOG_LEVEL", "ERROR")
+            }
+            if args.chunk_tokens:
+                overrides["ANALYSIS_CHUNK_TOKENS"] = str(args.chunk_tokens)
+            if args.concurrency:
+                overrides["ANALYSIS_CHUNK_CONCURRENCY"] = str(args.concurrency)
+            # Settings are read on first use, which happens after this
+            os.environ.update(bench_env(scratch_dir, overrides))
+            results = asyncio.run(run_benchmark(sizes, args.runs))
+        finally:
+            stop_server(mock)
+
+    from be.config import get_settings
+    settings = get_settings()
+    report = {
+        "config": {
+            "runs": args.runs,
+            "base_latency_seconds": args.base_latency,
+            "output_tokens_per_second": args.output_rate,
+            "chunk_tokens": settings.ANALYSIS_CHUNK_TOKENS,
+            "chunk_concurrency": settings.ANALYSIS_CHUNK_CONCURRENCY
+        },
+        "results": results
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Local mock of the OpenAI and ElevenLabs endpoints used by the backend.
+
+Serves the same paths under /v1 so OPENAI_BASE_URL and ELEVENLABS_BASE_URL
+can point at it:
+
+    POST /v1/chat/completions                 (openai_chat, plain and streamed)
+    POST /v1/audio/transcriptions             (whisper)
+    POST /v1/speech-to-text                   (elevenlabs_stt)
+    POST /v1/text-to-speech/{voice}[/stream]  (elevenlabs_tts)
+
+Latency and error rates are configured per upstream through the
+environment, so the server can be started with plain uvicorn:
+
+    MOCK_LATENCY="openai_chat=lognormal:0.8:0.4,elevenlabs_tts=fixed:0.3" \\
+    MOCK_ERROR_RATE="openai_chat=0.02" \\
+    uvicorn be.benchmarks.mock_upstream:app --port 9000
+
+Latency specs are fixed:<seconds>, uniform:<low>:<high> or
+lognormal:<median>:<sigma>. Streamed responses spend a third of the
+sampled latency before the first chunk and spread the rest over the body.
+
+MOCK_OUTPUT_TOKENS_PER_SECOND (e.g. 60) adds generation time to
+non-streamed chat answers in proportion to their length, as a real model
+takes. Chat answers longer than the request's max_tokens are cut off
+(finish_reason "length"), like the real API.
+
+Text-to-speech bodies are one second of audio at the bitrate named by the
+output_format query parameter (default mp3_44100_128), so lower-bitrate
+formats return proportionally fewer bytes.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import re
+from typing import Callable, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+UPSTREAMS = ("openai_chat", "whisper", "elevenlabs_stt", "elevenlabs_tts")
+
+DEFAULT_LATENCY = {
+    "openai_chat": "lognormal:0.8:0.4",
+    "whisper": "lognormal:0.6:0.3",
+    "elevenlabs_stt": "lognormal:0.5:0.3",
+    "elevenlabs_tts": "lognormal:0.4:0.3"
+}
+
+TRANSCRIPT = "Hello, I want go to the store for buy some bread."
+# analyze_service sends the sentences to review as a JSON array after this line
+SENTENCES_PATTERN = re.compile(r"given as a JSON array:\n(\[.*?\])\n", re.DOTALL)
+ANALYSIS = {
+    "improved_text": "Hello, I want to go to the store to buy some bread.",
+    "errors": [
+        {"original": "want go", "corrected": "want to go", "explanation": "Use 'to' before the verb."},
+        {"original": "for buy", "corrected": "to buy", "explanation": "Use 'to' to express purpose."}
+    ],
+    "difficult_words": [
+        {"word": "bread", "definition": "A baked food made from flour.", "example": "I buy bread every day."}
+    ]
+}
+SCENARIO_REPLY = (
+    "SCENARIO: You are at a small cafe downtown. The barista smiles and asks what you would like today.\n"
+    "TASK: Order a drink and a snack, and ask how much it costs."
+)
+TUTOR_REPLY = "That sounds great! What kind of bread do you like best?"
+DEFAULT_OUTPUT_FORMAT = "mp3_44100_128"
+AUDIO_SECONDS = 1
+STREAM_CHUNK_SIZE = 4096
+
+
+def _analyze_sentences(sentences: list) -> dict:
+    """Per-sentence analysis: ANALYSIS's corrections and words wherever they apply."""
+    items = []
+    for sentence in sentences:
+        improved = sentence
+        errors = []
+        for error in ANALYSIS["errors"]:
+            if error["original"] in improved:
+                improved = improved.replace(error["original"], error["corrected"])
+                errors.append(error)
+        words = [word for word in ANALYSIS["difficult_words"] if word["word"] in sentence.lower()]
+        items.append({"improved_text": improved, "errors": errors, "difficult_words": words})
+    return {"sentences": items}
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Return a sampler of latencies in seconds for a spec string."""
+    kind, *params = spec.split(":")
+    values = [float(param) for param in params]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _parse_mapping(value: str) -> Dict[str, str]:
+    mapping = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, setting = item.split("=", 1)
+            mapping[name.strip()] = setting.strip()
+    return mapping
+
+
+def _load_config() -> tuple:
+    specs = {**DEFAULT_LATENCY, **_parse_mapping(os.getenv("MOCK_LATENCY", ""))}
+    error_rates = {name: float(rate) for name, rate in _parse_mapping(os.getenv("MOCK_ERROR_RATE", "")).items()}
+    if os.getenv("MOCK_SEED"):
+        random.seed(int(os.getenv("MOCK_SEED")))
+    return {name: parse_latency(specs[name]) for name in UPSTREAMS}, error_rates
+
+
+LATENCY, ERROR_RATES = _load_config()
+OUTPUT_TOKENS_PER_SECOND = float(os.getenv("MOCK_OUTPUT_TOKENS_PER_SECOND", "0"))
+STATS = {name: {"requests": 0, "errors": 0} for name in UPSTREAMS}
+
+app = FastAPI(title="mock upstream")
+
+
+async def _simulate(upstream: str) -> tuple:
+    """Count the call, decide whether it fails and return (latency, error response or None)."""
+    STATS[upstream]["requests"] += 1
+    latency = LATENCY[upstream]()
+    if random.random() < ERROR_RATES.get(upstream, 0.0):
+        STATS[upstream]["errors"] += 1
+        await asyncio.sleep(latency)
+        return latency, JSONResponse({"error": {"message": "mock upstream error"}}, status_code=503)
+    return latency, None
+
+
+async def _paced(chunks: list, latency: float):
+    """Yield chunks with a third of the latency up front and the rest spread out."""
+    await asyncio.sleep(latency / 3)
+    gap = (latency * 2 / 3) / max(len(chunks), 1)
+    for chunk in chunks:
+        yield chunk
+        await asyncio.sleep(gap)
+
+
+def _sse_chunks(text: str) -> list:
+    words = text.split(" ")
+    deltas = [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+    events = [
+        f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n".encode("utf-8")
+        for delta in deltas
+    ]
+    return events + [b"data: [DONE]\n\n"]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    latency, error = await _simulate("openai_chat")
+    if error is not None:
+        return error
+
+    # The scenario prompt asks for SCENARIO:/TASK: lines, the tutor reply is streamed
+    if "SCENARIO:" in json.dumps(body.get("messages", [])):
+        content = SCENARIO_REPLY
+    elif body.get("stream"):
+        content = TUTOR_REPLY
+    else:
+        prompt = body["messages"][-1]["content"]
+        match = SENTENCES_PATTERN.search(prompt)
+        content = json.dumps(_analyze_sentences(json.loads(match.group(1))) if match else ANALYSIS)
+
+    if body.get("stream"):
+        return StreamingResponse(_paced(_sse_chunks(content), latency), media_type="text/event-stream")
+
+    finish_reason = "stop"
+    max_tokens = body.get("max_tokens")
+    if max_tokens and len(content) // 4 > max_tokens:
+        content = content[:max_tokens * 4]
+        finish_reason = "length"
+    completion_tokens = len(content) // 4
+    prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+    if OUTPUT_TOKENS_PER_SECOND:
+        latency += completion_tokens / OUTPUT_TOKENS_PER_SECOND
+    await asyncio.sleep(latency)
+    return {
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+@app.post("/v1/audio/transcriptions")
+async def whisper_transcriptions(request: Request):
+    await request.body()
+    latency, error = await _simulate("whisper")
+    if error is not None:
+        return error
+    await asyncio.sleep(latency)
+    return {"text": TRANSCRIPT}
+
+
+@app.post("/v1/speech-to-text")
+async def elevenlabs_stt(request: Request):
+    await request.body()
+    latency, error = await _simulate("elevenlabs_stt")
+    if error is not None:
+        return error
+    await asyncio.sleep(latency)
+    return {"text": TRANSCRIPT, "language_code": "en"}
+
+
+def _audio_body(output_format: str) -> tuple:
+    """(body, media type) for AUDIO_SECONDS of audio in an ElevenLabs output format such as opus_48000_32."""
+    codec, _, bitrate = output_format.rpartition("_")
+    size = int(bitrate) * 1000 // 8 * AUDIO_SECONDS
+    if codec.startswith("opus"):
+        return b"OggS" + bytes(size), "audio/ogg"
+    return b"ID3" + bytes(size), "audio/mpeg"
+
+
+@app.post("/v1/text-to-speech/{voice_id}")
+async def elevenlabs_tts(voice_id: str, request: Request):
+    await request.body()
+    latency, error = await _simulate("elevenlabs_tts")
+    if error is not None:
+        return error
+    await asyncio.sleep(latency)
+    body, media_type = _audio_body(request.query_params.get("output_format", DEFAULT_OUTPUT_FORMAT))
+    return Response(content=body, media_type=media_type)
+
+
+@app.post("/v1/text-to-speech/{voice_id}/stream")
+async def elevenlabs_tts_stream(voice_id: str, request: Request):
+    await request.body()
+    latency, error = await _simulate("elevenlabs_tts")
+    if error is not None:
+        return error
+    body, media_type = _audio_body(request.query_params.get("output_format", DEFAULT_OUTPUT_FORMAT))
+    chunks = [body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE)]
+    return StreamingResponse(_paced(chunks, latency), media_type=media_type)
+
+
+@app.get("/")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+async def stats():
+    """Calls and injected errors per upstream since the server started."""
+    return STATS
@@ -0,0 +1,160 @@
+"""
+Serialization benchmark: notebook entries per second through GET /api/notes.
+
+Builds a synthetic notebook and times, in process, the ways of turning
+stored dicts into a response body:
+
+- validated: what the route used to do; NotebookEntry(**note) for every
+  entry, then the steps FastAPI runs for
+  response_model=NotebookListResponse (dump, validate again, dump in JSON
+  mode, json.dumps)
+- fast: what the route does now; one model_validate per entry (as
+  storage.get_all_entries) and one pass through be.serialization
+  (orjson when installed)
+- construct: like fast, but entries built with model_construct; kept to
+  show it is slower than pydantic-core validation for nested entries
+- fast_msgpack: the fast path encoded as MessagePack, when msgpack is
+  installed
+
+All bodies are decoded and compared before timing starts.
+
+Run from the project root:
+
+    python -m be.benchmarks.serialization_bench --entries 2000 --runs 5
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from be import serialization
+from be.models import DifficultWord, ErrorItem, NotebookEntry, NotebookListResponse
+
+WORDS = ["market", "reservation", "itinerary", "receipt", "appointment", "neighbourhood", "schedule"]
+
+
+def make_notes(count: int) -> List[dict]:
+    """Stored-form entries, as add_entry writes them (timestamps as strings)."""
+    start = datetime(2024, 1, 1)
+    notes = []
+    for i in range(count):
+        notes.append({
+            "id": str(uuid.uuid4()),
+            "timestamp": str(start + timedelta(minutes=i, microseconds=random.randrange(1_000_000))),
+            "original_text": "Yesterday I go to the market and buy many apple. " * 3,
+            "improved_text": "Yesterday I went to the market and bought many apples. " * 3,
+            "errors": [
+                {"original": "I go", "corrected": "I went", "explanation": "Use the past tense for finished actions."}
+                for _ in range(random.randint(1, 4))
+            ],
+            "difficult_words": [
+                {"word": word, "definition": f"Meaning of {word}.", "example": f"An example with {word}."}
+                for word in random.sample(WORDS, 3)
+            ],
+            "topic": "General",
+            "practice_language": "en",
+            "native_language": "zh"
+        })
+    return notes
+
+
+def validated_body(notes: List[dict]) -> bytes:
+    entries = [NotebookEntry(**dict(note, timestamp=datetime.fromisoformat(note["timestamp"]))) for note in notes]
+    entries.sort(key=lambda x: x.timestamp, reverse=True)
+    response = NotebookListResponse(notes=entries, count=len(entries))
+    # fastapi.routing.serialize_response: prepare content, validate against the field, serialize
+    content = NotebookListResponse.model_validate(response.model_dump(by_alias=True))
+    data = content.model_dump(mode="json", by_alias=True)
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _fast_content(notes: List[dict]) -> dict:
+    entries = [NotebookEntry.model_validate(note) for note in notes]
+    entries.sort(key=lambda x: x.timestamp, reverse=True)
+    return {"notes": entries, "count": len(entries)}
+
+
+def fast_body(notes: List[dict]) -> bytes:
+    return serialization.dumps(_fast_content(notes))
+
+
+def _constructed(note: dict) -> NotebookEntry:
+    return NotebookEntry.model_construct(
+        id=note["id"],
+        timestamp=datetime.fromisoformat(note["timestamp"]),
+        original_text=note["original_text"],
+        improved_text=note["improved_text"],
+        errors=[ErrorItem.model_construct(**error) for error in note["errors"]],
+        difficult_words=[DifficultWord.model_construct(**word) for word in note["difficult_words"]],
+        topic=note.get("topic"),
+        practice_language=note["practice_language"],
+        native_language=note["native_language"]
+    )
+
+
+def construct_body(notes: List[dict]) -> bytes:
+    entries = [_constructed(note) for note in notes]
+    entries.sort(key=lambda x: x.timestamp, reverse=True)
+    return serialization.dumps({"notes": entries, "count": len(entries)})
+
+
+def msgpack_body(notes: List[dict]) -> bytes:
+    return serialization.msgpack.packb(_fast_content(notes), default=serialization._default, use_bin_type=True)
+
+
+def measure(build: Callable[[List[dict]], bytes], notes: List[dict], runs: int) -> dict:
+    samples = []
+    size = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        size = len(build(notes))
+        samples.append(time.perf_counter() - start)
+    median = statistics.median(samples)
+    return {
+        "median_ms": round(median * 1000, 2),
+        "entries_per_second": round(len(notes) / median),
+        "body_bytes": size
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=2000, help="Entries in the synthetic notebook")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per path (median is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    notes = make_notes(args.entries)
+    paths = {"validated": validated_body, "fast": fast_body, "construct": construct_body}
+    expected = json.loads(validated_body(notes))
+    for name, build in paths.items():
+        if json.loads(build(notes)) != expected:
+            print(f"{name} output differs from the validated path", file=sys.stderr)
+            return 1
+    if serialization.msgpack is not None:
+        paths["fast_msgpack"] = msgpack_body
+        if serialization.msgpack.unpackb(msgpack_body(notes)) != expected:
+            print("fast_msgpack output differs from the validated path", file=sys.stderr)
+            return 1
+
+    results = {name: measure(build, notes, args.runs) for name, build in paths.items()}
+
+    report = {
+        "entries": args.entries,
+        "runs": args.runs,
+        "encoder": "orjson" if serialization.orjson is not None else "json",
+        "results": results,
+        "speedup": round(results["validated"]["median_ms"] / results["fast"]["median_ms"], 2)
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
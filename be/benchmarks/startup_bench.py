@@ -0,0 +1,105 @@
+"""
+Startup benchmark: import time of be.main and time to first request.
+
+Each run starts a fresh interpreter so nothing is cached between samples.
+Time to first request is measured from spawning `uvicorn be.main:app` until
+GET / answers 200, which covers interpreter start, imports and the lifespan.
+
+Run from the project root:
+
+    python -m be.benchmarks.startup_bench --runs 5 --import-budget 1.0 --first-request-budget 2.5
+
+Exits with status 1 when the median of either measurement exceeds its budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .harness import PROJECT_ROOT, bench_env, free_port, start_server, stop_server, wait_until_ready
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import be.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def measure_import(env: dict) -> float:
+    """Seconds spent importing be.main in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def measure_first_request(env: dict, timeout: float) -> float:
+    """Seconds from spawning uvicorn until GET / returns 200."""
+    port = free_port()
+    start = time.perf_counter()
+    process = start_server("be.main:app", port, env)
+    try:
+        wait_until_ready(process, f"http://127.0.0.1:{port}/", timeout)
+        return time.perf_counter() - start
+    finally:
+        stop_server(process)
+
+
+def _summary(samples: list) -> dict:
+    return {
+        "median": round(statistics.median(samples), 4),
+        "min": round(min(samples), 4),
+        "max": round(max(samples), 4),
+        "samples": [round(sample, 4) for sample in samples]
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--import-budget", type=float,
+        default=float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "1.0")),
+        help="Maximum median import time of be.main in seconds"
+    )
+    parser.add_argument(
+        "--first-request-budget", type=float,
+        default=float(os.getenv("STARTUP_FIRST_REQUEST_BUDGET_SECONDS", "2.5")),
+        help="Maximum median time from process spawn to the first 200 response in seconds"
+    )
+    parser.add_argument("--timeout", type=float, default=30.0, help="Give up on a server after this many seconds")
+    parser.add_argument("--skip-first-request", action="store_true", help="Only measure import time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as scratch_dir:
+        env = bench_env(scratch_dir)
+        import_samples = [measure_import(env) for _ in range(args.runs)]
+        first_request_samples = [] if args.skip_first_request else [
+            measure_first_request(env, args.timeout) for _ in range(args.runs)
+        ]
+
+    report = {"import_seconds": _summary(import_samples), "import_budget": args.import_budget}
+    failures = []
+    if report["import_seconds"]["median"] > args.import_budget:
+        failures.append("import")
+    if first_request_samples:
+        report["first_request_seconds"] = _summary(first_request_samples)
+        report["first_request_budget"] = args.first_request_budget
+        if report["first_request_seconds"]["median"] > args.first_request_budget:
+            failures.append("first_request")
+    report["over_budget"] = failures
+
+    print(json.dumps(report, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+"""Shared cache with interchangeable backends.
+
+Every backend stores opaque bytes under a string key with an optional
+TTL, and drops the least recently used entries once it holds more than
+CACHE_MAX_ENTRIES:
+
+- memory: in-process LRU, private to one worker
+- sqlite: one WAL-mode, memory-mapped database file shared by all
+  workers on a host (LRU is approximate: access times are refreshed at
+  most once per ACCESS_REFRESH_SECONDS)
+- redis: shared across hosts; access times are kept in a sorted set
+  and the oldest entries are removed on writes that take it over the
+  bound
+
+Entries removed for capacity count as evictions, entries found or swept
+after their TTL as expirations.
+
+Services use get_cache(namespace), which serializes values to JSON so
+every backend sees the same bytes, prefixes keys with the namespace and
+keeps hit/miss stats per namespace. Backend failures are logged and
+treated as misses; a broken cache never fails a request.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .config import get_settings
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("memory", "sqlite", "redis")
+
+
+class CacheBackend:
+    """Interface shared by the backends. TTLs are in seconds; None means no expiry."""
+
+    name = "base"
+
+    def __init__(self):
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU; entries are (value, expires_at)."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (value, time.time() + ttl if ttl is not None else None)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Cache table in a SQLite file that every worker on the host opens.
+
+    Each thread gets its own connection; calls run in the default thread
+    pool so the event loop never waits on the database lock.
+    """
+
+    name = "sqlite"
+
+    # Access times older than this are refreshed on a hit; newer ones are
+    # left alone so reads don't all turn into writes
+    ACCESS_REFRESH_SECONDS = 60
+    # Expired and over-capacity rows are removed every N writes
+    EVICT_EVERY = 64
+    MMAP_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, path: Path, max_entries: int):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={self.MMAP_BYTES}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _get(self, key: str) -> Optional[bytes]:
+        conn = self._connection()
+        row = conn.execute("SELECT value, expires_at, accessed_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at is not None and expires_at <= now:
+            self.expirations += conn.execute(
+                "DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now)
+            ).rowcount
+            return None
+        if now - accessed_at > self.ACCESS_REFRESH_SECONDS:
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return value
+
+    def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl if ttl is not None else None, now)
+        )
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % self.EVICT_EVERY == 0
+        if evict:
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        self.expirations += conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            self.evictions += conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            ).rowcount
+
+    def _delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+
+class RedisBackend(CacheBackend):
+    """
+    Redis (or any server speaking its protocol); needs the optional redis package.
+
+    Access times live in one sorted set next to the entries. A write that
+    takes it over max_entries removes the least recently accessed keys;
+    members whose key already expired are counted as expirations.
+    """
+
+    name = "redis"
+
+    # Sorted set of key -> last access time; cache keys always contain ":" so this can't collide
+    ACCESS_KEY = "cache_accessed_at"
+
+    def __init__(self, url: str, max_entries: int):
+        super().__init__()
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package (pip install redis)") from e
+        self.max_entries = max_entries
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.zadd(self.ACCESS_KEY, {key: time.time()}, xx=True)
+            value, _ = await pipe.execute()
+        if value is None:
+            # Expired (or never set): stop tracking it
+            if await self._client.zrem(self.ACCESS_KEY, key):
+                self.expirations += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.set(key, value, px=int(ttl * 1000) if ttl is not None else None)
+            pipe.zadd(self.ACCESS_KEY, {key: time.time()})
+            pipe.zcard(self.ACCESS_KEY)
+            _, _, count = await pipe.execute()
+        if count > self.max_entries:
+            await self._evict(count - self.max_entries)
+
+    async def _evict(self, excess: int) -> None:
+        oldest = await self._client.zpopmin(self.ACCESS_KEY, excess)
+        if not oldest:
+            return
+        removed = await self._client.delete(*(member for member, _ in oldest))
+        self.evictions += removed
+        self.expirations += len(oldest) - removed
+
+    async def delete(self, key: str) -> None:
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.zrem(self.ACCESS_KEY, key)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+_MISSING = object()
+
+
+class Cache:
+    """Namespaced view of the shared backend with JSON values and per-namespace stats."""
+
+    def __init__(self, namespace: str, backend: CacheBackend):
+        self.namespace = namespace
+        self.backend = backend
+        self._hits = 0
+        self._misses = 0
+        self._sets = 0
+        self._errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value, or default on a miss."""
+        try:
+            raw = await self.backend.get(self._key(key))
+        except Exception as e:
+            self._record_error("get", e)
+            return default
+        if raw is None:
+            self._misses += 1
+            CACHE_REQUESTS.labels(self.namespace, "miss").inc()
+            return default
+        self._hits += 1
+        CACHE_REQUESTS.labels(self.namespace, "hit").inc()
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value, with an optional TTL in seconds."""
+        raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        try:
+            await self.backend.set(self._key(key), raw, ttl)
+            self._sets += 1
+        except Exception as e:
+            self._record_error("set", e)
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self.backend.delete(self._key(key))
+        except Exception as e:
+            self._record_error("delete", e)
+
+    async def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """Return the cached value, or compute, store and return it. None results are not cached."""
+        value = await self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = await factory()
+        if value is not None:
+            await self.set(key, value, ttl)
+        return value
+
+    def _record_error(self, operation: str, error: Exception) -> None:
+        self._errors += 1
+        CACHE_REQUESTS.labels(self.namespace, "error").inc()
+        logger.warning(
+            "Cache backend error",
+            extra={"namespace": self.namespace, "operation": operation, "backend": self.backend.name, "error": str(error)}
+        )
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+            "sets": self._sets,
+            "errors": self._errors
+        }
+
+
+_caches: Dict[str, Cache] = {}
+
+
+@lru_cache(maxsize=None)
+def get_cache_backend() -> CacheBackend:
+    """Return the process-wide backend selected by CACHE_BACKEND, creating it on first use."""
+    settings = get_settings()
+    if settings.CACHE_BACKEND == "sqlite":
+        return SQLiteBackend(settings.CACHE_SQLITE_PATH, settings.CACHE_MAX_ENTRIES)
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend(settings.REDIS_URL, settings.CACHE_MAX_ENTRIES)
+    if settings.CACHE_BACKEND != "memory":
+        logger.warning("Unknown CACHE_BACKEND, using memory", extra={"backend": settings.CACHE_BACKEND})
+    return MemoryBackend(settings.CACHE_MAX_ENTRIES)
+
+
+def get_cache(namespace: str) -> Cache:
+    """Return the cache for a namespace, e.g. "tts_streams"."""
+    cache = _caches.get(namespace)
+    if cache is None:
+        cache = _caches[namespace] = Cache(namespace, get_cache_backend())
+    return cache
+
+
+def cache_stats() -> dict:
+    """Backend name, evictions, expirations and per-namespace stats, as seen by this worker."""
+    if not _caches:
+        return {"backend": get_settings().CACHE_BACKEND, "evictions": 0, "expirations": 0, "namespaces": {}}
+    backend = get_cache_backend()
+    return {
+        "backend": backend.name,
+        "evictions": backend.evictions,
+        "expirations": backend.expirations,
+        "namespaces": {namespace: cache.stats() for namespace, cache in _caches.items()}
+    }
+
+
+async def close_cache() -> None:
+    """Close backend connections, if a backend was created."""
+    if get_cache_backend.cache_info().currsize:
+        await get_cache_backend().close()
@@ -1,45 +1,166 @@
-"""Configuration settings for the application."""
+"""Configuration settings for the application.
+
+Importing this module has no side effects. Settings are read from the
+environment (and be/.env) the first time get_settings() is called, and
+directories are created by ensure_directories() from the app lifespan.
+"""
+import logging
 import os
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Storage
 BASE_DIR = Path(__file__).parent
-STORAGE_DIR = BASE_DIR / "storage"
-STORAGE_DIR.mkdir(exist_ok=True)
-NOTES_FILE = STORAGE_DIR / "notes.json"
-AUDIO_DIR = BASE_DIR / "static" / "audio"
-AUDIO_DIR.mkdir(parents=True, exist_ok=True)
 PROJECT_ROOT = BASE_DIR.parent
+ENV_FILE = BASE_DIR / ".env"
+
+logger = logging.getLogger(__name__)
+
+
+def _load_env_file() -> bool:
+    """Load be/.env into the environment if it exists."""
+    if not ENV_FILE.exists():
+        return False
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=ENV_FILE)
+    return True
+
+
+class Settings:
+    """Application settings, read from the environment once on first use."""
+
+    def __init__(self):
+        self.ENV_FILE_LOADED = _load_env_file()
+
+        # Storage
+        self.STORAGE_DIR = Path(os.getenv("STORAGE_DIR", str(BASE_DIR / "storage")))
+        self.NOTES_FILE = self.STORAGE_DIR / "notes.json"
+        self.AUDIO_DIR = Path(os.getenv("AUDIO_DIR", str(BASE_DIR / "static" / "audio")))
+
+        # API Keys
+        self.ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "")
+        self.OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+
+        # ElevenLabs Configuration
+        self.ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID")
+        self.ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io/v1")
+
+        # OpenAI Configuration
+        self.OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+        self.OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+        # Application Configuration
+        self.API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+
+        # TTS output format when the client does not ask for one (see tts_service.OUTPUT_FORMATS)
+        self.TTS_DEFAULT_OUTPUT_FORMAT = os.getenv("TTS_DEFAULT_OUTPUT_FORMAT", "mp3_44100_128")
+
+        # Sentence-pipelined TTS
+        self.TTS_PIPELINE_CONCURRENCY = int(os.getenv("TTS_PIPELINE_CONCURRENCY", "3"))
+
+        # Startup warm-up of predictable audio
+        self.TTS_WARMUP_ENABLED = os.getenv("TTS_WARMUP_ENABLED", "true").lower() == "true"
+        self.TTS_WARMUP_CATALOG = os.getenv("TTS_WARMUP_CATALOG", "")  # Optional JSON file of extra phrases
+        self.TTS_WARMUP_LANGUAGES = os.getenv("TTS_WARMUP_LANGUAGES", "")  # Comma-separated, empty = all supported
+        self.TTS_WARMUP_CONCURRENCY = int(os.getenv("TTS_WARMUP_CONCURRENCY", "2"))
+
+        # Pre-generated scenario pool for popular topics
+        self.SCENARIO_POOL_TOPICS = os.getenv(
+            "SCENARIO_POOL_TOPICS",
+            "ordering coffee,job interview,travel directions"
+        )
+        self.SCENARIO_POOL_LANGUAGE_PAIRS = os.getenv("SCENARIO_POOL_LANGUAGE_PAIRS", "en:en")  # practice:native
+        self.SCENARIO_POOL_SIZE = int(os.getenv("SCENARIO_POOL_SIZE", "5"))
+        self.SCENARIO_POOL_LOW_WATER = int(os.getenv("SCENARIO_POOL_LOW_WATER", "2"))
+        self.SCENARIO_POOL_REFILL_CONCURRENCY = int(os.getenv("SCENARIO_POOL_REFILL_CONCURRENCY", "2"))
+
+        # Similarity-based scenario reuse
+        self.SCENARIO_SIMILARITY_THRESHOLD = float(os.getenv("SCENARIO_SIMILARITY_THRESHOLD", "0.6"))
+        self.SCENARIO_INDEX_MAX_ENTRIES = int(os.getenv("SCENARIO_INDEX_MAX_ENTRIES", "500"))  # Per practice language
+        self.SCENARIO_INDEX_MAX_VARIANTS = int(os.getenv("SCENARIO_INDEX_MAX_VARIANTS", "3"))
+        # Share of matching lookups that generate another variant while a topic has fewer than the max
+        self.SCENARIO_INDEX_NEW_VARIANT_RATE = float(os.getenv("SCENARIO_INDEX_NEW_VARIANT_RATE", "0.3"))
+
+        # Audio storage lifecycle
+        self.AUDIO_QUOTA_BYTES = int(os.getenv("AUDIO_QUOTA_BYTES", str(1024 * 1024 * 1024)))  # 1 GiB
+        self.AUDIO_TTL_SECONDS = int(os.getenv("AUDIO_TTL_SECONDS", str(7 * 24 * 3600)))  # 7 days
+        self.AUDIO_SWEEP_INTERVAL_SECONDS = int(os.getenv("AUDIO_SWEEP_INTERVAL_SECONDS", "300"))
+
+        # Shared cache: memory (per worker), sqlite (shared by workers on a host) or redis
+        self.CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+        self.CACHE_SQLITE_PATH = Path(os.getenv("CACHE_SQLITE_PATH", str(self.STORAGE_DIR / "cache.sqlite3")))
+        self.REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+        # Per-sentence analysis results, reused when a learner resubmits an edited text
+        self.ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+        # Long texts are analyzed in concurrent chunks. Answers run to several times the input
+        # (corrections, explanations, words), so both limits keep one answer well under max_tokens
+        self.ANALYSIS_LONG_TEXT_CHARS = int(os.getenv("ANALYSIS_LONG_TEXT_CHARS", "800"))
+        self.ANALYSIS_CHUNK_TOKENS = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "150"))
+        self.ANALYSIS_CHUNK_CONCURRENCY = int(os.getenv("ANALYSIS_CHUNK_CONCURRENCY", "4"))
+
+        # Server-side sessions for /api/practice/chat (stored in the shared cache)
+        self.CHAT_SESSION_IDLE_SECONDS = int(os.getenv("CHAT_SESSION_IDLE_SECONDS", "1800"))
+        self.CHAT_SESSION_VERBATIM_TURNS = int(os.getenv("CHAT_SESSION_VERBATIM_TURNS", "6"))  # Older turns are summarized
+        self.CHAT_SESSION_PROMPT_TOKENS = int(os.getenv("CHAT_SESSION_PROMPT_TOKENS", "1200"))  # History plus new text
+        self.CHAT_SESSION_SUMMARY_TOKENS = int(os.getenv("CHAT_SESSION_SUMMARY_TOKENS", "200"))
+
+        # Near-duplicate notebook entries: merge (count repeats), link (keep, point at the original) or off
+        self.NOTES_DEDUP_MODE = os.getenv("NOTES_DEDUP_MODE", "merge")
+        self.NOTES_DEDUP_THRESHOLD = float(os.getenv("NOTES_DEDUP_THRESHOLD", "0.7"))  # Estimated Jaccard similarity
+
+        # Background jobs for async practice submissions
+        self.JOB_DB_PATH = Path(os.getenv("JOB_DB_PATH", str(self.STORAGE_DIR / "jobs.sqlite3")))
+        self.JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))  # Per process
+        self.JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+        self.JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "1000"))
+        self.JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+        self.JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+
+        # Admission control for /api/practice/* and /api/scenario/generate (limits are per process)
+        self.ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+        self.ADMISSION_INITIAL_LIMIT = int(os.getenv("ADMISSION_INITIAL_LIMIT", "16"))
+        self.ADMISSION_MIN_LIMIT = int(os.getenv("ADMISSION_MIN_LIMIT", "2"))
+        self.ADMISSION_MAX_LIMIT = int(os.getenv("ADMISSION_MAX_LIMIT", "64"))
+        self.ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+        self.ADMISSION_DEADLINE_SECONDS = float(os.getenv("ADMISSION_DEADLINE_SECONDS", "30"))
 
-env_path = BASE_DIR / '.env'
-print(f"[Config] Loading environment from: {env_path}")
-print(f"[Config] .env exists: {env_path.exists()}")
-if env_path.exists():
-    load_dotenv(dotenv_path=env_path)
-else:
-    print(f"[Config] WARNING: .env file not found at {env_path}")
-    print(f"[Config] Please create .env file in the be/ directory")
+        # Per-request time budget; clients may ask for less (or more, up to the max) with X-Request-Timeout
+        self.DEADLINE_ENABLED = os.getenv("DEADLINE_ENABLED", "true").lower() == "true"
+        self.DEADLINE_DEFAULT_SECONDS = float(os.getenv("DEADLINE_DEFAULT_SECONDS", "60"))
+        self.DEADLINE_MAX_SECONDS = float(os.getenv("DEADLINE_MAX_SECONDS", "120"))
 
-# API Keys
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+        # Logging
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+        self.LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records beyond this are dropped
+        self.LOG_DEBUG_SAMPLE_EVERY = int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "10"))  # Keep 1 in N debug lines per call site
+        self.LOG_TRANSCRIPTS = os.getenv("LOG_TRANSCRIPTS", "redact")  # redact, truncate or full
+        self.LOG_TRUNCATE_CHARS = int(os.getenv("LOG_TRUNCATE_CHARS", "40"))
 
-# Debug output
-print(f"[Config] ELEVENLABS_API_KEY loaded: {'Yes' if ELEVENLABS_API_KEY else 'No'}")
-print(f"[Config] ELEVENLABS_API_KEY length: {len(ELEVENLABS_API_KEY) if ELEVENLABS_API_KEY else 0}")
-print(f"[Config] OPENAI_API_KEY loaded: {'Yes' if OPENAI_API_KEY else 'No'}")
 
-# ElevenLabs Configuration
-ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID")  
-ELEVENLABS_BASE_URL = "https://api.elevenlabs.io/v1"
-print(f"[Config] ELEVENLABS_VOICE_ID: {ELEVENLABS_VOICE_ID}")
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Return the process-wide settings, constructing them on first use."""
+    return Settings()
 
-# OpenAI Configuration
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
-OPENAI_BASE_URL = "https://api.openai.com/v1"
 
-# Application Configuration
-API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+def ensure_directories(settings: Settings) -> None:
+    """Create the storage and audio directories."""
+    settings.STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+    settings.AUDIO_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def log_settings(settings: Settings) -> None:
+    """Log a startup summary of the loaded configuration (never the secrets)."""
+    if not settings.ENV_FILE_LOADED:
+        logger.warning(".env file not found; please create it in the be/ directory", extra={"env_file": str(ENV_FILE)})
+    logger.info(
+        "Configuration loaded",
+        extra={
+            "env_file": str(ENV_FILE) if settings.ENV_FILE_LOADED else None,
+            "elevenlabs_api_key_loaded": bool(settings.ELEVENLABS_API_KEY),
+            "openai_api_key_loaded": bool(settings.OPENAI_API_KEY),
+            "elevenlabs_voice_id": settings.ELEVENLABS_VOICE_ID
+        }
+    )
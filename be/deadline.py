@@ -0,0 +1,166 @@
+"""Per-request deadlines and cancellation of abandoned requests.
+
+Every HTTP request gets a time budget: the X-Request-Timeout header (in
+seconds, capped at DEADLINE_MAX_SECONDS) or DEADLINE_DEFAULT_SECONDS.
+The deadline lives in a context variable, so services and the tasks they
+start see it without extra arguments. Upstream calls use
+stage_timeout(default): their usual timeout, or whatever is left of the
+budget if that is less, so a chain of stages can never add up to more
+than the budget.
+
+DeadlineMiddleware runs the rest of the app in a task and cancels it
+when the client disconnects, or when the deadline passes before the
+response has started. Cancellation reaches the upstream call in
+progress and closes its connection, so no further stages run for a
+client that is gone. A request that ran out of time is answered 504.
+Once a response has started (e.g. streamed audio or job events) only a
+disconnect stops it.
+
+Work meant to outlive the request (pool refills, playlist segments, chat
+summaries) is started with detached(), which drops the deadline.
+"""
+import asyncio
+import contextvars
+import json
+import time
+from typing import Coroutine, Optional
+
+from .config import get_settings
+from .metrics import track_cancelled
+
+DEADLINE_HEADER = b"x-request-timeout"
+
+# time.monotonic() by which the current request must be answered; None outside requests
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before a stage could start."""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None if there is no deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def stage_timeout(default: float) -> float:
+    """Timeout for the next stage: default, or the remaining budget if less."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(default, left)
+
+
+def detached(coro: Coroutine) -> asyncio.Task:
+    """Start a task that outlives the request, without its deadline."""
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    return asyncio.create_task(coro, context=context)
+
+
+def _budget(scope) -> float:
+    settings = get_settings()
+    for name, value in scope.get("headers", []):
+        if name == DEADLINE_HEADER:
+            try:
+                requested = float(value)
+            except ValueError:
+                break
+            if requested > 0:
+                return min(requested, settings.DEADLINE_MAX_SECONDS)
+            break
+    return settings.DEADLINE_DEFAULT_SECONDS
+
+
+class DeadlineMiddleware:
+    """ASGI middleware applying the request deadline and cancelling on disconnect."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_settings().DEADLINE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        budget = _budget(scope)
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        started = asyncio.Event()
+
+        async def watch():
+            # Reads ahead of the app only once it has taken the previous body chunk,
+            # so uploads keep the server's flow control
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+                if message.get("more_body"):
+                    await messages.join()
+
+        async def receive_wrapper():
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+            message = await messages.get()
+            messages.task_done()
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                started.set()
+            await send(message)
+
+        token = _deadline.set(time.monotonic() + budget)
+        try:
+            app_task = asyncio.create_task(self.app(scope, receive_wrapper, send_wrapper))
+        finally:
+            _deadline.reset(token)
+        watcher = asyncio.create_task(watch())
+        disconnect = asyncio.create_task(disconnected.wait())
+        response_started = asyncio.create_task(started.wait())
+        try:
+            await asyncio.wait(
+                {app_task, disconnect, response_started},
+                timeout=budget,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if started.is_set() and not app_task.done():
+                # Responding: no deadline any more, but stop if the client leaves
+                await asyncio.wait({app_task, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+            if app_task.done():
+                app_task.result()
+                return
+
+            reason = "client_disconnect" if disconnected.is_set() else "deadline"
+            app_task.cancel()
+            await asyncio.gather(app_task, return_exceptions=True)
+            track_cancelled(scope, root_path, reason)
+            if reason == "deadline" and not started.is_set():
+                await _send_timeout(send)
+        finally:
+            for task in (watcher, disconnect, response_started):
+                task.cancel()
+            if not app_task.done():
+                # The server cancelled us (e.g. shutdown)
+                app_task.cancel()
+
+
+async def _send_timeout(send) -> None:
+    body = json.dumps({"detail": "The request took too long. Please try again."}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 504,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1"))
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,68 @@
+"""
+Deduplicate an existing notebook in one pass.
+
+Entries are read in stored (submission) order and placed one at a time
+through a fresh NearDuplicateIndex, exactly as add_entry places new
+ones: each entry is compared only with the LSH candidates among the
+entries kept so far, so the pass is linear in the number of entries
+rather than comparing every pair. In merge mode near-duplicates collapse
+into the earliest entry (which takes the latest attempt and the summed
+repeat count); in link mode they are kept with duplicate_of set. Entries
+already linked are merged into their original in merge mode.
+
+The notes file is locked against concurrent writes for the whole pass
+and rewritten (bumping the storage version) only if something changed.
+
+Run from the project root:
+
+    python -m be.dedup_notes --mode merge --dry-run
+"""
+import argparse
+import json
+import sys
+import time
+
+from .config import get_settings
+from .storage import NearDuplicateIndex, _exclusive_write, get_storage_version, load_notes, save_notes
+
+
+def deduplicate(mode: str, threshold: float, dry_run: bool) -> dict:
+    start = time.perf_counter()
+    with _exclusive_write():
+        notes = load_notes()
+        index = NearDuplicateIndex(threshold, get_storage_version())
+        kept = []
+        for note in notes:
+            index.place(kept, note, mode)
+        changed = kept != notes
+        if changed and not dry_run:
+            save_notes(kept)
+    return {
+        "mode": mode,
+        "threshold": threshold,
+        "dry_run": dry_run,
+        "entries_before": len(notes),
+        "entries_after": len(kept),
+        "merged": len(notes) - len(kept),
+        "linked": sum(1 for note in kept if note.get("duplicate_of")),
+        "written": changed and not dry_run,
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+
+
+def main() -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("merge", "link"), help="Default: NOTES_DEDUP_MODE, or merge if off")
+    parser.add_argument("--threshold", type=float, default=settings.NOTES_DEDUP_THRESHOLD,
+                        help="Estimated Jaccard similarity at which entries count as near-duplicates")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+    mode = args.mode or (settings.NOTES_DEDUP_MODE if settings.NOTES_DEDUP_MODE == "link" else "merge")
+
+    print(json.dumps(deduplicate(mode, args.threshold, args.dry_run), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
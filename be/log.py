@@ -0,0 +1,138 @@
+"""Structured, non-blocking logging.
+
+Records are put on a bounded queue by the calling thread (usually the
+event loop) and are formatted as JSON lines and written by a background
+thread, so a slow log sink never stalls request handling. When the queue
+is full a record is dropped and counted instead of blocking.
+
+Modules log through logging.getLogger(__name__) and pass structured
+fields via `extra`. Transcripts and other learner text go through
+redact() first.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Dict, Optional, Tuple
+
+from .metrics import LOG_QUEUE_DEPTH, LOG_RECORDS_DROPPED
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+TRANSCRIPT_MODES = ("redact", "truncate", "full")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_transcript_mode = "redact"
+_truncate_chars = 40
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus any extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Let through one in `every` DEBUG records per call site; other levels
+    always pass. Kept records carry the sample rate so counts can be
+    scaled back up.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = every
+        self._seen: Dict[Tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every <= 1:
+            return True
+        site = (record.pathname, record.lineno)
+        seen = self._seen.get(site, 0)
+        self._seen[site] = seen + 1
+        if seen % self.every == 0:
+            record.sample_every = self.every
+            return True
+        LOG_RECORDS_DROPPED.labels("sampled").inc()
+        return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and leaves formatting to the writer thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now since they may change before the writer runs
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels("queue_full").inc()
+
+
+def configure_logging(settings) -> None:
+    """Route the app's loggers through the queue and start the writer thread."""
+    global _listener, _transcript_mode, _truncate_chars
+    if _listener is not None:
+        return
+
+    if settings.LOG_TRANSCRIPTS in TRANSCRIPT_MODES:
+        _transcript_mode = settings.LOG_TRANSCRIPTS
+    _truncate_chars = settings.LOG_TRUNCATE_CHARS
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    LOG_QUEUE_DEPTH.set_function(log_queue.qsize)
+
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_EVERY))
+
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(JsonFormatter())
+
+    app_logger = logging.getLogger(__package__)
+    app_logger.setLevel(settings.LOG_LEVEL.upper())
+    app_logger.addHandler(handler)
+    app_logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, writer)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def redact(text: Optional[str]) -> Optional[str]:
+    """
+    Prepare learner text (transcripts, model output) for logging according
+    to LOG_TRANSCRIPTS: "redact" keeps only the length, "truncate" keeps a
+    prefix, "full" logs it unchanged.
+    """
+    if not text or _transcript_mode == "full":
+        return text
+    if _transcript_mode == "truncate" and len(text) > _truncate_chars:
+        return f"{text[:_truncate_chars]}... ({len(text)} chars)"
+    if _transcript_mode == "truncate":
+        return text
+    return f"<redacted {len(text)} chars>"
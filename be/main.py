@@ -1,20 +1,68 @@
 """FastAPI application main file."""
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
 from be.routes import scenario
 
-from .routes import intent, practice, notes
-from .config import AUDIO_DIR
+from .routes import intent, jobs, practice, notes, tts, session
+from .config import get_settings, ensure_directories, log_settings
+from .admission import AdmissionMiddleware, get_admission_controller
+from .audio_files import AudioFiles
+from .cache import cache_stats, close_cache
+from .deadline import DeadlineMiddleware
+from .log import configure_logging, shutdown_logging
+from .metrics import MetricsMiddleware, render_metrics
+from .services.audio_lifecycle_service import get_audio_manager
+from .services.chat_session_service import wait_for_summaries
+from .services.job_service import get_job_queue
+from .services.scenario_pool_service import get_scenario_pool
+from .services.warmup_service import warm_up, get_phrase, phrase_audio_url
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load settings, start the log writer and create directories, then start
+    background maintenance tasks without delaying readiness.
+    """
+    settings = get_settings()
+    configure_logging(settings)
+    ensure_directories(settings)
+    log_settings(settings)
+
+    audio_manager = get_audio_manager()
+    audio_manager.start()
+    job_queue = get_job_queue()
+    job_queue.start()
+    warmup_task = asyncio.create_task(warm_up()) if settings.TTS_WARMUP_ENABLED else None
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await get_scenario_pool().stop()
+    await audio_manager.stop()
+    await job_queue.stop()
+    # Summaries write to the cache
+    await wait_for_summaries()
+    await close_cache()
+    shutdown_logging()
+
 
 app = FastAPI(
     title="speak and learn",
     description="oral practice application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Concurrency limits for the upstream-bound routes; inside CORS so 503s stay readable by the browser
+app.add_middleware(AdmissionMiddleware)
+
+# Request deadline and cancellation on client disconnect; wraps admission so queueing counts against the budget
+app.add_middleware(DeadlineMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -24,8 +72,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms and in-flight gauge, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files for audio
-app.mount("/static/audio", StaticFiles(directory=str(AUDIO_DIR)), name="audio")
+app.mount("/static/audio", AudioFiles(), name="audio")
 
 # Include routers
 # app.include_router(auth.router)  #no user identity
@@ -33,6 +84,9 @@ app.include_router(intent.router)
 app.include_router(practice.router)
 app.include_router(notes.router)
 app.include_router(scenario.router)
+app.include_router(tts.router)
+app.include_router(session.router)
+app.include_router(jobs.router)
 
 
 @app.get("/")
@@ -45,14 +99,50 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: route latency, upstream calls and storage timings."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/api/audio/usage")
+async def get_audio_usage():
+    """
+    Report current usage of the generated audio directory.
+    """
+    return get_audio_manager().usage()
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """
+    Report the cache backend and hit/miss counts per namespace.
+    Counts are for the worker that answers; shared backends hold one copy
+    of the data for all workers.
+    """
+    return cache_stats()
+
+
+@app.get("/api/admission/stats")
+async def get_admission_stats():
+    """
+    Report the concurrency limit, queue and shed counts per route group,
+    for the worker that answers.
+    """
+    return get_admission_controller().stats()
+
+
 @app.get("/api/practice/prompt")
-async def get_practice_prompt():
+async def get_practice_prompt(language: str = "en"):
     """
     Get the practice prompt question after login.
+    Includes the pre-rendered audio of the question once warm-up has cached it.
     """
     return {
-        "question": "What do you want to practice for today?",
-        "message": "Please select a topic or speak your answer"
+        "question": get_phrase("practice_prompt", language),
+        "message": "Please select a topic or speak your answer",
+        "audio_url": phrase_audio_url("practice_prompt", language)
     }
 
 
@@ -0,0 +1,304 @@
+"""Prometheus metrics and the instrumentation hooks used by routes and services.
+
+Hooks only touch pre-registered collectors (a label lookup, a gauge
+inc/dec and one histogram observe), so they are cheap enough for every
+request and upstream call.
+"""
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+STORAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+TOKEN_BUCKETS = (50, 100, 200, 400, 800, 1600, 3200, 6400)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Upstream names used as label values
+OPENAI_CHAT = "openai_chat"
+WHISPER = "whisper"
+ELEVENLABS_STT = "elevenlabs_stt"
+ELEVENLABS_TTS = "elevenlabs_tts"
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled")
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to OpenAI and ElevenLabs, including streamed bodies",
+    ["upstream", "outcome"],
+    buckets=UPSTREAM_BUCKETS
+)
+UPSTREAM_IN_FLIGHT = Gauge("upstream_requests_in_flight", "Upstream calls currently open", ["upstream"])
+UPSTREAM_PAYLOAD_BYTES = Histogram(
+    "upstream_payload_bytes",
+    "Bytes sent to and received from upstream APIs",
+    ["upstream", "direction"],
+    buckets=SIZE_BUCKETS
+)
+
+STORAGE_LATENCY = Histogram(
+    "storage_operation_duration_seconds",
+    "Notebook storage read/write latency",
+    ["operation"],
+    buckets=STORAGE_BUCKETS
+)
+STORAGE_IN_FLIGHT = Gauge("storage_operations_in_flight", "Storage operations currently running", ["operation"])
+STORAGE_PAYLOAD_BYTES = Histogram(
+    "storage_payload_bytes",
+    "Size of the notebook file read or written",
+    ["operation"],
+    buckets=SIZE_BUCKETS
+)
+
+JOB_QUEUE_DEPTH = Gauge("job_queue_depth", "Background jobs by status (shared by all workers)", ["status"])
+JOB_WAIT = Histogram(
+    "job_wait_seconds",
+    "Time background jobs spent queued before a worker claimed them",
+    ["kind"],
+    buckets=LATENCY_BUCKETS
+)
+JOB_LATENCY = Histogram(
+    "job_latency_seconds",
+    "Time from submission to completion of background jobs",
+    ["kind", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+ADMISSION_LIMIT = Gauge("admission_limit", "Current adaptive concurrency limit per route group", ["group"])
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Admitted requests currently running per route group", ["group"])
+ADMISSION_WAITING = Gauge("admission_waiting", "Requests waiting for a slot per route group", ["group"])
+ADMISSION_QUEUED = Counter("admission_queued_total", "Requests that had to wait for a slot", ["group"])
+ADMISSION_SHED = Counter(
+    "admission_shed_total",
+    "Requests answered 503: queue_full, deadline (predicted wait too long) or timeout (waited too long)",
+    ["group", "reason"]
+)
+
+ANALYSIS_SENTENCES = Counter(
+    "analysis_sentences_total",
+    "Sentences in analyzed texts: reused (cached result) or analyzed (sent to the model)",
+    ["result"]
+)
+ANALYSIS_TOKENS_SAVED = Counter("analysis_tokens_saved_total", "Model tokens not spent thanks to reused sentence analyses")
+ANALYSIS_LATENCY_SAVED = Counter(
+    "analysis_latency_saved_seconds_total",
+    "Model latency attributed to reused sentence analyses"
+)
+
+AUDIO_BYTES_SERVED = Counter(
+    "audio_bytes_served_total",
+    "Audio bytes sent to clients by source (static, stream, playlist, session) and codec (mp3, opus)",
+    ["source", "codec"]
+)
+AUDIO_TURN_BYTES = Histogram(
+    "audio_turn_bytes",
+    "Reply audio bytes sent per conversation turn",
+    ["output_format"],
+    buckets=SIZE_BUCKETS
+)
+
+CHAT_HISTORY_TOKENS = Histogram(
+    "chat_history_tokens",
+    "Estimated tokens of session history (summary and recent turns) sent with each chat turn",
+    buckets=TOKEN_BUCKETS
+)
+CHAT_SUMMARIES = Counter("chat_summaries_total", "Rolling chat summary updates by result (ok or failed)", ["result"])
+
+NOTES_DEDUPLICATED = Counter(
+    "notes_deduplicated_total",
+    "Near-duplicate notebook entries: merged (into the original) or linked (kept, pointing at it)",
+    ["action"]
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by namespace and result (hit, miss or backend error)",
+    ["namespace", "result"]
+)
+
+REQUESTS_CANCELLED = Counter(
+    "http_requests_cancelled_total",
+    "Requests whose work was cancelled: client_disconnect or deadline (answered 504)",
+    ["route", "reason"]
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records not written: queue_full (writer fell behind) or sampled (debug sampling)",
+    ["reason"]
+)
+LOG_QUEUE_DEPTH = Gauge("log_queue_depth", "Log records waiting for the writer thread")
+
+
+class UpstreamTally:
+    """Number of upstream calls started while handling one request."""
+
+    __slots__ = ("calls",)
+
+    def __init__(self):
+        self.calls = 0
+
+
+# Tally of the request being handled, if something is counting its upstream calls
+_upstream_tally: contextvars.ContextVar[Optional[UpstreamTally]] = contextvars.ContextVar(
+    "upstream_tally", default=None
+)
+
+
+@contextmanager
+def tally_upstream() -> Iterator[UpstreamTally]:
+    """Count the upstream calls started inside the block, including in tasks it creates."""
+    tally = UpstreamTally()
+    token = _upstream_tally.set(tally)
+    try:
+        yield tally
+    finally:
+        _upstream_tally.reset(token)
+
+
+class UpstreamCall:
+    """
+    Timing handle for one upstream call.
+
+    The call counts as an error if it is finished with ok=False, if the
+    recorded status is 400 or above, or if the tracked block raises. It
+    counts as cancelled if the request it served was abandoned.
+    """
+
+    __slots__ = ("upstream", "status", "_start", "_finished")
+
+    def __init__(self, upstream: str):
+        self.upstream = upstream
+        self.status: Optional[int] = None
+        self._start = time.perf_counter()
+        self._finished = False
+        UPSTREAM_IN_FLIGHT.labels(upstream).inc()
+        tally = _upstream_tally.get()
+        if tally is not None:
+            tally.calls += 1
+
+    def sent(self, size: int) -> None:
+        UPSTREAM_PAYLOAD_BYTES.labels(self.upstream, "sent").observe(size)
+
+    def received(self, size: int) -> None:
+        UPSTREAM_PAYLOAD_BYTES.labels(self.upstream, "received").observe(size)
+
+    def finish(self, ok: bool = True, cancelled: bool = False) -> None:
+        """Record the latency; later calls are ignored."""
+        if self._finished:
+            return
+        self._finished = True
+        if self.status is not None and self.status >= 400:
+            ok = False
+        outcome = "cancelled" if cancelled else "ok" if ok else "error"
+        UPSTREAM_IN_FLIGHT.labels(self.upstream).dec()
+        UPSTREAM_LATENCY.labels(self.upstream, outcome).observe(
+            time.perf_counter() - self._start
+        )
+
+
+def start_upstream(upstream: str) -> UpstreamCall:
+    """Start timing an upstream call that finishes somewhere else (e.g. a relayed stream)."""
+    return UpstreamCall(upstream)
+
+
+@contextmanager
+def track_upstream(upstream: str) -> Iterator[UpstreamCall]:
+    """Time an upstream call made inside the block."""
+    call = UpstreamCall(upstream)
+    ok = False
+    try:
+        yield call
+        ok = True
+    except asyncio.CancelledError:
+        call.finish(cancelled=True)
+        raise
+    finally:
+        call.finish(ok)
+
+
+class StorageOperation:
+    """Timing handle for one storage read or write."""
+
+    __slots__ = ("operation",)
+
+    def __init__(self, operation: str):
+        self.operation = operation
+
+    def payload(self, size: int) -> None:
+        STORAGE_PAYLOAD_BYTES.labels(self.operation).observe(size)
+
+
+@contextmanager
+def track_storage(operation: str) -> Iterator[StorageOperation]:
+    """Time a storage operation ("read" or "write") made inside the block."""
+    in_flight = STORAGE_IN_FLIGHT.labels(operation)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield StorageOperation(operation)
+    finally:
+        in_flight.dec()
+        STORAGE_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+
+def _route_label(scope: dict, root_path: str) -> str:
+    """Route template for the request, so paths with IDs share one series."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("endpoint") is not None:
+        # Mounted app (e.g. /static/audio): the mount path was appended to root_path
+        return scope.get("root_path", "")[len(root_path):] or "/"
+    return "unmatched"
+
+
+def track_cancelled(scope: dict, root_path: str, reason: str) -> None:
+    """Count a request whose work was cancelled ("client_disconnect" or "deadline")."""
+    REQUESTS_CANCELLED.labels(_route_label(scope, root_path), reason).inc()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight HTTP requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.labels(scope["method"], _route_label(scope, root_path), str(status)).observe(
+                time.perf_counter() - start
+            )
+
+
+def render_metrics() -> tuple:
+    """Return (body, content type) in the Prometheus text exposition format."""
+    return generate_latest(), CONTENT_TYPE_LATEST
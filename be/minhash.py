@@ -0,0 +1,112 @@
+"""MinHash signatures and an LSH index for finding near-duplicate texts.
+
+Texts are lowercased, stripped of punctuation and cut into overlapping
+character shingles. A signature keeps, for each of NUM_PERM hash
+functions, the smallest hash over the shingles; the fraction of equal
+positions in two signatures estimates the Jaccard similarity of their
+shingle sets. The index splits signatures into BANDS bands of ROWS
+positions and only compares texts that share a band exactly, so a lookup
+touches a handful of candidates instead of every stored text. With 16
+bands of 4 rows, pairs above about 0.5 similarity are very likely to
+become candidates; the caller's threshold decides the rest.
+
+NumPy is imported on first use so that it stays out of worker startup.
+"""
+import hashlib
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_CHARS = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def shingles(text: str) -> Set[str]:
+    normalized = " ".join(_PUNCTUATION.sub("", text.lower()).split())
+    if len(normalized) <= SHINGLE_CHARS:
+        return {normalized}
+    return {normalized[i:i + SHINGLE_CHARS] for i in range(len(normalized) - SHINGLE_CHARS + 1)}
+
+
+@lru_cache(maxsize=None)
+def _permutations() -> Tuple["np.ndarray", "np.ndarray"]:
+    import numpy as np
+
+    # Fixed seed: signatures must agree across processes and restarts
+    random = np.random.RandomState(1)
+    a = random.randint(1, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+    b = random.randint(0, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+def signature(text: str) -> "np.ndarray":
+    """MinHash signature of a text (NUM_PERM unsigned integers)."""
+    import numpy as np
+
+    a, b = _permutations()
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+         for shingle in shingles(text)),
+        dtype=np.uint64
+    )
+    # Universal hashing (a*x + b) mod p; uint64 products wrap, as in common MinHash implementations
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(a, hashes) + b[:, None]) % np.uint64(_MERSENNE_PRIME) & np.uint64(_MAX_HASH)
+    return permuted.min(axis=1)
+
+
+def similarity(first: "np.ndarray", second: "np.ndarray") -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float((first == second).sum()) / NUM_PERM
+
+
+class LSHIndex:
+    """Signatures by key, bucketed by band for candidate lookup."""
+
+    def __init__(self):
+        self._signatures: Dict[str, List["np.ndarray"]] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        self._order: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _bands(self, sig: "np.ndarray"):
+        for band in range(BANDS):
+            yield band, sig[band * ROWS:(band + 1) * ROWS].tobytes()
+
+    def add(self, key: str, sig: "np.ndarray") -> None:
+        """Index a signature under key. A key may be added again with another signature (a variant)."""
+        variants = self._signatures.get(key)
+        if variants is None:
+            self._signatures[key] = [sig]
+            self._order[key] = len(self._order)
+        elif not any((sig == variant).all() for variant in variants):
+            variants.append(sig)
+        for bucket in self._bands(sig):
+            keys = self._buckets.setdefault(bucket, [])
+            if key not in keys:
+                keys.append(key)
+
+    def query(self, sig: "np.ndarray", threshold: float) -> Optional[Tuple[str, float]]:
+        """The most similar indexed key at or above threshold, with its similarity, or None."""
+        candidates = set()
+        for bucket in self._bands(sig):
+            candidates.update(self._buckets.get(bucket, ()))
+        best: Optional[Tuple[str, float]] = None
+        # In insertion order, so ties go to the earliest key; a key scores its closest variant
+        for key in sorted(candidates, key=self._order.__getitem__):
+            score = max(similarity(sig, variant) for variant in self._signatures[key])
+            if score >= threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
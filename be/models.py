@@ -9,6 +9,8 @@ class IntentRequest(BaseModel):
     text: Optional[str] = None
     audio_file: Optional[str] = None  # Base64 encoded audio or file path
     generate_audio: bool = False
+    stream_audio: bool = False  # Return a stream URL instead of waiting for TTS
+    audio_format: Optional[str] = None  # TTS output format, e.g. opus_48000_32; server default if omitted
 
 
 class IntentResponse(BaseModel):
@@ -38,6 +40,10 @@ class PracticeSubmission(BaseModel):
     native_language: str = "en"
 
 
+class ChatSubmission(PracticeSubmission):
+    """Request model for a chat turn; omit session_id to start a new conversation."""
+    session_id: Optional[str] = None
+
 
 class ErrorItem(BaseModel):
     """Model for a single error in the text."""
@@ -64,6 +70,8 @@ class NotebookEntry(BaseModel):
     topic: Optional[str] = None
     practice_language: str
     native_language: str
+    repeat_count: int = 1  # Near-duplicate submissions merged into this entry, itself included
+    duplicate_of: Optional[str] = None  # Set when linked to an earlier near-duplicate entry
 
 
 class PracticeResponse(BaseModel):
@@ -140,6 +148,9 @@ class ScenarioRequest(BaseModel):
     practice_language: str = "en"
     native_language: str = "en"
     generate_audio: bool = True  # Whether to generate TTS
+    stream_audio: bool = False  # Return a stream URL instead of waiting for TTS
+    pipeline_audio: bool = False  # Synthesize sentence by sentence, return after the first (MP3 formats only)
+    audio_format: Optional[str] = None  # TTS output format, e.g. opus_48000_32; server default if omitted
 
 
 class ScenarioResponse(BaseModel):
@@ -147,4 +158,5 @@ class ScenarioResponse(BaseModel):
     scenario_text: str
     task_instructions: str
     practice_language: str
-    audio_url: Optional[str] = None  # TTS audio of the scenario
\ No newline at end of file
+    audio_url: Optional[str] = None  # TTS audio of the scenario
+    playlist_url: Optional[str] = None  # Ordered segments when pipelined
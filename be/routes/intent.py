@@ -1,14 +1,18 @@
 """Routes for intent recognition and confirmation."""
+import logging
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
 from typing import Optional
 from ..models import IntentRequest, IntentResponse, IntentConfirmRequest, IntentConfirmResponse, AudioTranscribeResponse
-from be.services.tts_service import text_to_speech
+from be.services.tts_service import text_to_speech, register_stream, resolve_output_format
 from be.services.stt_service import speech_to_text
+from be.log import redact
 # from be.services.auth_service import verify_token
 # from ..storage import get_user_by_id
 # from be.routes.auth import get_current_user
 
 router = APIRouter(prefix="/api/intent", tags=["intent"])
+logger = logging.getLogger(__name__)
+
 @router.post("/transcribe", response_model=AudioTranscribeResponse)
 async def transcribe_audio(
     audio: UploadFile = File(...),
@@ -18,12 +22,11 @@ async def transcribe_audio(
     Transcribe audio to text using ElevenLabs STT.
     """
     try:
-        print(f"📥 Received audio: {audio.filename}, content_type: {audio.content_type}")
+        logger.debug("Received audio", extra={"upload_name": audio.filename, "content_type": audio.content_type})
         
         # Read audio file
         audio_data = await audio.read()
         
-        print(f"📊 Audio size: {len(audio_data)} bytes")
         
         if len(audio_data) == 0:
             raise HTTPException(status_code=400, detail="Audio file is empty")
@@ -32,7 +35,7 @@ async def transcribe_audio(
             raise HTTPException(status_code=400, detail="Audio file too large (max 25MB)")
         
         # Transcribe using ElevenLabs STT
-        print(f"🎤 Transcribing in language: {language}")
+        logger.debug("Transcribing audio", extra={"bytes": len(audio_data), "language": language})
         transcript = await speech_to_text(audio_data, language)
         
         if not transcript or transcript.strip() == "":
@@ -41,7 +44,7 @@ async def transcribe_audio(
                 detail="Could not transcribe audio. Please speak clearly and try again."
             )
         
-        print(f"✅ Transcription: {transcript}")
+        logger.debug("Transcription", extra={"transcript": redact(transcript)})
         
         return AudioTranscribeResponse(
             text=transcript,
@@ -51,7 +54,7 @@ async def transcribe_audio(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Transcription error: {str(e)}")
+        logger.error("Transcription error", extra={"error": str(e)})
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
 
 
@@ -116,10 +119,17 @@ async def recognize_intent(request: IntentRequest):
     
     audio_url = None
     if request.generate_audio:
+        try:
+            output_format = resolve_output_format(request.audio_format)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         # Generate TTS audio in practice language saying "You said: [text]"
         # Translate the prompt to practice language or keep it simple
         tts_text = f"You said: {text}"
-        audio_url = await text_to_speech(tts_text)
+        if request.stream_audio:
+            audio_url = await register_stream(tts_text, output_format)
+        else:
+            audio_url = await text_to_speech(tts_text, output_format=output_format)
     
     return IntentResponse(
         text=text,
@@ -0,0 +1,75 @@
+"""Routes for following background jobs started with ?async=true."""
+import json
+import time
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from be.services.job_service import FINISHED_STATUSES, get_job_queue
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+# Comment line sent when nothing changed, so proxies keep the stream open
+HEARTBEAT_SECONDS = 15
+
+
+@router.get("/stats")
+async def get_job_stats():
+    """
+    Report the worker pool size and job counts by status.
+    """
+    return await get_job_queue().stats()
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """
+    Return a job's status and current stage; once finished, its result or error.
+    """
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-sent events for a job: a `progress` event whenever its status or
+    stage changes and a final `done` event with the full job.
+    """
+    queue = get_job_queue()
+    job = await queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        current = job
+        last_state = None
+        last_sent = time.monotonic()
+        while True:
+            if current is None:
+                # Purged while we were watching
+                yield "event: done\ndata: null\n\n"
+                return
+            if current["status"] in FINISHED_STATUSES:
+                yield f"event: done\ndata: {json.dumps(current)}\n\n"
+                return
+            state = (current["status"], current["stage"])
+            if state != last_state:
+                last_state = state
+                last_sent = time.monotonic()
+                progress = {"job_id": job_id, "status": current["status"], "stage": current["stage"]}
+                yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+            elif time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+                last_sent = time.monotonic()
+                yield ": heartbeat\n\n"
+            # Jobs run by other workers don't wake us, so re-read at least every second
+            await queue.wait_for_change(1.0)
+            current = await queue.get(job_id)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,21 +1,74 @@
-"""Routes for notes CRUD operations."""
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+"""Routes for notes CRUD operations.
+
+Responses carry a strong ETag built from the storage version and the
+representation (media type and content encoding). A matching
+If-None-Match is answered 304 after reading only the version, and
+compressed bodies are cached per version.
+"""
+from collections import OrderedDict
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from typing import Any, Callable, List, Optional, Tuple
 from ..models import NotebookEntry, NotebookListResponse
-from ..storage import get_all_entries, get_entry_by_id
+from ..serialization import encode_body, negotiate_encoding, negotiate_media_type, serialize
+from ..storage import get_all_entries, get_entry_by_id, get_storage_version
 # from be.routes.auth import get_current_user
 
 router = APIRouter(prefix="/api/notes", tags=["notes"])
 
+# Encoded bodies by (resource, version, media type, encoding); older versions age out
+MAX_CACHED_BODIES = 64
+_bodies: "OrderedDict[tuple, Tuple[bytes, Optional[str]]]" = OrderedDict()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 specifies for If-None-Match
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _versioned_response(request: Request, resource: str, build: Callable[[], Any]) -> Response:
+    """Answer 304, a cached body or a freshly built one for the current storage version."""
+    # Read before building, so a body is never cached under a newer version than its content
+    version = get_storage_version()
+    media_type = negotiate_media_type(request)
+    encoding = negotiate_encoding(request)
+    etag = f'"v{version}-{media_type.rsplit("/", 1)[-1]}-{encoding or "identity"}"'
+    headers = {"ETag": etag, "Vary": "Accept, Accept-Encoding", "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (resource, version, media_type, encoding)
+    cached = _bodies.get(key)
+    if cached is None:
+        cached = encode_body(serialize(build(), media_type), encoding)
+        _bodies[key] = cached
+        while len(_bodies) > MAX_CACHED_BODIES:
+            _bodies.popitem(last=False)
+    else:
+        _bodies.move_to_end(key)
+
+    body, content_encoding = cached
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
 @router.get("/", response_model=NotebookListResponse)
-async def get_notes():
-    notes = get_all_entries()
-    notes.sort(key=lambda x: x.timestamp, reverse=True)
-    
-    return NotebookListResponse(
-        notes=notes,
-        count=len(notes)
-    )
+async def get_notes(request: Request):
+    def build():
+        notes = get_all_entries()
+        notes.sort(key=lambda x: x.timestamp, reverse=True)
+        # Entries come from trusted storage; serialize them directly (shape of NotebookListResponse)
+        return {
+            "notes": notes,
+            "count": len(notes)
+        }
+
+    return _versioned_response(request, "notes", build)
 
 # @router.get("/", response_model=NotebookListResponse)
 # async def list_notes(user_id: str = Depends(get_current_user)):
@@ -33,17 +86,20 @@ async def get_notes():
 
 
 @router.get("/{entry_id}", response_model=NotebookEntry)
-async def get_note(entry_id: str):
+async def get_note(entry_id: str, request: Request):
     """
     Fetch one notebook entry by ID (only if it belongs to the current user).
     """
-    entry = get_entry_by_id(entry_id)
-    
-    if not entry:
-        raise HTTPException(status_code=404, detail=f"Note with ID {entry_id} not found")
-    
-    # Verify entry belongs to user
-    # if entry.user_id != user_id:
-    #     raise HTTPException(status_code=403, detail="Access denied")
-    
-    return entry
+    def build():
+        entry = get_entry_by_id(entry_id)
+        
+        if not entry:
+            raise HTTPException(status_code=404, detail=f"Note with ID {entry_id} not found")
+        
+        # Verify entry belongs to user
+        # if entry.user_id != user_id:
+        #     raise HTTPException(status_code=403, detail="Access denied")
+        
+        return entry
+
+    return _versioned_response(request, f"note:{entry_id}", build)
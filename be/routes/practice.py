@@ -1,24 +1,66 @@
 """Routes for practice submission."""
+import asyncio
+import logging
 import os
 import shutil
-from fastapi import APIRouter, File, Form, HTTPException, Depends, UploadFile
-from datetime import datetime
+import uuid
+from fastapi import APIRouter, File, Form, HTTPException, Depends, Query, Request, UploadFile
+from fastapi.responses import JSONResponse
 
-from be.config import AUDIO_DIR
-from ..models import PracticeSubmission, PracticeResponse, NotebookEntry
-from ..storage import add_entry, generate_entry_id
-from be.services.analyze_service import analyze_text, transcribe_audio
+from be.config import get_settings
+from be.log import redact
+from ..models import ChatSubmission, PracticeSubmission, PracticeResponse
+from ..serialization import fast_response
+from be.services.analyze_service import analyze_text
+from be.services.chat_session_service import history_messages, load_session, new_session, record_turn
+from be.services.job_service import QueueFull, get_job_queue
+from be.services.practice_service import analyze_and_save, transcribe_analyze_and_save
+from be.services.tutor_service import generate_tutor_reply
 # from be.routes.auth import get_current_user
 from be.services.language_service import is_language_supported
 
 
 router = APIRouter(prefix="/api/practice", tags=["practice"])
+logger = logging.getLogger(__name__)
+
+# Retry-After sent when the job queue is full
+QUEUE_FULL_RETRY_SECONDS = 30
+
+
+async def _enqueue(kind: str, payload: dict) -> JSONResponse:
+    """Queue a background job and answer 202 with where to follow it."""
+    try:
+        job = await get_job_queue().submit(kind, payload)
+    except QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many requests are waiting. Please try again later.",
+            headers={"Retry-After": str(QUEUE_FULL_RETRY_SECONDS)}
+        )
+    status_url = f"/api/jobs/{job['job_id']}"
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "status_url": status_url,
+            "events_url": f"{status_url}/events"
+        },
+        headers={"Location": status_url}
+    )
 
 
 @router.post("/submit", response_model=PracticeResponse)
-async def submit_practice(submission: PracticeSubmission):
+async def submit_practice(
+    submission: PracticeSubmission,
+    request: Request,
+    async_mode: bool = Query(False, alias="async")
+):
     """
     Accept user text, analyze it with GPT using user's language preferences, and save as a notebook entry.
+
+    With ?async=true the request is queued and answered with 202 and a job
+    id; the job's result has the same shape as this response.
     """
     if not submission.text or not submission.text.strip():
         raise HTTPException(status_code=400, detail="Text cannot be empty")
@@ -39,53 +81,46 @@ async def submit_practice(submission: PracticeSubmission):
             status_code=400,
             detail=f"Sorry, we currently don't support '{submission.native_language}' as a native language. Please choose from our supported languages."
         )
+    if async_mode:
+        return await _enqueue("practice_submit", submission.model_dump())
+
     try:
-        # Analyze the text using GPT with user's language preferences
-        analysis = await analyze_text(
+        # Analyze the text using GPT with user's language preferences, then save it
+        entry = await analyze_and_save(
             submission.text,
-            practice_language=submission.practice_language,
-            native_language=submission.native_language
-        )
-        
-        # Create notebook entry
-        entry = NotebookEntry(
-            id=generate_entry_id(),
-            timestamp=datetime.now(),
-            original_text=submission.text,
-            improved_text=analysis["improved_text"],
-            errors=analysis["errors"],
-            difficult_words=analysis["difficult_words"],
-            topic=submission.topic,
-            practice_language=submission.practice_language,
-            native_language=submission.native_language
+            submission.topic,
+            submission.practice_language,
+            submission.native_language
         )
         
-        # Save to storage
-        add_entry(entry)
-        
-        return PracticeResponse(
-            success=True,
-            entry=entry,
-            message="Practice submitted and analyzed successfully"
-        )
+        return fast_response(request, {
+            "success": True,
+            "entry": entry,
+            "message": "Practice submitted and analyzed successfully"
+        })
         
     except ValueError as e:
         # Configuration errors (e.g., missing API key)
         error_msg = str(e)
-        print(f"Configuration error: {error_msg}")
+        logger.error("Configuration error", extra={"error": error_msg})
         raise HTTPException(status_code=500, detail="Service configuration error. Please contact support.")
     except Exception as e:
         # Log full error for debugging (server-side only)
         error_msg = str(e)
-        print(f"Error processing practice: {error_msg}")
+        logger.error("Error processing practice", extra={"error": error_msg})
         # Return generic error (don't expose internal details)
         raise HTTPException(status_code=500, detail="Failed to process practice. Please try again.")
 
 @router.post("/chat")
-async def chat_with_ai(submission: PracticeSubmission):
+async def chat_with_ai(submission: ChatSubmission):
     """
     Chat endpoint - analyzes user text and returns feedback without saving to notebook.
     This is for real-time practice feedback.
+
+    It also answers as a conversation partner. The conversation is kept
+    server-side under the returned session_id; send it back with the next
+    turn instead of resending earlier messages. An unknown or expired id
+    starts a new session.
     """
     if not submission.text or not submission.text.strip():
         raise HTTPException(status_code=400, detail="Text cannot be empty")
@@ -103,6 +138,24 @@ async def chat_with_ai(submission: PracticeSubmission):
             detail=f"Sorry, we currently don't support '{submission.native_language}'"
         )
     
+    session = await load_session(submission.session_id)
+    if session is None:
+        session = new_session(submission.practice_language, submission.native_language, submission.topic)
+    else:
+        session.update(
+            practice_language=submission.practice_language,
+            native_language=submission.native_language,
+            topic=submission.topic
+        )
+
+    # The reply is written alongside the analysis; it only needs the history
+    reply_task = asyncio.create_task(generate_tutor_reply(
+        submission.text,
+        practice_language=submission.practice_language,
+        native_language=submission.native_language,
+        topic=submission.topic,
+        history=history_messages(session, submission.text)
+    ))
     try:
         # Analyze the text using GPT
         analysis = await analyze_text(
@@ -110,40 +163,67 @@ async def chat_with_ai(submission: PracticeSubmission):
             practice_language=submission.practice_language,
             native_language=submission.native_language
         )
-        
+
+        try:
+            reply = await reply_task
+        except Exception as e:
+            # Feedback is still useful without a reply; the turn is not recorded
+            logger.error("Error generating chat reply", extra={"error": str(e)})
+            reply = None
+        if reply is not None:
+            await record_turn(session, submission.text, reply)
+
         # Return analysis without saving
         return {
             "success": True,
+            "session_id": session["id"],
+            "reply": reply,
             "original_text": submission.text,
             "improved_text": analysis["improved_text"],
             "errors": analysis["errors"],
             "difficult_words": analysis["difficult_words"],
             "feedback": f"Great practice! I found {len(analysis['errors'])} areas for improvement.",
             "practice_language": submission.practice_language,
-            "native_language": submission.native_language
+            "native_language": submission.native_language,
+            # Sentences, tokens and latency reused from earlier submissions
+            "reuse": analysis["reuse"]
         }
         
     except ValueError as e:
         error_msg = str(e)
-        print(f"Configuration error: {error_msg}")
+        logger.error("Configuration error", extra={"error": error_msg})
         raise HTTPException(status_code=500, detail="Service configuration error.")
     except Exception as e:
         error_msg = str(e)
-        print(f"Error in chat: {error_msg}")
+        logger.error("Error in chat", extra={"error": error_msg})
         raise HTTPException(status_code=500, detail="Failed to process your message.")
+    finally:
+        reply_task.cancel()
 
 @router.post("/voice")
 async def process_voice(
+    request: Request,
     file: UploadFile = File(...), 
     topic: str = Form("General"),
     practice_language: str = Form(...),
-    native_language: str = Form(...)
+    native_language: str = Form(...),
+    async_mode: bool = Query(False, alias="async")
 ):
     """
     Accept audio blob, transcribe with Whisper, analyze, and return.
+
+    With ?async=true the upload is stored with the job and the request is
+    answered with 202 and a job id.
     """
-    print(f"Received audio upload: {file.filename}, Content-Type: {file.content_type}")
-    print(f"Practice Language: {practice_language}, Native Language: {native_language}")
+    logger.debug(
+        "Received audio upload",
+        extra={
+            "upload_name": file.filename,
+            "content_type": file.content_type,
+            "practice_language": practice_language,
+            "native_language": native_language
+        }
+    )
      # Validate languages
     if not is_language_supported(practice_language):
         raise HTTPException(
@@ -166,58 +246,56 @@ async def process_voice(
     if not ext:
         ext = ".webm" # Default for browser recording
         
-    temp_filename = f"upload_{int(datetime.now().timestamp())}{ext}"
-    temp_path = AUDIO_DIR / temp_filename
+    # Unique per request; concurrent uploads in the same second must not share a file
+    temp_filename = f"upload_{uuid.uuid4().hex}{ext}"
+
+    if async_mode:
+        # Kept outside AUDIO_DIR (which is served publicly) until the job is done
+        upload_path = get_settings().STORAGE_DIR / "job_uploads" / temp_filename
+        upload_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(upload_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        try:
+            return await _enqueue("practice_voice", {
+                "audio_path": str(upload_path),
+                "topic": topic,
+                "practice_language": practice_language,
+                "native_language": native_language
+            })
+        except HTTPException:
+            upload_path.unlink(missing_ok=True)
+            raise
+
+    temp_path = get_settings().AUDIO_DIR / temp_filename
     
     try:
         with open(temp_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
             
-        print(f"Saved audio to {temp_path}, Size: {os.path.getsize(temp_path)} bytes")
+        logger.debug("Saved audio upload", extra={"file": temp_path.name, "bytes": os.path.getsize(temp_path)})
         
-        # Transcribe
-        transcript = await transcribe_audio(temp_path)
-        
-        if not transcript.strip():
-            raise HTTPException(status_code=400, detail="Could not transcribe audio (empty result)")
-            
-        print(f"Transcribed Text: {transcript}")
-        
-        # Reuse existing submission logic
-        # We can construct the proper response manually to include transcript
-        
-        analysis = await analyze_text(
-            transcript,
-            practice_language=practice_language,
-            native_language=native_language
-            )
-        
-        entry = NotebookEntry(
-            id=generate_entry_id(),
-            timestamp=datetime.now(),
-            original_text=transcript,
-            improved_text=analysis["improved_text"],
-            errors=analysis["errors"],
-            difficult_words=analysis["difficult_words"],
-            topic=topic,
-            practice_language=practice_language,
-            native_language=native_language
+        # Transcribe, analyze and save
+        transcript, entry = await transcribe_analyze_and_save(
+            temp_path,
+            topic,
+            practice_language,
+            native_language
         )
-        
-        add_entry(entry)
+            
+        logger.debug("Transcribed voice upload", extra={"transcript": redact(transcript)})
         
         # Clean up temp file
         os.remove(temp_path)
         
-        return {
+        return fast_response(request, {
             "success": True,
             "transcript": transcript,
             "entry": entry,
             "message": "Voice processed successfully"
-        }
+        })
 
     except Exception as e:
-        print(f"Voice processing error: {str(e)}")
+        logger.error("Voice processing error", extra={"error": str(e)})
         # Try to clean up
         if os.path.exists(temp_path):
             os.remove(temp_path)
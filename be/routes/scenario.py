@@ -1,13 +1,57 @@
 """Routes for AI-generated practice scenarios."""
+import asyncio
+from typing import Optional, Tuple
 from fastapi import APIRouter, HTTPException
 from ..models import ScenarioRequest, ScenarioResponse
 from be.services.scenario_service import generate_scenario
-from be.services.tts_service import text_to_speech
+from be.services.tts_service import cached_audio_url, text_to_speech, register_stream, resolve_output_format
+from be.services.tts_pipeline_service import synthesize_pipelined, PLAYLIST_URL_PREFIX
 from be.services.language_service import is_language_supported
+from be.services.scenario_pool_service import get_scenario_pool
+from be.services.scenario_index_service import get_scenario_index
 
 router = APIRouter(prefix="/api/scenario", tags=["scenario"])
 
 
+async def _render_audio(request: ScenarioRequest, scenario_text: str) -> Tuple[Optional[str], Optional[str]]:
+    """Synthesize scenario audio; returns (audio_url, playlist_url)."""
+    # Segments are joined into one file for playlist streaming; chained Ogg Opus
+    # streams are rejected by Safari and several players, so only MP3 is pipelined
+    if request.pipeline_audio and resolve_output_format(request.audio_format).startswith("mp3"):
+        # Return the first sentence's audio, render the rest in the background
+        playlist = await synthesize_pipelined(
+            scenario_text,
+            language=request.practice_language,
+            output_format=request.audio_format
+        )
+        if not playlist:
+            return None, None
+        return playlist.audio_urls[0], f"{PLAYLIST_URL_PREFIX}/{playlist.id}"
+
+    # Generate TTS for the scenario in the practice language
+    audio_url = await text_to_speech(
+        scenario_text,
+        language=request.practice_language,
+        output_format=request.audio_format
+    )
+    return audio_url, None
+
+
+async def _pooled_audio(request: ScenarioRequest, scenario_text: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Audio for a pooled or indexed scenario; returns (audio_url, playlist_url).
+    It was pre-rendered in the default format only, so other formats are
+    streamed or rendered as on a miss.
+    """
+    if request.stream_audio:
+        # Returns the stored file directly when it exists
+        return await register_stream(scenario_text, request.audio_format), None
+    audio_url = cached_audio_url(scenario_text, request.audio_format)
+    if audio_url is not None:
+        return audio_url, None
+    return await _render_audio(request, scenario_text)
+
+
 @router.post("/generate", response_model=ScenarioResponse)
 async def create_scenario(request: ScenarioRequest):
     """
@@ -26,31 +70,100 @@ async def create_scenario(request: ScenarioRequest):
             status_code=400,
             detail=f"Sorry, we currently don't support '{request.native_language}' as a native language."
         )
+    try:
+        resolve_output_format(request.audio_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Generate scenario with OpenAI
-    scenario_data = await generate_scenario(
+    # Serve a pre-generated scenario for popular topics, or one generated
+    # earlier for a near-duplicate topic
+    pooled = get_scenario_pool().take(
+        request.user_input,
+        request.practice_language,
+        request.native_language
+    ) or get_scenario_index().lookup(
         request.user_input,
         request.practice_language,
         request.native_language
     )
-    
-    if not scenario_data:
-        raise HTTPException(
-            status_code=500,
-            detail="Failed to generate scenario. Please try again."
+    if pooled:
+        audio_url = None
+        playlist_url = None
+        if request.generate_audio:
+            audio_url, playlist_url = await _pooled_audio(request, pooled["scenario_text"])
+        return ScenarioResponse(
+            scenario_text=pooled["scenario_text"],
+            task_instructions=pooled["task_instructions"],
+            practice_language=pooled["practice_language"],
+            audio_url=audio_url,
+            playlist_url=playlist_url
         )
-    
+
+    # Start TTS as soon as the SCENARIO line has streamed in, while the
+    # TASK line is still being generated
+    audio_task: Optional[asyncio.Task] = None
+
+    def start_audio(scenario_text: str) -> None:
+        nonlocal audio_task
+        if request.generate_audio and not request.stream_audio and audio_task is None:
+            audio_task = asyncio.create_task(_render_audio(request, scenario_text))
+
     audio_url = None
-    if request.generate_audio:
-        # Generate TTS for the scenario in the practice language
-        audio_url = await text_to_speech(
-            scenario_data["scenario_text"],
-            language=request.practice_language
+    playlist_url = None
+    try:
+        # Generate scenario with OpenAI
+        scenario_data = await generate_scenario(
+            request.user_input,
+            request.practice_language,
+            request.native_language,
+            on_scenario_text=start_audio
         )
-    
+
+        if not scenario_data:
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to generate scenario. Please try again."
+            )
+
+        # Covers completions where the SCENARIO line never streamed in on its own
+        start_audio(scenario_data["scenario_text"])
+        get_scenario_index().add(
+            request.user_input,
+            request.practice_language,
+            request.native_language,
+            scenario_data
+        )
+
+        if request.generate_audio and request.stream_audio:
+            # Let the client start playback while synthesis streams
+            audio_url = await register_stream(scenario_data["scenario_text"], request.audio_format)
+        elif audio_task is not None:
+            audio_url, playlist_url = await audio_task
+    finally:
+        # Failed, raised or cancelled before the audio was awaited: stop paying for it
+        if audio_task is not None and not audio_task.done():
+            audio_task.cancel()
+
     return ScenarioResponse(
         scenario_text=scenario_data["scenario_text"],
         task_instructions=scenario_data["task_instructions"],
         practice_language=scenario_data["practice_language"],
-        audio_url=audio_url
-    )
\ No newline at end of file
+        audio_url=audio_url,
+        playlist_url=playlist_url
+    )
+
+
+@router.get("/pool/stats")
+async def get_pool_stats():
+    """
+    Report scenario pool hit rate, pool levels and refill lag.
+    """
+    return get_scenario_pool().stats()
+
+
+@router.get("/index/stats")
+async def get_index_stats():
+    """
+    Report similarity index hit rate, evictions and size per practice language.
+    """
+    return get_scenario_index().stats()
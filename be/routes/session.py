@@ -0,0 +1,336 @@
+"""Full-duplex WebSocket conversation sessions."""
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, BinaryIO, Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from be.services.stt_service import speech_to_text
+from be.services.analyze_service import analyze_text
+from be.services.tutor_service import stream_tutor_reply
+from be.metrics import AUDIO_TURN_BYTES
+from be.services.tts_service import (
+    tts_cache_key,
+    audio_path_for_key,
+    audio_url_for_key,
+    metered,
+    open_speech_stream,
+    resolve_output_format,
+    SpeechStreamError
+)
+from be.services.language_service import is_language_supported
+from be.services.audio_lifecycle_service import get_audio_manager
+
+router = APIRouter(prefix="/api", tags=["session"])
+logger = logging.getLogger(__name__)
+
+MAX_TURN_AUDIO_BYTES = 25_000_000  # Same limit as /api/intent/transcribe
+AUDIO_CHUNK_SIZE = 32 * 1024
+
+
+def _elapsed_ms(started: float) -> int:
+    return round((time.perf_counter() - started) * 1000)
+
+
+class SessionClosed(Exception):
+    """The socket went away while the session was sending."""
+
+
+class ConversationSession:
+    """
+    State of one WebSocket conversation.
+
+    Protocol (client -> server):
+        {"type": "start", "practice_language", "native_language", "topic", "audio_format"}
+        binary frames with recorded audio for the current turn
+        {"type": "end_turn"} to process the buffered audio
+        {"type": "text", "text": ...} to run a turn without STT
+        {"type": "cancel"} to stop the turn in progress
+
+    Server -> client, per turn, as each stage finishes:
+        transcript, analysis, reply_delta..., reply, binary audio chunks,
+        audio_end, timings (or error with the failing stage); timings include
+        the reply audio bytes sent
+
+    Turns run in the background while the socket keeps being read, so audio
+    for the next turn can be sent while a reply plays. Starting a turn
+    (barge-in) or cancelling stops the one in progress, which is answered
+    with {"type": "cancelled"}.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.practice_language = "en"
+        self.native_language = "en"
+        self.topic: Optional[str] = None
+        self.audio_format = resolve_output_format(None)
+        self.audio = bytearray()
+        self._send_lock = asyncio.Lock()
+        self._turn: Optional[asyncio.Task] = None
+
+    async def send_json(self, message: dict) -> None:
+        async with self._send_lock:
+            try:
+                await self.websocket.send_json(message)
+            except Exception as e:
+                raise SessionClosed() from e
+
+    async def send_bytes(self, data: bytes) -> None:
+        async with self._send_lock:
+            try:
+                await self.websocket.send_bytes(data)
+            except Exception as e:
+                raise SessionClosed() from e
+
+    async def start_turn(self, text: Optional[str] = None) -> None:
+        """Stop any turn in progress and run a new one in the background."""
+        await self.cancel_turn()
+        audio_data = b""
+        if text is None:
+            audio_data = bytes(self.audio)
+            self.audio.clear()
+        self._turn = asyncio.create_task(self._run_turn_until_closed(text, audio_data))
+
+    async def cancel_turn(self) -> bool:
+        """Stop the turn in progress; returns whether there was one."""
+        turn = self._turn
+        self._turn = None
+        if turn is None or turn.done():
+            return False
+        turn.cancel()
+        await asyncio.gather(turn, return_exceptions=True)
+        await self.send_json({"type": "cancelled"})
+        return True
+
+    def close(self) -> None:
+        """Stop the turn in progress without notifying the client (it is gone)."""
+        if self._turn is not None:
+            self._turn.cancel()
+
+    async def _run_turn_until_closed(self, text: Optional[str], audio_data: bytes) -> None:
+        try:
+            await self.run_turn(text, audio_data)
+        except SessionClosed:
+            logger.debug("Session closed mid-turn")
+
+    def configure(self, message: dict) -> Optional[str]:
+        """Apply a start message; returns an error detail if it is invalid."""
+        practice_language = message.get("practice_language", self.practice_language)
+        native_language = message.get("native_language", self.native_language)
+        if not is_language_supported(practice_language):
+            return f"Sorry, we currently don't support '{practice_language}'"
+        if not is_language_supported(native_language):
+            return f"Sorry, we currently don't support '{native_language}'"
+        try:
+            audio_format = resolve_output_format(message.get("audio_format", self.audio_format))
+        except ValueError as e:
+            return str(e)
+        self.audio_format = audio_format
+        self.practice_language = practice_language
+        self.native_language = native_language
+        self.topic = message.get("topic", self.topic)
+        return None
+
+    async def run_turn(self, text: Optional[str] = None, audio_data: bytes = b"") -> None:
+        """Run STT, then analysis and reply concurrently, then stream the reply audio."""
+        timings = {}
+        turn_started = time.perf_counter()
+
+        if text is None:
+            if not audio_data:
+                await self.send_json({"type": "error", "stage": "stt", "detail": "Audio is empty"})
+                return
+            started = time.perf_counter()
+            text = await speech_to_text(audio_data, self.practice_language)
+            timings["stt_ms"] = _elapsed_ms(started)
+            if not text or not text.strip():
+                await self.send_json({
+                    "type": "error",
+                    "stage": "stt",
+                    "detail": "Could not transcribe audio. Please speak clearly and try again."
+                })
+                return
+
+        await self.send_json({"type": "transcript", "text": text})
+
+        analysis_task = asyncio.create_task(self._send_analysis(text, timings))
+        try:
+            reply = await self._send_reply(text, timings)
+            if reply:
+                await self._send_reply_audio(reply, timings)
+            await analysis_task
+        finally:
+            # Only still running if the turn was cancelled or the socket failed
+            analysis_task.cancel()
+
+        timings["total_ms"] = _elapsed_ms(turn_started)
+        await self.send_json({"type": "timings", **timings})
+
+    async def _send_analysis(self, text: str, timings: dict) -> None:
+        started = time.perf_counter()
+        try:
+            analysis = await analyze_text(
+                text,
+                practice_language=self.practice_language,
+                native_language=self.native_language
+            )
+        except Exception as e:
+            logger.error("Session analysis error", extra={"error": str(e)})
+            await self.send_json({"type": "error", "stage": "analysis", "detail": "Failed to analyze text."})
+            return
+        finally:
+            timings["analysis_ms"] = _elapsed_ms(started)
+
+        await self.send_json({
+            "type": "analysis",
+            "improved_text": analysis["improved_text"],
+            "errors": [error.model_dump() for error in analysis["errors"]],
+            "difficult_words": [word.model_dump() for word in analysis["difficult_words"]]
+        })
+
+    async def _send_reply(self, text: str, timings: dict) -> Optional[str]:
+        started = time.perf_counter()
+        reply = ""
+        try:
+            async for delta in stream_tutor_reply(
+                text,
+                practice_language=self.practice_language,
+                native_language=self.native_language,
+                topic=self.topic
+            ):
+                if not reply:
+                    timings["reply_first_token_ms"] = _elapsed_ms(started)
+                reply += delta
+                await self.send_json({"type": "reply_delta", "text": delta})
+        except SessionClosed:
+            raise
+        except Exception as e:
+            logger.error("Session reply error", extra={"error": str(e)})
+            await self.send_json({"type": "error", "stage": "reply", "detail": "Failed to generate reply."})
+            return None
+        finally:
+            timings["reply_ms"] = _elapsed_ms(started)
+
+        await self.send_json({"type": "reply", "text": reply})
+        return reply
+
+    async def _send_reply_audio(self, reply: str, timings: dict) -> None:
+        started = time.perf_counter()
+        key = tts_cache_key(reply, self.audio_format)
+        audio_path = audio_path_for_key(key, self.audio_format)
+        first_chunk = True
+        sent = 0
+
+        try:
+            # Opened straight away: a sweep could delete the file between a check and a later open
+            audio_file = open(audio_path, "rb")
+        except FileNotFoundError:
+            audio_file = None
+
+        if audio_file is not None:
+            get_audio_manager().touch(audio_path.name)
+            chunks = _read_file_chunks(audio_file, audio_path.name)
+        else:
+            chunks = await open_speech_stream(reply, self.audio_format)
+            if chunks is None:
+                await self.send_json({"type": "error", "stage": "tts", "detail": "Failed to generate audio."})
+                return
+
+        try:
+            async for chunk in metered(chunks, "session", self.audio_format):
+                if first_chunk:
+                    timings["tts_first_chunk_ms"] = _elapsed_ms(started)
+                    first_chunk = False
+                await self.send_bytes(chunk)
+                sent += len(chunk)
+        except SpeechStreamError:
+            # The client already has part of the audio; tell it the rest is not coming
+            await self.send_json({"type": "error", "stage": "tts", "detail": "Audio stream was interrupted."})
+            return
+
+        timings["tts_ms"] = _elapsed_ms(started)
+        timings["audio_bytes"] = sent
+        timings["audio_format"] = self.audio_format
+        AUDIO_TURN_BYTES.labels(self.audio_format).observe(sent)
+        await self.send_json({"type": "audio_end", "audio_url": audio_url_for_key(key, self.audio_format)})
+
+
+async def _read_file_chunks(f: BinaryIO, name: str) -> AsyncIterator[bytes]:
+    with get_audio_manager().pin(name), f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, AUDIO_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _parse_message(text: Optional[str]) -> dict:
+    """Parse a JSON control message."""
+    try:
+        event = json.loads(text or "")
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON")
+    if not isinstance(event, dict):
+        raise ValueError("Expected an object")
+    return event
+
+
+@router.websocket("/session")
+async def conversation_session(websocket: WebSocket):
+    """
+    Voice conversation over one socket: audio in, then correction analysis,
+    tutor reply text and spoken reply audio out, each streamed as soon as
+    it is ready, followed by per-stage timings for the turn.
+    """
+    await websocket.accept()
+    session = ConversationSession(websocket)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("bytes") is not None:
+                session.audio.extend(message["bytes"])
+                if len(session.audio) > MAX_TURN_AUDIO_BYTES:
+                    session.audio.clear()
+                    await session.send_json({
+                        "type": "error",
+                        "stage": "upload",
+                        "detail": "Audio file too large (max 25MB)"
+                    })
+                continue
+
+            try:
+                event = _parse_message(message.get("text"))
+            except ValueError:
+                await session.send_json({"type": "error", "stage": "protocol", "detail": "Invalid message"})
+                continue
+
+            event_type = event.get("type")
+            if event_type == "start":
+                error = session.configure(event)
+                if error:
+                    await session.send_json({"type": "error", "stage": "protocol", "detail": error})
+                else:
+                    await session.send_json({"type": "ready"})
+            elif event_type == "end_turn":
+                await session.start_turn()
+            elif event_type == "text":
+                text = event.get("text")
+                if isinstance(text, str) and text.strip():
+                    await session.start_turn(text=text)
+                else:
+                    await session.send_json({"type": "error", "stage": "protocol", "detail": "Text must be a non-empty string"})
+            elif event_type == "cancel":
+                await session.cancel_turn()
+            else:
+                await session.send_json({"type": "error", "stage": "protocol", "detail": "Unknown message type"})
+    except (WebSocketDisconnect, SessionClosed):
+        pass
+    finally:
+        # Stop upstream work nobody will receive
+        session.close()
+
@@ -0,0 +1,97 @@
+"""Routes for streaming text-to-speech playback."""
+import re
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import RedirectResponse, StreamingResponse
+from be.services.warmup_service import get_phrase, phrase_audio_url
+from be.services.tts_pipeline_service import get_playlist, stream_playlist
+from be.services.tts_service import (
+    audio_path_for_key,
+    audio_url_for_key,
+    get_stream_text,
+    media_type_for_format,
+    metered,
+    open_speech_stream,
+    resolve_output_format
+)
+
+router = APIRouter(prefix="/api/tts", tags=["tts"])
+
+CACHE_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+@router.get("/stream/{key}")
+async def stream_audio(key: str, output_format: Optional[str] = Query(None)):
+    """
+    Stream TTS audio for a registered key as ElevenLabs produces it.
+    Playback can start after the first chunk; once the stream completes the
+    audio is cached and later requests are redirected to the stored file.
+    output_format comes with the URL returned when the stream was registered.
+    """
+    if not CACHE_KEY_PATTERN.match(key):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    try:
+        output_format = resolve_output_format(output_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if audio_path_for_key(key, output_format).exists():
+        # Replays go through the cache-friendly static route
+        return RedirectResponse(audio_url_for_key(key, output_format))
+
+    text = await get_stream_text(key)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    chunks = await open_speech_stream(text, output_format)
+    if chunks is None:
+        raise HTTPException(status_code=502, detail="Failed to generate audio. Please try again.")
+
+    return StreamingResponse(
+        metered(chunks, "stream", output_format),
+        media_type=media_type_for_format(output_format)
+    )
+
+
+@router.get("/playlist/{playlist_id}")
+async def get_playlist_status(playlist_id: str):
+    """
+    Return the ordered segments of a pipelined synthesis and their status.
+    """
+    playlist = await get_playlist(playlist_id)
+    if playlist is None:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    return playlist.to_dict()
+
+
+@router.get("/playlist/{playlist_id}/stream")
+async def stream_playlist_audio(playlist_id: str):
+    """
+    Stream all segments of a pipelined synthesis as one file in the
+    playlist's format, in order, waiting for segments that are still being
+    rendered.
+    """
+    playlist = await get_playlist(playlist_id)
+    if playlist is None:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    return StreamingResponse(
+        metered(stream_playlist(playlist), "playlist", playlist.output_format),
+        media_type=media_type_for_format(playlist.output_format)
+    )
+
+
+@router.get("/phrases/{phrase_id}")
+async def get_phrase_audio(phrase_id: str, language: str = "en"):
+    """
+    Return a fixed tutor phrase and its pre-rendered audio URL.
+    audio_url is null until warm-up has rendered the phrase.
+    """
+    text = get_phrase(phrase_id, language)
+    if text is None:
+        raise HTTPException(status_code=404, detail=f"Phrase {phrase_id} not found")
+    return {
+        "phrase_id": phrase_id,
+        "language": language,
+        "text": text,
+        "audio_url": phrase_audio_url(phrase_id, language)
+    }
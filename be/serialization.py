@@ -0,0 +1,115 @@
+"""Fast response serialization for the notebook and practice endpoints.
+
+Handlers return fast_response(request, content) instead of a model, so
+FastAPI skips re-validating against response_model and the standard json
+encoder. Content may hold pydantic models (including ones built with
+model_construct), datetimes, lists and dicts; it is encoded in one pass
+by orjson when installed (stdlib json otherwise), with the same output
+as FastAPI's default encoding. Clients that send
+`Accept: application/msgpack` get MessagePack when the optional msgpack
+package is installed.
+
+encode_body() compresses with brotli (when the optional brotli package is
+installed) or gzip, as the client's Accept-Encoding allows.
+"""
+import gzip
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: MessagePack is only offered when installed
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is used instead
+    brotli = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+# Bodies smaller than this are sent uncompressed; the headers would cost more than the saving
+COMPRESS_MIN_BYTES = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _default(value: Any) -> Any:
+    # Fields only; models built with model_construct hold exactly these in __dict__
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(raw: bytes) -> Any:
+    """Decode JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def negotiate_media_type(request: Request) -> str:
+    return "application/msgpack" if _wants_msgpack(request) else "application/json"
+
+
+def serialize(content: Any, media_type: str) -> bytes:
+    if media_type == "application/msgpack":
+        return msgpack.packb(content, default=_default, use_bin_type=True)
+    return dumps(content)
+
+
+def fast_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """Serialize content once, as JSON or negotiated MessagePack."""
+    media_type = negotiate_media_type(request)
+    return Response(
+        content=serialize(content, media_type),
+        status_code=status_code,
+        media_type=media_type,
+        headers={"Vary": "Accept"}
+    )
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """Pick br, gzip or None (identity) from the Accept-Encoding header."""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def encode_body(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Compress body with the negotiated encoding; returns (body, Content-Encoding or None)."""
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
@@ -1,82 +1,174 @@
-"""OpenAI GPT service for text analysis and improvement."""
+"""OpenAI GPT service for text analysis and improvement.
+
+Text is analyzed sentence by sentence: each sentence's result is cached
+per language pair, so when a learner fixes one sentence and resubmits
+the paragraph only new or changed sentences go to the model. Results are
+merged back into one improved_text, errors and difficult_words, and each
+call reports how many sentences, tokens and milliseconds were reused.
+
+Texts longer than ANALYSIS_LONG_TEXT_CHARS are sent in chunks of whole
+sentences (closed at paragraph breaks where possible) that fit
+ANALYSIS_CHUNK_TOKENS, analyzed concurrently, at most
+ANALYSIS_CHUNK_CONCURRENCY at a time. Each answer stays well inside
+max_tokens, so long essays neither take as long as their full output
+nor get cut off mid-JSON.
+"""
+import asyncio
+import hashlib
 import json
+import logging
+import re
+import time
 import httpx
 from pathlib import Path
-from typing import List, Dict, Any
-from ..config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL
+from typing import List, Dict, Any, Optional, Tuple
+from ..cache import get_cache
+from ..config import get_settings
+from ..deadline import stage_timeout
+from ..log import redact
+from ..metrics import (
+    ANALYSIS_LATENCY_SAVED, ANALYSIS_SENTENCES, ANALYSIS_TOKENS_SAVED, OPENAI_CHAT, WHISPER, track_upstream
+)
 from ..models import ErrorItem, DifficultWord
 
+logger = logging.getLogger(__name__)
 
-async def analyze_text(
-    text: str, 
-    practice_language: str = "en",
-    native_language: str = "en"
-) -> Dict[str, Any]:
+SENTENCE_CACHE_NAMESPACE = "analysis_sentences"
+
+# A sentence runs to terminal punctuation (plus closing quotes/brackets) followed
+# by whitespace, to CJK terminal punctuation, to a line break or to the end of the text
+_SENTENCE = re.compile(
+    r"(\S.*?(?:[.!?]+[\"'\u201d\u2019)\]]*(?=\s|$)|[\u3002\uff01\uff1f]+|(?=\n)|$))(\s*)",
+    re.DOTALL
+)
+
+# Abbreviations (lowercase, without the final period) that do not end a sentence, per
+# practice language; single capital letters (initials) never do. Words that often end
+# a sentence anyway, like "etc.", are left out.
+_ABBREVIATIONS = {
+    "en": frozenset({"mr", "mrs", "ms", "dr", "prof", "st", "jr", "sr", "vs", "e.g", "i.e", "approx"}),
+    "es": frozenset({"sr", "sra", "srta", "dr", "dra", "ud", "uds", "p.ej", "pág"}),
+    "fr": frozenset({"mme", "mlle", "dr", "pr", "p.ex", "cf"}),
+    "de": frozenset({"hr", "fr", "dr", "prof", "z.b", "d.h", "bzw", "ca", "nr", "str"}),
+    "pt": frozenset({"sr", "sra", "dr", "dra", "prof", "p.ex", "pág"}),
+    "it": frozenset({"sig", "sig.ra", "dott", "prof", "avv", "ing", "p.es"}),
+    "ru": frozenset({"т.е", "т.к", "т.д", "ул", "проф", "им"})
+}
+
+# Language names mapping
+LANG_NAMES = {
+    "en": "English", "es": "Spanish", "fr": "French", "de": "German",
+    "zh": "Chinese", "ja": "Japanese", "ko": "Korean", "pt": "Portuguese",
+    "it": "Italian", "ru": "Russian", "ar": "Arabic"
+}
+
+
+def _ends_with_abbreviation(sentence: str, abbreviations: frozenset) -> bool:
+    if not sentence.endswith("."):
+        return False
+    word = sentence.split()[-1].lstrip("\"'(\u201c\u2018[")[:-1]
+    return (len(word) == 1 and word.isupper()) or word.lower() in abbreviations
+
+
+def split_sentences(text: str, language: str = "en") -> List[Tuple[str, str]]:
     """
-    Analyze user text using GPT to produce:
-    - improved version
-    - list of errors
-    - list of difficult words
-    - beginner-friendly explanations in native language
-    
-    Args:
-        text: Text to analyze
-        practice_language: Language being practiced (e.g., "en", "es")
-        native_language: User's native language for explanations (e.g., "zh", "en")
+    Split text into (sentence, following whitespace) pairs; joining them gives back the text.
+    A period after an abbreviation of the language or an initial does not end a sentence.
     """
-    if not OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY not set")
-    
-    # Language names mapping
-    lang_names = {
-        "en": "English", "es": "Spanish", "fr": "French", "de": "German",
-        "zh": "Chinese", "ja": "Japanese", "ko": "Korean", "pt": "Portuguese",
-        "it": "Italian", "ru": "Russian", "ar": "Arabic"
+    abbreviations = _ABBREVIATIONS.get(language, frozenset())
+    pieces: List[Tuple[str, str]] = []
+    for match in _SENTENCE.finditer(text):
+        sentence, space = match.group(1), match.group(2)
+        if pieces and "\n" not in pieces[-1][1] and _ends_with_abbreviation(pieces[-1][0], abbreviations):
+            previous, previous_space = pieces.pop()
+            sentence = previous + previous_space + sentence
+        pieces.append((sentence, space))
+    return pieces
+
+
+def _sentence_key(sentence: str, practice_language: str, native_language: str) -> str:
+    normalized = " ".join(sentence.split())
+    return hashlib.sha256(f"{practice_language}:{native_language}:{normalized}".encode("utf-8")).hexdigest()
+
+
+def _strip_code_fence(content: str) -> str:
+    # Remove markdown code blocks if present
+    if "```json" in content:
+        return content.split("```json")[1].split("```")[0].strip()
+    if "```" in content:
+        return content.split("```")[1].split("```")[0].strip()
+    return content
+
+
+def _sentence_result(item: dict, sentence: str) -> dict:
+    """Validate one sentence's analysis; stored in the cache as plain dicts."""
+    return {
+        "improved_text": item.get("improved_text", sentence),
+        "errors": [ErrorItem(**error).model_dump() for error in item.get("errors", [])],
+        "difficult_words": [DifficultWord(**word).model_dump() for word in item.get("difficult_words", [])]
     }
-    
-    practice_lang_name = lang_names.get(practice_language, practice_language)
-    native_lang_name = lang_names.get(native_language, native_language)
+
+
+async def _request_analysis(
+    sentences: List[str],
+    practice_language: str,
+    native_language: str
+) -> Tuple[List[dict], int, float]:
+    """
+    Ask the model to review the given sentences in one call.
+
+    Returns (results, tokens, seconds). There is one result per sentence
+    when the model kept to the format; otherwise the list holds whatever
+    it returned and the caller asks again sentence by sentence.
+    """
+    settings = get_settings()
+    practice_lang_name = LANG_NAMES.get(practice_language, practice_language)
+    native_lang_name = LANG_NAMES.get(native_language, native_language)
     
     prompt = f"""You are a helpful language coach for {practice_lang_name} learners. 
-Analyze the following text written by a beginner {practice_lang_name} learner (native language: {native_lang_name}) and provide:
+Review the sentences below, written by a beginner {practice_lang_name} learner (native language: {native_lang_name}). For each sentence provide:
 
-1. An improved/corrected version of the text in {practice_lang_name} (keep the same meaning and style)
+1. An improved/corrected version of the sentence in {practice_lang_name} (keep the same meaning and style)
 2. A list of errors with explanations in {native_lang_name} (only if there are errors)
 3. A list of difficult words with simple definitions in {native_lang_name} and examples in {practice_lang_name}
 4. Keep all explanations short, simple, and beginner-friendly in {native_lang_name}
 
-User's text in {practice_lang_name}:
-"{text}"
+The sentences are consecutive parts of one text in {practice_lang_name}, given as a JSON array:
+{json.dumps(sentences, ensure_ascii=False)}
 
-Please respond in the following JSON format:
+Please respond in the following JSON format, with exactly one item per sentence, in the same order:
 {{
-    "improved_text": "the corrected version in {practice_lang_name}",
-    "errors": [
+    "sentences": [
         {{
-            "original": "original phrase/word",
-            "corrected": "corrected phrase/word",
-            "explanation": "simple explanation in {native_lang_name}"
-        }}
-    ],
-    "difficult_words": [
-        {{
-            "word": "word in {practice_lang_name}",
-            "definition": "simple definition in {native_lang_name}",
-            "example": "example sentence in {practice_lang_name}"
+            "improved_text": "the corrected sentence in {practice_lang_name}",
+            "errors": [
+                {{
+                    "original": "original phrase/word",
+                    "corrected": "corrected phrase/word",
+                    "explanation": "simple explanation in {native_lang_name}"
+                }}
+            ],
+            "difficult_words": [
+                {{
+                    "word": "word in {practice_lang_name}",
+                    "definition": "simple definition in {native_lang_name}",
+                    "example": "example sentence in {practice_lang_name}"
+                }}
+            ]
         }}
     ]
 }}
 
-If there are no errors, return an empty errors array. Focus on words that might be challenging for beginners. All explanations and definitions should be in {native_lang_name}."""
+If a sentence has no errors, return an empty errors array for it. Focus on words that might be challenging for beginners. All explanations and definitions should be in {native_lang_name}."""
 
-    url = f"{OPENAI_BASE_URL}/chat/completions"
+    url = f"{settings.OPENAI_BASE_URL}/chat/completions"
     headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
         "Content-Type": "application/json"
     }
     
     data = {
-        "model": OPENAI_MODEL,
+        "model": settings.OPENAI_MODEL,
         "messages": [
             {
                 "role": "system",
@@ -92,92 +184,279 @@ If there are no errors, return an empty errors array. Focus on words that might
     }
     
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, json=data, headers=headers)
+        started = time.perf_counter()
+        async with httpx.AsyncClient(timeout=stage_timeout(60.0)) as client:
+            with track_upstream(OPENAI_CHAT) as call:
+                response = await client.post(url, json=data, headers=headers)
+                call.status = response.status_code
+                call.received(len(response.content))
             response.raise_for_status()
+            elapsed = time.perf_counter() - started
             
             result = response.json()
-            content = result["choices"][0]["message"]["content"]
-            
-            # Parse JSON from the response
-            # Remove markdown code blocks if present
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
+            if result["choices"][0].get("finish_reason") == "length":
+                logger.warning("Analysis hit max_tokens", extra={"sentences": len(sentences)})
+            content = _strip_code_fence(result["choices"][0]["message"]["content"])
             analysis = json.loads(content)
             
-            # Convert to model objects
-            errors = [
-                ErrorItem(**error) for error in analysis.get("errors", [])
-            ]
-            difficult_words = [
-                DifficultWord(**word) for word in analysis.get("difficult_words", [])
+            items = analysis.get("sentences")
+            if not isinstance(items, list):
+                # Answered in the single-text shape
+                items = [analysis]
+            results = [
+                _sentence_result(item, sentences[i] if i < len(sentences) else "")
+                for i, item in enumerate(items)
             ]
             
-            return {
-                "improved_text": analysis.get("improved_text", text),
-                "errors": errors,
-                "difficult_words": difficult_words
-            }
+            usage = result.get("usage") or {}
+            tokens = usage.get("total_tokens") or (len(prompt) + len(content)) // 4
+            return results, tokens, elapsed
             
     except httpx.HTTPStatusError as e:
         # Log full error for debugging (server-side only)
-        print(f"OpenAI API error: {e.response.status_code} - {e.response.text[:200]}")
+        logger.warning("OpenAI API error", extra={"status": e.response.status_code, "body": e.response.text[:200]})
         # Return generic error message (don't expose API details)
         raise Exception("Failed to analyze text. Please try again.")
     except json.JSONDecodeError as e:
         # Log parsing error (server-side only)
-        print(f"Error parsing OpenAI response: {e}")
-        print(f"Response content: {content[:500] if 'content' in locals() else 'N/A'}")
+        logger.warning(
+            "Error parsing OpenAI response",
+            extra={"error": str(e), "content": redact(content) if "content" in locals() else None}
+        )
         raise Exception("Failed to parse analysis response. Please try again.")
     except Exception as e:
         # Log error details (server-side only)
         error_msg = str(e)
-        print(f"Error analyzing text: {error_msg}")
+        logger.error("Error analyzing text", extra={"error": error_msg})
         # Return generic error (don't expose internal details)
         if "OPENAI_API_KEY" in error_msg or "API" in error_msg.upper():
             raise Exception("Service configuration error. Please contact support.")
         raise Exception("Failed to analyze text. Please try again.")
 
+
+def _chunk(
+    keys: List[str],
+    sentences: Dict[str, str],
+    separators: Dict[str, str],
+    budget_tokens: int
+) -> List[List[str]]:
+    """
+    Group sentences, in order, into chunks of about budget_tokens input
+    tokens (estimated at 4 characters each). A chunk that is at least half
+    full is also closed at a paragraph break. A single longer sentence
+    gets a chunk of its own.
+    """
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for key in keys:
+        tokens = len(sentences[key]) // 4 + 1
+        if current and current_tokens + tokens > budget_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(key)
+        current_tokens += tokens
+        if "\n" in separators[key] and current_tokens >= budget_tokens / 2:
+            chunks.append(current)
+            current, current_tokens = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _analyze_chunk(
+    keys: List[str],
+    sentences: Dict[str, str],
+    cached: Dict[str, Optional[dict]],
+    practice_language: str,
+    native_language: str
+) -> int:
+    """Analyze one group of sentences, store the results in `cached` and the cache; returns tokens used."""
+    analyzed, tokens_used, elapsed = await _request_analysis(
+        [sentences[key] for key in keys], practice_language, native_language
+    )
+    if len(analyzed) != len(keys):
+        logger.warning("Analysis did not match sentences", extra={"sentences": len(keys), "results": len(analyzed)})
+        if len(keys) > 1:
+            # The results can't be matched to sentences: ask for each sentence on its own
+            retried = await asyncio.gather(*(
+                _analyze_chunk([key], sentences, cached, practice_language, native_language) for key in keys
+            ))
+            return tokens_used + sum(retried)
+        # Whatever came back is about the one sentence
+        key = keys[0]
+        analyzed = [{
+            "improved_text": " ".join(result["improved_text"] for result in analyzed) or sentences[key],
+            "errors": [error for result in analyzed for error in result["errors"]],
+            "difficult_words": [word for result in analyzed for word in result["difficult_words"]]
+        }]
+
+    cached.update(await _store_results(keys, sentences, analyzed, tokens_used, elapsed))
+    return tokens_used
+
+
+async def _store_results(
+    keys: List[str],
+    sentences: Dict[str, str],
+    analyzed: List[dict],
+    tokens_used: int,
+    elapsed: float
+) -> Dict[str, dict]:
+    """Cache one result per sentence of a call; returns them by sentence key."""
+    # Charge each sentence its share of the call, so reusing it later can report the saving
+    total_chars = sum(len(sentences[key]) for key in keys) or 1
+    results = {}
+    for key, result in zip(keys, analyzed):
+        share = len(sentences[key]) / total_chars
+        result["tokens"] = round(tokens_used * share)
+        result["latency_ms"] = round(elapsed * 1000 * share)
+        results[key] = result
+    cache = get_cache(SENTENCE_CACHE_NAMESPACE)
+    ttl = get_settings().ANALYSIS_CACHE_TTL_SECONDS
+    await asyncio.gather(*(cache.set(key, result, ttl=ttl) for key, result in results.items()))
+    return results
+
+
+def _merge(pieces: List[Tuple[str, str]], results: List[Optional[dict]]) -> Dict[str, Any]:
+    """Join per-sentence results in order; a difficult word is listed once."""
+    improved_parts = []
+    errors = []
+    difficult_words = []
+    seen_words = set()
+    for (_, separator), result in zip(pieces, results):
+        if result is None:
+            continue
+        if result["improved_text"]:
+            improved_parts.append(result["improved_text"] + separator)
+        errors.extend(ErrorItem(**error) for error in result["errors"])
+        for word in result["difficult_words"]:
+            key = word["word"].strip().lower()
+            if key not in seen_words:
+                seen_words.add(key)
+                difficult_words.append(DifficultWord(**word))
+    return {
+        "improved_text": "".join(improved_parts).strip(),
+        "errors": errors,
+        "difficult_words": difficult_words
+    }
+
+
+async def analyze_text(
+    text: str, 
+    practice_language: str = "en",
+    native_language: str = "en"
+) -> Dict[str, Any]:
+    """
+    Analyze user text using GPT to produce:
+    - improved version
+    - list of errors
+    - list of difficult words
+    - beginner-friendly explanations in native language
+    
+    Sentences analyzed before (same text and language pair) are taken
+    from the cache; "reuse" in the result reports what that saved.
+    
+    Args:
+        text: Text to analyze
+        practice_language: Language being practiced (e.g., "en", "es")
+        native_language: User's native language for explanations (e.g., "zh", "en")
+    """
+    settings = get_settings()
+    if not settings.OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY not set")
+    
+    pieces = split_sentences(text, practice_language) or [(text, "")]
+    keys = [_sentence_key(sentence, practice_language, native_language) for sentence, _ in pieces]
+    # Repeated sentences are looked up and sent once
+    unique_keys = list(dict.fromkeys(keys))
+    cache = get_cache(SENTENCE_CACHE_NAMESPACE)
+    cached: Dict[str, Optional[dict]] = dict(zip(
+        unique_keys, await asyncio.gather(*(cache.get(key) for key in unique_keys))
+    ))
+
+    missing = [key for key in unique_keys if cached[key] is None]
+    reused = [cached[key] for key in keys if cached[key] is not None]
+    tokens_used = 0
+    chunks: List[List[str]] = []
+    if missing:
+        sentences = {key: sentence for key, (sentence, _) in zip(keys, pieces)}
+        if len(text) > settings.ANALYSIS_LONG_TEXT_CHARS:
+            separators = {key: separator for key, (_, separator) in zip(keys, pieces)}
+            chunks = _chunk(missing, sentences, separators, settings.ANALYSIS_CHUNK_TOKENS)
+        else:
+            chunks = [missing]
+
+        semaphore = asyncio.Semaphore(settings.ANALYSIS_CHUNK_CONCURRENCY)
+
+        async def analyze_chunk(chunk: List[str]) -> int:
+            async with semaphore:
+                return await _analyze_chunk(chunk, sentences, cached, practice_language, native_language)
+
+        tasks = [asyncio.create_task(analyze_chunk(chunk)) for chunk in chunks]
+        try:
+            tokens_used = sum(await asyncio.gather(*tasks))
+        except BaseException:
+            # One chunk failed (or we were cancelled): the text can't be completed, stop the rest
+            for task in tasks:
+                task.cancel()
+            raise
+
+    merged = _merge(pieces, [cached.get(key) for key in keys])
+    tokens_saved = sum(result.get("tokens", 0) for result in reused)
+    latency_saved_ms = sum(result.get("latency_ms", 0) for result in reused)
+    merged["reuse"] = {
+        "sentences": len(pieces),
+        "reused_sentences": len(reused),
+        "analyzed_sentences": len(missing),
+        "chunks": len(chunks),
+        "tokens_used": tokens_used,
+        "tokens_saved": tokens_saved,
+        "latency_saved_ms": latency_saved_ms
+    }
+    ANALYSIS_SENTENCES.labels("reused").inc(len(reused))
+    ANALYSIS_SENTENCES.labels("analyzed").inc(len(missing))
+    ANALYSIS_TOKENS_SAVED.inc(tokens_saved)
+    ANALYSIS_LATENCY_SAVED.inc(latency_saved_ms / 1000)
+    logger.debug("Text analyzed", extra=merged["reuse"])
+    return merged
+
 async def transcribe_audio(file_path: Path) -> str:
     """
     Transcribe audio file using OpenAI Whisper API.
     """
-    if not OPENAI_API_KEY:
+    settings = get_settings()
+    if not settings.OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY not set")
 
-    url = f"{OPENAI_BASE_URL}/audio/transcriptions"
+    url = f"{settings.OPENAI_BASE_URL}/audio/transcriptions"
     headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}"
+        "Authorization": f"Bearer {settings.OPENAI_API_KEY}"
     }
     
-    # Debug log
-    print(f"Sending audio to OpenAI Whisper: {file_path}")
+    logger.debug("Sending audio to OpenAI Whisper", extra={"file": file_path.name})
     
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with httpx.AsyncClient(timeout=stage_timeout(60.0)) as client:
             with open(file_path, "rb") as f:
                 files = {"file": (file_path.name, f, "audio/webm")}
                 data = {"model": "whisper-1"}
                 
-                response = await client.post(url, files=files, data=data, headers=headers)
-                
-                # Debug log response
-                print(f"Whisper Status: {response.status_code}")
+                with track_upstream(WHISPER) as call:
+                    call.sent(file_path.stat().st_size)
+                    response = await client.post(url, files=files, data=data, headers=headers)
+                    call.status = response.status_code
                 
                 if response.status_code != 200:
-                    print(f"Whisper Error Body: {response.text}")
+                    logger.warning("Whisper API error", extra={"status": response.status_code, "body": response.text[:200]})
                 
                 response.raise_for_status()
                 
                 result = response.json()
                 transcript = result.get("text", "")
-                print(f"Whisper Transcript: {transcript}")
+                logger.debug("Whisper transcript", extra={"transcript": redact(transcript)})
                 
                 return transcript
                 
     except Exception as e:
-        print(f"Transcription failed: {str(e)}")
+        logger.error("Transcription failed", extra={"error": str(e)})
         raise Exception(f"Failed to transcribe audio: {str(e)}")
@@ -0,0 +1,261 @@
+"""Lifecycle management for generated audio files in AUDIO_DIR."""
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Number of directory entries stat'ed per batch while rebuilding the index
+SCAN_BATCH_SIZE = 256
+
+
+@dataclass
+class AudioFileInfo:
+    """Size and last access time of one indexed audio file."""
+    size: int
+    last_access: float
+
+
+class AudioLifecycleManager:
+    """
+    Keeps an index of files in the audio directory and enforces a byte quota
+    and a TTL with least-recently-used eviction.
+
+    Files that are being served are pinned and never deleted; a file that is
+    pinned or looked up again between being picked for eviction and being
+    deleted is kept (and stays indexed). Temp files (names starting with ".") only expire by
+    TTL, since they belong to a synthesis that is still being written.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        quota_bytes: int,
+        ttl_seconds: int,
+        sweep_interval: int
+    ):
+        self.directory = directory
+        self.quota_bytes = quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+
+        self._index: Dict[str, AudioFileInfo] = {}
+        self._total_bytes = 0
+        self._pins: Dict[str, int] = {}
+        self._index_ready = False
+        self._evicted_files = 0
+        self._evicted_bytes = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # Index maintenance
+
+    def record(self, path: Path) -> None:
+        """Add or refresh a file that was just written."""
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return
+        self._put(path.name, AudioFileInfo(size=size, last_access=time.time()))
+        if self._total_bytes > self.quota_bytes and self._wakeup is not None:
+            self._wakeup.set()
+
+    def touch(self, name: str) -> None:
+        """Mark a file as just accessed."""
+        info = self._index.get(name)
+        if info is not None:
+            info.last_access = time.time()
+        else:
+            # Not indexed yet (startup scan still running)
+            self.record(self.directory / name)
+
+    def _put(self, name: str, info: AudioFileInfo) -> None:
+        previous = self._index.get(name)
+        if previous is not None:
+            self._total_bytes -= previous.size
+        self._index[name] = info
+        self._total_bytes += info.size
+
+    def _drop(self, name: str) -> Optional[AudioFileInfo]:
+        info = self._index.pop(name, None)
+        if info is not None:
+            self._total_bytes -= info.size
+        return info
+
+    # Pinning
+
+    @contextmanager
+    def pin(self, name: str) -> Iterator[None]:
+        """Protect a file from eviction while it is being served."""
+        self._pins[name] = self._pins.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            remaining = self._pins[name] - 1
+            if remaining:
+                self._pins[name] = remaining
+            else:
+                del self._pins[name]
+
+    def is_pinned(self, name: str) -> bool:
+        return name in self._pins
+
+    # Startup scan
+
+    async def rebuild_index(self) -> None:
+        """
+        Rebuild the index from disk in small batches so startup is never
+        blocked by a full stat walk over a large directory.
+        """
+        try:
+            entries = os.scandir(self.directory)
+        except FileNotFoundError:
+            self._index_ready = True
+            return
+
+        with entries:
+            while True:
+                batch = await asyncio.to_thread(self._scan_batch, entries)
+                for name, info in batch:
+                    # Files recorded since startup already have fresher data
+                    if name not in self._index:
+                        self._put(name, info)
+                if len(batch) < SCAN_BATCH_SIZE:
+                    break
+
+        self._index_ready = True
+        logger.info("Audio index rebuilt", extra={"file_count": len(self._index), "total_bytes": self._total_bytes})
+
+    def _scan_batch(self, entries: Iterator[os.DirEntry]) -> List[Tuple[str, AudioFileInfo]]:
+        batch = []
+        for entry in entries:
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            last_access = max(stat.st_atime, stat.st_mtime)
+            batch.append((entry.name, AudioFileInfo(size=stat.st_size, last_access=last_access)))
+            if len(batch) >= SCAN_BATCH_SIZE:
+                break
+        return batch
+
+    # Eviction
+
+    async def sweep(self) -> None:
+        """Delete expired files, then least recently used files over quota."""
+        now = time.time()
+        victims: Dict[str, AudioFileInfo] = {}
+
+        for name, info in list(self._index.items()):
+            if now - info.last_access > self.ttl_seconds and not self.is_pinned(name):
+                victims[name] = self._drop(name)
+
+        if self._total_bytes > self.quota_bytes:
+            candidates = sorted(
+                (
+                    (info.last_access, name)
+                    for name, info in self._index.items()
+                    if not name.startswith(".") and not self.is_pinned(name)
+                )
+            )
+            for _, name in candidates:
+                if self._total_bytes <= self.quota_bytes:
+                    break
+                victims[name] = self._drop(name)
+
+        if victims:
+            deleted, freed, kept = await asyncio.to_thread(self._delete_files, list(victims))
+            for name in kept:
+                # Still on disk, so it keeps counting against the quota and the TTL
+                if name not in self._index:
+                    self._put(name, victims[name])
+            self._evicted_files += deleted
+            self._evicted_bytes += freed
+            logger.info("Evicted audio files", extra={"file_count": deleted, "freed_bytes": freed})
+
+    def _delete_files(self, names: List[str]) -> Tuple[int, int, List[str]]:
+        """Delete files; returns the count and bytes deleted and the names kept because they are pinned."""
+        deleted = 0
+        freed = 0
+        kept = []
+        for name in names:
+            # Looked up again since it was picked: touch() has already re-indexed it
+            if name in self._index:
+                continue
+            if self.is_pinned(name):
+                kept.append(name)
+                continue
+            path = self.directory / name
+            try:
+                freed += path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            deleted += 1
+        return deleted, freed, kept
+
+    # Background task
+
+    def start(self) -> None:
+        """Start the background index rebuild and sweep loop."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        await self.rebuild_index()
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Audio sweep failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.sweep_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def usage(self) -> dict:
+        """Return current usage of the audio directory."""
+        return {
+            "file_count": len(self._index),
+            "total_bytes": self._total_bytes,
+            "quota_bytes": self.quota_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "pinned_files": len(self._pins),
+            "index_ready": self._index_ready,
+            "evicted_files": self._evicted_files,
+            "evicted_bytes": self._evicted_bytes
+        }
+
+
+@lru_cache(maxsize=None)
+def get_audio_manager() -> AudioLifecycleManager:
+    """Return the process-wide audio lifecycle manager, creating it on first use."""
+    settings = get_settings()
+    return AudioLifecycleManager(
+        settings.AUDIO_DIR,
+        quota_bytes=settings.AUDIO_QUOTA_BYTES,
+        ttl_seconds=settings.AUDIO_TTL_SECONDS,
+        sweep_interval=settings.AUDIO_SWEEP_INTERVAL_SECONDS
+    )
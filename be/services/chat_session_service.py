@@ -0,0 +1,237 @@
+"""Server-side conversation history for /api/practice/chat.
+
+A session holds a rolling summary of the older turns and the turns not
+yet folded into it. The prompt for each reply is built from the summary
+and at most CHAT_SESSION_VERBATIM_TURNS recent turns, oldest dropped
+first until the history fits CHAT_SESSION_PROMPT_TOKENS, so its size
+stays flat however long the conversation runs.
+
+Once more than CHAT_SESSION_VERBATIM_TURNS turns are unsummarized, the
+oldest are folded into the summary by a background task after the reply
+has been sent; until it finishes they are simply left out of the prompt.
+
+Sessions are stored in the shared cache (namespace "chat_sessions"), so
+every worker sees them with the sqlite or redis backend. Each turn
+renews the TTL of CHAT_SESSION_IDLE_SECONDS; the backend's LRU eviction
+drops the least recently used sessions when it is full.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+import httpx
+
+from ..cache import get_cache
+from ..config import get_settings
+from ..deadline import detached
+from ..metrics import CHAT_HISTORY_TOKENS, CHAT_SUMMARIES, OPENAI_CHAT, track_upstream
+from .analyze_service import LANG_NAMES
+
+logger = logging.getLogger(__name__)
+
+CHAT_SESSION_NAMESPACE = "chat_sessions"
+# Turns kept beyond the verbatim window while summaries keep failing; older ones are dropped
+MAX_PENDING_TURNS = 50
+
+# Summaries being written by this process, by session id
+_summarizing: Set[str] = set()
+_summary_tasks: Set[asyncio.Task] = set()
+# Serialize the read-modify-write of each session in this process
+_session_locks: Dict[str, asyncio.Lock] = {}
+_session_lock_users: Dict[str, int] = {}
+
+
+@asynccontextmanager
+async def _session_lock(session_id: str) -> AsyncIterator[None]:
+    lock = _session_locks.setdefault(session_id, asyncio.Lock())
+    _session_lock_users[session_id] = _session_lock_users.get(session_id, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _session_lock_users[session_id] -= 1
+        if not _session_lock_users[session_id]:
+            del _session_lock_users[session_id]
+            del _session_locks[session_id]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (4 characters each), as used for analysis chunks."""
+    return len(text) // 4 + 1
+
+
+def new_session(practice_language: str, native_language: str, topic: Optional[str]) -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "practice_language": practice_language,
+        "native_language": native_language,
+        "topic": topic,
+        "summary": "",
+        "summarized_turns": 0,
+        "turns": [],
+        "updated_at": time.time()
+    }
+
+
+async def load_session(session_id: Optional[str]) -> Optional[dict]:
+    """The stored session, or None if there is no id or it expired."""
+    if not session_id:
+        return None
+    return await get_cache(CHAT_SESSION_NAMESPACE).get(session_id)
+
+
+async def save_session(session: dict) -> None:
+    session["updated_at"] = time.time()
+    await get_cache(CHAT_SESSION_NAMESPACE).set(
+        session["id"], session, ttl=get_settings().CHAT_SESSION_IDLE_SECONDS
+    )
+
+
+def history_messages(session: dict, text: str) -> List[Dict[str, str]]:
+    """
+    Chat messages carrying the conversation so far: the summary, then the
+    most recent turns that fit the token budget next to the new text.
+    """
+    settings = get_settings()
+    budget = settings.CHAT_SESSION_PROMPT_TOKENS - estimate_tokens(text)
+    spent = 0
+    messages: List[Dict[str, str]] = []
+    if session["summary"]:
+        summary = f"Summary of the conversation so far: {session['summary']}"
+        spent += estimate_tokens(summary)
+        messages.append({"role": "system", "content": summary})
+
+    recent: List[Dict[str, str]] = []
+    for turn in reversed(session["turns"][-settings.CHAT_SESSION_VERBATIM_TURNS:]):
+        tokens = estimate_tokens(turn["user"]) + estimate_tokens(turn["assistant"])
+        if spent + tokens > budget:
+            break
+        spent += tokens
+        recent[:0] = [
+            {"role": "user", "content": turn["user"]},
+            {"role": "assistant", "content": turn["assistant"]}
+        ]
+    messages.extend(recent)
+    CHAT_HISTORY_TOKENS.observe(spent)
+    return messages
+
+
+async def record_turn(session: dict, text: str, reply: str) -> None:
+    """
+    Append a turn, save the session and, if needed, start folding old turns into the summary.
+
+    `session` was loaded when the request started; the stored copy is
+    reloaded so a summary saved in the meantime is kept, and only the new
+    turn and the request's language and topic are applied to it.
+    """
+    async with _session_lock(session["id"]):
+        stored = await load_session(session["id"])
+        if stored is not None:
+            stored.update(
+                practice_language=session["practice_language"],
+                native_language=session["native_language"],
+                topic=session["topic"]
+            )
+            session = stored
+        session["turns"].append({"user": text, "assistant": reply})
+        overflow = len(session["turns"]) - MAX_PENDING_TURNS
+        if overflow > 0:
+            del session["turns"][:overflow]
+            session["summarized_turns"] += overflow
+        await save_session(session)
+
+    if len(session["turns"]) > get_settings().CHAT_SESSION_VERBATIM_TURNS and session["id"] not in _summarizing:
+        _summarizing.add(session["id"])
+        task = detached(_update_summary(session["id"]))
+        _summary_tasks.add(task)
+        task.add_done_callback(_summary_tasks.discard)
+
+
+async def _update_summary(session_id: str) -> None:
+    started = time.perf_counter()
+    try:
+        session = await load_session(session_id)
+        if session is None:
+            return
+        keep = get_settings().CHAT_SESSION_VERBATIM_TURNS
+        folded = session["turns"][:-keep]
+        if not folded:
+            return
+        base = session["summarized_turns"]
+        summary = await summarize(
+            session["summary"], folded, session["practice_language"], session["native_language"]
+        )
+
+        # Reload: turns may have been added while the model was writing
+        async with _session_lock(session_id):
+            session = await load_session(session_id)
+            if session is None or session["summarized_turns"] != base:
+                return
+            session["summary"] = summary
+            session["summarized_turns"] += len(folded)
+            del session["turns"][:len(folded)]
+            await save_session(session)
+        CHAT_SUMMARIES.labels("ok").inc()
+        logger.debug(
+            "Chat summary updated",
+            extra={
+                "session_id": session_id,
+                "turns_folded": len(folded),
+                "duration_ms": round((time.perf_counter() - started) * 1000)
+            }
+        )
+    except Exception as e:
+        # The turns stay verbatim and are retried after the next turn
+        CHAT_SUMMARIES.labels("failed").inc()
+        logger.warning("Chat summary failed", extra={"session_id": session_id, "error": str(e)})
+    finally:
+        _summarizing.discard(session_id)
+
+
+async def summarize(summary: str, turns: List[dict], practice_language: str, native_language: str) -> str:
+    """Fold turns into the running summary with one model call."""
+    settings = get_settings()
+    if not settings.OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY not set")
+
+    practice_lang_name = LANG_NAMES.get(practice_language, practice_language)
+    transcript = "\n".join(f"Learner: {turn['user']}\nTutor: {turn['assistant']}" for turn in turns)
+    prompt = f"""Summary so far:
+{summary or "(none)"}
+
+New turns:
+{transcript}
+
+Update the summary of this {practice_lang_name} practice conversation with the new turns. Keep the topics discussed, facts the learner shared about themselves and any open question from the tutor. Write at most {settings.CHAT_SESSION_SUMMARY_TOKENS // 2} words in {practice_lang_name}, as plain text."""
+
+    url = f"{settings.OPENAI_BASE_URL}/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    data = {
+        "model": settings.OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": "You keep short running summaries of conversations."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.3,
+        "max_tokens": settings.CHAT_SESSION_SUMMARY_TOKENS
+    }
+
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        with track_upstream(OPENAI_CHAT) as call:
+            response = await client.post(url, json=data, headers=headers)
+            call.status = response.status_code
+            call.received(len(response.content))
+        response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"].strip()
+
+
+async def wait_for_summaries() -> None:
+    """Let summaries in progress finish (used at shutdown)."""
+    if _summary_tasks:
+        await asyncio.gather(*_summary_tasks, return_exceptions=True)
@@ -0,0 +1,23 @@
+"""Helpers for OpenAI streamed chat completions."""
+import json
+import httpx
+from typing import AsyncIterator
+
+
+async def iter_completion_deltas(response: httpx.Response) -> AsyncIterator[str]:
+    """Yield content deltas from a streamed chat completion (server-sent events)."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            break
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            continue
+        choices = chunk.get("choices") or []
+        if choices:
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
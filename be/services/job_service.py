@@ -0,0 +1,347 @@
+"""Durable background jobs for long-running practice requests.
+
+Jobs are rows in a SQLite database (JOB_DB_PATH), so they survive
+restarts and are shared by all workers on a host. Each process runs a
+bounded pool of JOB_WORKERS tasks that claim jobs with a lease, renewed
+while the handler runs; a job whose worker died is claimed again once
+its lease expires, up to JOB_MAX_ATTEMPTS times. A claim is identified
+by the job's attempt number, and writes from a worker whose claim was
+taken over are dropped. Handler failures are final (upstream calls are
+not repeated).
+
+Handlers are registered with @job_handler(kind) and called as
+handler(payload, on_stage); they return a JSON-serializable result or
+raise JobFailed with a client-safe message.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..config import get_settings
+from ..metrics import JOB_LATENCY, JOB_QUEUE_DEPTH, JOB_WAIT
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+JobHandler = Callable[[dict, Callable[[str], Awaitable[None]]], Awaitable[Any]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Register a coroutine function as the handler for a job kind."""
+    def register(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+class JobFailed(Exception):
+    """Raised by handlers; the message is shown to the client."""
+
+
+class QueueFull(Exception):
+    """Too many jobs are waiting; the client should retry later."""
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+class JobQueue:
+    """SQLite-backed job queue with a per-process worker pool."""
+
+    def __init__(
+        self,
+        path: Path,
+        workers: int,
+        lease_seconds: int,
+        max_attempts: int,
+        max_queued: int,
+        retention_seconds: int,
+        poll_interval: float
+    ):
+        self.path = path
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.poll_interval = poll_interval
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Optional[asyncio.Event] = None
+
+    # Storage (called in worker threads)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, stage TEXT, "
+                "payload TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL, lease_expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _count(self, status: str) -> int:
+        (count,) = self._connection().execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()
+        return count
+
+    def _insert(self, job_id: str, kind: str, payload: dict) -> bool:
+        if self._count(QUEUED) >= self.max_queued:
+            return False
+        self._connection().execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(payload), time.time())
+        )
+        return True
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        now = time.time()
+        return self._connection().execute(
+            "UPDATE jobs SET status = ?, stage = 'started', attempts = attempts + 1, "
+            "started_at = ?, lease_expires_at = ? "
+            "WHERE id = (SELECT id FROM jobs WHERE status = ? OR "
+            "(status = ? AND lease_expires_at < ? AND attempts < ?) ORDER BY created_at LIMIT 1) "
+            "RETURNING id, kind, payload, created_at, attempts",
+            (RUNNING, now, now + self.lease_seconds, QUEUED, RUNNING, now, self.max_attempts)
+        ).fetchone()
+
+    # The writes below only apply while the claim (job id and attempt number) is still held;
+    # each returns whether it did
+
+    def _renew(self, job_id: str, attempt: int) -> bool:
+        return self._connection().execute(
+            "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND attempts = ? AND status = ?",
+            (time.time() + self.lease_seconds, job_id, attempt, RUNNING)
+        ).rowcount > 0
+
+    def _set_stage(self, job_id: str, attempt: int, stage: str) -> bool:
+        return self._connection().execute(
+            "UPDATE jobs SET stage = ? WHERE id = ? AND attempts = ? AND status = ?",
+            (stage, job_id, attempt, RUNNING)
+        ).rowcount > 0
+
+    def _finish(self, job_id: str, attempt: int, status: str, result: Any, error: Optional[str]) -> bool:
+        return self._connection().execute(
+            "UPDATE jobs SET status = ?, stage = NULL, result = ?, error = ?, finished_at = ?, "
+            "lease_expires_at = NULL WHERE id = ? AND attempts = ? AND status = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, attempt, RUNNING)
+        ).rowcount > 0
+
+    def _requeue(self, job_id: str, attempt: int) -> bool:
+        return self._connection().execute(
+            "UPDATE jobs SET status = ?, stage = NULL, attempts = attempts - 1, lease_expires_at = NULL "
+            "WHERE id = ? AND attempts = ? AND status = ?",
+            (QUEUED, job_id, attempt, RUNNING)
+        ).rowcount > 0
+
+    def _get(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def _maintain(self) -> Dict[str, int]:
+        """Fail jobs that ran out of attempts, drop old finished jobs, return counts by status."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL "
+            "WHERE status = ? AND lease_expires_at < ? AND attempts >= ?",
+            (FAILED, "Job was interrupted too many times. Please try again.", now, RUNNING, now, self.max_attempts)
+        )
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (SUCCEEDED, FAILED, now - self.retention_seconds)
+        )
+        rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    # Public API
+
+    async def submit(self, kind: str, payload: dict) -> dict:
+        """Persist a new job and wake a worker. Raises QueueFull when too many jobs wait."""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        if not await asyncio.to_thread(self._insert, job_id, kind, payload):
+            raise QueueFull()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        row = await asyncio.to_thread(self._get, job_id)
+        if row is None:
+            return None
+        finished_at = row["finished_at"]
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "attempts": row["attempts"],
+            "created_at": _iso(row["created_at"]),
+            "started_at": _iso(row["started_at"]),
+            "finished_at": _iso(finished_at),
+            "latency_ms": round((finished_at - row["created_at"]) * 1000) if finished_at else None,
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"]
+        }
+
+    async def wait_for_change(self, timeout: float) -> None:
+        """Wait until a job in this process changes, or the timeout passes."""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _notify(self) -> None:
+        # Wake every waiter once, then start a fresh event for the next change
+        if self._changed is not None:
+            self._changed.set()
+        self._changed = asyncio.Event()
+
+    # Workers
+
+    def start(self) -> None:
+        """Start the worker pool and the maintenance loop."""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintenance()))
+
+    async def stop(self) -> None:
+        """Cancel the workers; interrupted jobs go back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+    async def _worker(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                row = await asyncio.to_thread(self._claim)
+            except sqlite3.Error:
+                logger.exception("Could not claim a job")
+                row = None
+            if row is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(row)
+
+    async def _heartbeat(self, job_id: str, attempt: int) -> None:
+        """Keep renewing the lease while the handler runs, so no other worker claims the job."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await asyncio.to_thread(self._renew, job_id, attempt):
+                    logger.warning("Job claim was lost", extra={"job_id": job_id, "attempt": attempt})
+                    return
+            except sqlite3.Error:
+                logger.exception("Could not renew a job lease", extra={"job_id": job_id})
+
+    async def _run(self, row: sqlite3.Row) -> None:
+        job_id, kind, attempt = row["id"], row["kind"], row["attempts"]
+        JOB_WAIT.labels(kind).observe(max(time.time() - row["created_at"], 0.0))
+        self._notify()
+
+        async def on_stage(stage: str) -> None:
+            await asyncio.to_thread(self._set_stage, job_id, attempt, stage)
+            self._notify()
+
+        handler = JOB_HANDLERS.get(kind)
+        result, error = None, None
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, attempt))
+        try:
+            if handler is None:
+                raise JobFailed(f"Unknown job kind: {kind}")
+            result = await handler(json.loads(row["payload"]), on_stage)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back without counting the attempt; shielded so
+            # a second cancellation cannot stop the write once it is under way
+            await asyncio.shield(asyncio.to_thread(self._requeue, job_id, attempt))
+            raise
+        except JobFailed as e:
+            error = str(e)
+        except Exception:
+            logger.exception("Job failed", extra={"job_id": job_id, "kind": kind})
+            error = "Job failed. Please try again."
+        finally:
+            heartbeat.cancel()
+
+        status = FAILED if error is not None else SUCCEEDED
+        if not await asyncio.to_thread(self._finish, job_id, attempt, status, result, error):
+            # Another worker took the job over after our lease ran out; its outcome stands
+            logger.warning("Dropped result of a job claimed again", extra={"job_id": job_id, "attempt": attempt})
+            return
+        JOB_LATENCY.labels(kind, status).observe(max(time.time() - row["created_at"], 0.0))
+        self._notify()
+
+    async def _maintenance(self) -> None:
+        while True:
+            try:
+                counts = await asyncio.to_thread(self._maintain)
+                for status in (QUEUED, RUNNING):
+                    JOB_QUEUE_DEPTH.labels(status).set(counts.get(status, 0))
+            except sqlite3.Error:
+                logger.exception("Job maintenance failed")
+            await asyncio.sleep(max(self.poll_interval, 1.0) * 5)
+
+    async def stats(self) -> dict:
+        counts = await asyncio.to_thread(self._maintain)
+        return {
+            "workers": self.workers,
+            "counts": {status: counts.get(status, 0) for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)},
+            "max_queued": self.max_queued
+        }
+
+
+@lru_cache(maxsize=None)
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue, creating it on first use."""
+    settings = get_settings()
+    return JobQueue(
+        settings.JOB_DB_PATH,
+        workers=settings.JOB_WORKERS,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        max_queued=settings.JOB_MAX_QUEUED,
+        retention_seconds=settings.JOB_RETENTION_SECONDS,
+        poll_interval=settings.JOB_POLL_INTERVAL_SECONDS
+    )
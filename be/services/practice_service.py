@@ -0,0 +1,126 @@
+"""Analysis and persistence of practice attempts, shared by the practice routes and background jobs."""
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Tuple
+
+from ..models import NotebookEntry
+from ..storage import add_entry, generate_entry_id
+from .analyze_service import analyze_text, transcribe_audio
+from .job_service import JobFailed, job_handler
+
+# Called with the name of each stage as it starts (transcribing, analyzing, saving)
+StageCallback = Optional[Callable[[str], Awaitable[None]]]
+
+
+class EmptyTranscriptError(Exception):
+    """Transcription succeeded but returned no text."""
+
+
+async def _report(on_stage: StageCallback, stage: str) -> None:
+    if on_stage is not None:
+        await on_stage(stage)
+
+
+async def analyze_and_save(
+    text: str,
+    topic: Optional[str],
+    practice_language: str,
+    native_language: str,
+    on_stage: StageCallback = None
+) -> NotebookEntry:
+    """Analyze text with GPT and save the result as a notebook entry; returns the stored entry."""
+    await _report(on_stage, "analyzing")
+    analysis = await analyze_text(
+        text,
+        practice_language=practice_language,
+        native_language=native_language
+    )
+
+    entry = NotebookEntry(
+        id=generate_entry_id(),
+        timestamp=datetime.now(),
+        original_text=text,
+        improved_text=analysis["improved_text"],
+        errors=analysis["errors"],
+        difficult_words=analysis["difficult_words"],
+        topic=topic,
+        practice_language=practice_language,
+        native_language=native_language
+    )
+
+    await _report(on_stage, "saving")
+    # A near-duplicate may be merged into an earlier entry; return what was stored
+    return add_entry(entry)
+
+
+async def transcribe_analyze_and_save(
+    audio_path: Path,
+    topic: Optional[str],
+    practice_language: str,
+    native_language: str,
+    on_stage: StageCallback = None
+) -> Tuple[str, NotebookEntry]:
+    """Transcribe a recording with Whisper, then analyze and save the transcript."""
+    await _report(on_stage, "transcribing")
+    transcript = await transcribe_audio(audio_path)
+    if not transcript.strip():
+        raise EmptyTranscriptError("Could not transcribe audio (empty result)")
+
+    entry = await analyze_and_save(transcript, topic, practice_language, native_language, on_stage)
+    return transcript, entry
+
+
+# Background job handlers. Results have the same shape as the synchronous
+# responses; failures carry the same client-safe messages.
+
+@job_handler("practice_submit")
+async def run_submit_job(payload: dict, on_stage: StageCallback) -> dict:
+    try:
+        entry = await analyze_and_save(
+            payload["text"],
+            payload.get("topic"),
+            payload["practice_language"],
+            payload["native_language"],
+            on_stage
+        )
+    except ValueError:
+        raise JobFailed("Service configuration error. Please contact support.")
+    except Exception:
+        raise JobFailed("Failed to process practice. Please try again.")
+
+    return {
+        "success": True,
+        "entry": entry.model_dump(mode="json"),
+        "message": "Practice submitted and analyzed successfully"
+    }
+
+
+@job_handler("practice_voice")
+async def run_voice_job(payload: dict, on_stage: StageCallback) -> dict:
+    audio_path = Path(payload["audio_path"])
+    error = None
+    try:
+        transcript, entry = await transcribe_analyze_and_save(
+            audio_path,
+            payload.get("topic"),
+            payload["practice_language"],
+            payload["native_language"],
+            on_stage
+        )
+    except EmptyTranscriptError as e:
+        error = str(e)
+    except Exception:
+        error = "Voice processing failed. Please try again."
+
+    # Only reached when the attempt finished (not on shutdown), so the
+    # upload is no longer needed for a retry
+    audio_path.unlink(missing_ok=True)
+    if error is not None:
+        raise JobFailed(error)
+
+    return {
+        "success": True,
+        "transcript": transcript,
+        "entry": entry.model_dump(mode="json"),
+        "message": "Voice processed successfully"
+    }
@@ -0,0 +1,168 @@
+"""Similarity index for reusing scenarios generated for near-duplicate topics.
+
+NumPy is imported on first use so that it stays out of worker startup.
+"""
+import logging
+import random
+import time
+import zlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+NGRAM_SIZE = 3
+VECTOR_DIM = 1024
+
+
+def topic_vector(topic: str) -> "np.ndarray":
+    """
+    Embed a topic as an L2-normalized vector of hashed character n-gram counts.
+    Word boundaries are padded so that word starts and ends carry weight.
+    """
+    import numpy as np
+
+    text = " " + " ".join(topic.lower().split()) + " "
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for i in range(max(len(text) - NGRAM_SIZE + 1, 1)):
+        ngram = text[i:i + NGRAM_SIZE]
+        vector[zlib.crc32(ngram.encode("utf-8")) % VECTOR_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class IndexedTopic:
+    """A previously generated topic and the scenario variants generated for it."""
+    topic: str
+    native_language: str
+    variants: List[dict] = field(default_factory=list)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class _LanguageIndex:
+    """Fixed-capacity matrix of topic vectors for one practice language."""
+
+    def __init__(self, capacity: int):
+        import numpy as np
+
+        self.vectors = np.zeros((capacity, VECTOR_DIM), dtype=np.float32)
+        self.entries: List[IndexedTopic] = []
+
+    def best_match(self, vector: "np.ndarray", native_language: str) -> Optional[tuple]:
+        """Return (slot, similarity) of the most similar topic for the native language."""
+        import numpy as np
+
+        if not self.entries:
+            return None
+        similarities = self.vectors[:len(self.entries)] @ vector
+        for slot, entry in enumerate(self.entries):
+            if entry.native_language != native_language:
+                similarities[slot] = -1.0
+        slot = int(np.argmax(similarities))
+        return slot, float(similarities[slot])
+
+    def least_recently_used_slot(self) -> int:
+        return min(range(len(self.entries)), key=lambda slot: self.entries[slot].last_used)
+
+
+class ScenarioSimilarityIndex:
+    """
+    Maps topics to previously generated scenarios, per practice language.
+
+    A lookup returns a cached variant when the cosine similarity between
+    character n-gram vectors of the topics reaches the threshold. While a
+    topic has fewer than max_variants variants, a matching lookup reports a
+    miss with probability new_variant_rate, so a fresh scenario is generated
+    and added as another variant. Each language holds at most max_entries
+    topics; the least recently used is evicted.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, max_variants: int, new_variant_rate: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_variants = max_variants
+        self.new_variant_rate = new_variant_rate
+        self._languages: Dict[str, _LanguageIndex] = {}
+        self._hits = 0
+        self._misses = 0
+        self._new_variants = 0
+        self._evictions = 0
+
+    def lookup(self, topic: str, practice_language: str, native_language: str) -> Optional[dict]:
+        """Return a cached scenario variant for a similar topic, if any."""
+        index = self._languages.get(practice_language)
+        match = index.best_match(topic_vector(topic), native_language) if index else None
+        if match is None or match[1] < self.threshold:
+            self._misses += 1
+            return None
+
+        slot, similarity = match
+        entry = index.entries[slot]
+        entry.last_used = time.monotonic()
+        if len(entry.variants) < self.max_variants and random.random() < self.new_variant_rate:
+            # The caller generates a new variant, which add() files under this topic
+            self._new_variants += 1
+            return None
+        self._hits += 1
+        logger.debug(
+            "Scenario index hit",
+            extra={"topic": topic, "matched_topic": entry.topic, "similarity": round(similarity, 2)}
+        )
+        return dict(random.choice(entry.variants))
+
+    def add(self, topic: str, practice_language: str, native_language: str, scenario: dict) -> None:
+        """Index a freshly generated scenario under its topic."""
+        index = self._languages.setdefault(practice_language, _LanguageIndex(self.max_entries))
+        vector = topic_vector(topic)
+        variant = {
+            "scenario_text": scenario["scenario_text"],
+            "task_instructions": scenario["task_instructions"],
+            "practice_language": scenario["practice_language"]
+        }
+
+        match = index.best_match(vector, native_language)
+        if match is not None and match[1] >= self.threshold:
+            entry = index.entries[match[0]]
+            entry.variants.append(variant)
+            del entry.variants[:-self.max_variants]
+            return
+
+        entry = IndexedTopic(topic=topic, native_language=native_language, variants=[variant])
+        if len(index.entries) < self.max_entries:
+            slot = len(index.entries)
+            index.entries.append(entry)
+        else:
+            slot = index.least_recently_used_slot()
+            index.entries[slot] = entry
+            self._evictions += 1
+        index.vectors[slot] = vector
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "new_variants": self._new_variants,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+            "evictions": self._evictions,
+            "entries": {language: len(index.entries) for language, index in self._languages.items()}
+        }
+
+
+@lru_cache(maxsize=None)
+def get_scenario_index() -> ScenarioSimilarityIndex:
+    """Return the process-wide similarity index, creating it on first use."""
+    settings = get_settings()
+    return ScenarioSimilarityIndex(
+        threshold=settings.SCENARIO_SIMILARITY_THRESHOLD,
+        max_entries=settings.SCENARIO_INDEX_MAX_ENTRIES,
+        max_variants=settings.SCENARIO_INDEX_MAX_VARIANTS,
+        new_variant_rate=settings.SCENARIO_INDEX_NEW_VARIANT_RATE
+    )
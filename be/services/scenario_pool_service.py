@@ -0,0 +1,159 @@
+"""Pool of pre-generated scenarios for popular topics."""
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+
+from ..config import get_settings
+from ..deadline import detached
+from .scenario_service import generate_scenario
+from .tts_service import text_to_speech
+
+PoolKey = Tuple[str, str, str]
+
+# Consecutive generation failures after which a refill gives up until the next take
+MAX_REFILL_FAILURES = 3
+LAG_SAMPLES = 100
+
+
+def normalize_topic(topic: str) -> str:
+    """Normalize a topic so trivially different spellings share a pool."""
+    return " ".join(topic.lower().split())
+
+
+def _parse_targets(topics_setting: str, pairs_setting: str) -> List[PoolKey]:
+    topics = [normalize_topic(topic) for topic in topics_setting.split(",") if topic.strip()]
+    pairs = []
+    for pair in pairs_setting.split(","):
+        if ":" in pair:
+            practice_language, native_language = pair.split(":", 1)
+            pairs.append((practice_language.strip(), native_language.strip()))
+    return [
+        (topic, practice_language, native_language)
+        for topic in topics
+        for practice_language, native_language in pairs
+    ]
+
+
+class ScenarioPool:
+    """
+    Keeps a queue of ready scenarios (with TTS rendered) per
+    (topic, practice_language, native_language).
+
+    Each scenario is handed out once so users still get variety. When a
+    pool drops below the low-water mark a background task refills it up
+    to the target size.
+    """
+
+    def __init__(self, targets: List[PoolKey], size: int, low_water: int, concurrency: int):
+        self.size = size
+        self.low_water = low_water
+        self._pools: Dict[PoolKey, Deque[dict]] = {key: deque() for key in targets}
+        self._refills: Dict[PoolKey, asyncio.Task] = {}
+        self._below_since: Dict[PoolKey, float] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._concurrency = concurrency
+
+        self._hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._refill_lags: Deque[float] = deque(maxlen=LAG_SAMPLES)
+
+    def take(self, topic: str, practice_language: str, native_language: str) -> Optional[dict]:
+        """
+        Take an unused scenario from the pool.
+        Returns None for unknown topics or an empty pool; callers fall back
+        to live generation.
+        """
+        key = (normalize_topic(topic), practice_language, native_language)
+        pool = self._pools.get(key)
+        if pool is None:
+            self._bypassed += 1
+            return None
+
+        scenario = pool.popleft() if pool else None
+        if scenario is not None:
+            self._hits += 1
+        else:
+            self._misses += 1
+
+        if len(pool) < self.low_water:
+            self._schedule_refill(key)
+        return scenario
+
+    def fill_all(self) -> None:
+        """Start filling every pool, e.g. after startup."""
+        for key in self._pools:
+            self._schedule_refill(key)
+
+    def _schedule_refill(self, key: PoolKey) -> None:
+        self._below_since.setdefault(key, time.monotonic())
+        task = self._refills.get(key)
+        if task is None or task.done():
+            self._refills[key] = detached(self._refill(key))
+
+    async def _refill(self, key: PoolKey) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        topic, practice_language, native_language = key
+        pool = self._pools[key]
+        failures = 0
+
+        while len(pool) < self.size and failures < MAX_REFILL_FAILURES:
+            async with self._semaphore:
+                scenario = await generate_scenario(topic, practice_language, native_language)
+                if scenario:
+                    scenario["audio_url"] = await text_to_speech(
+                        scenario["scenario_text"],
+                        language=practice_language
+                    )
+            if scenario:
+                pool.append(scenario)
+                failures = 0
+            else:
+                failures += 1
+
+        started = self._below_since.pop(key, None)
+        if started is not None and len(pool) >= self.size:
+            self._refill_lags.append(time.monotonic() - started)
+
+    async def stop(self) -> None:
+        """Cancel running refills."""
+        for task in self._refills.values():
+            task.cancel()
+        await asyncio.gather(*self._refills.values(), return_exceptions=True)
+        self._refills.clear()
+
+    def stats(self) -> dict:
+        """Return hit rate, pool levels and refill lag."""
+        served = self._hits + self._misses
+        lags = list(self._refill_lags)
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "bypassed": self._bypassed,
+            "hit_rate": round(self._hits / served, 3) if served else None,
+            "refill_lag_seconds": {
+                "last": round(lags[-1], 3) if lags else None,
+                "avg": round(sum(lags) / len(lags), 3) if lags else None,
+                "max": round(max(lags), 3) if lags else None
+            },
+            "refilling": sum(1 for task in self._refills.values() if not task.done()),
+            "pools": {
+                f"{topic}|{practice_language}|{native_language}": len(pool)
+                for (topic, practice_language, native_language), pool in self._pools.items()
+            }
+        }
+
+
+@lru_cache(maxsize=None)
+def get_scenario_pool() -> ScenarioPool:
+    """Return the process-wide scenario pool, creating it on first use."""
+    settings = get_settings()
+    return ScenarioPool(
+        _parse_targets(settings.SCENARIO_POOL_TOPICS, settings.SCENARIO_POOL_LANGUAGE_PAIRS),
+        size=settings.SCENARIO_POOL_SIZE,
+        low_water=settings.SCENARIO_POOL_LOW_WATER,
+        concurrency=settings.SCENARIO_POOL_REFILL_CONCURRENCY
+    )
@@ -1,33 +1,54 @@
 """OpenAI service for generating practice scenarios."""
+import logging
 import httpx
-from typing import Optional
-from ..config import OPENAI_API_KEY, OPENAI_BASE_URL
+from typing import Callable, Optional
+from ..config import get_settings
+from ..deadline import stage_timeout
+from ..metrics import OPENAI_CHAT, track_upstream
+from .completion_stream import iter_completion_deltas
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_scenario_line(line: str) -> Optional[str]:
+    line = line.strip()
+    if line.startswith("SCENARIO:"):
+        return line.replace("SCENARIO:", "").strip()
+    return None
+
 
 async def generate_scenario(
     user_input: str,
     practice_language: str = "en",
-    native_language: str = "en"
+    native_language: str = "en",
+    on_scenario_text: Optional[Callable[[str], None]] = None
 ) -> Optional[dict]:
     """
     Generate a random practice scenario based on user input using OpenAI.
+
+    The completion is streamed; as soon as the SCENARIO line is complete
+    on_scenario_text is called with it, so callers can start TTS while the
+    TASK line is still being generated.
     
     Args:
         user_input: User's keyword or description (e.g., "ordering food")
         practice_language: Target language for practice
         native_language: User's native language for instructions
+        on_scenario_text: Optional callback fired once with the scenario text
         
     Returns:
         dict with 'scenario_text' and 'instructions' or None if error
     """
-    if not OPENAI_API_KEY:
-        print("Warning: OPENAI_API_KEY not set")
+    settings = get_settings()
+    if not settings.OPENAI_API_KEY:
+        logger.warning("OPENAI_API_KEY not set")
         return None
     
-    url = f"{OPENAI_BASE_URL}/chat/completions"
+    url = f"{settings.OPENAI_BASE_URL}/chat/completions"
     
     headers = {
         "Content-Type": "application/json",
-        "Authorization": f"Bearer {OPENAI_API_KEY}"
+        "Authorization": f"Bearer {settings.OPENAI_API_KEY}"
     }
     
     # Create a prompt to generate scenario
@@ -55,16 +76,35 @@ Now generate a unique scenario for: {user_input}"""
             {"role": "user", "content": user_prompt}
         ],
         "temperature": 0.9,  # Higher temperature for more creative/random scenarios
-        "max_tokens": 200
+        "max_tokens": 200,
+        "stream": True
     }
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=data, headers=headers)
-            response.raise_for_status()
-            
-            result = response.json()
-            content = result["choices"][0]["message"]["content"]
+        async with httpx.AsyncClient(timeout=stage_timeout(30.0)) as client:
+            with track_upstream(OPENAI_CHAT) as call:
+                async with client.stream("POST", url, json=data, headers=headers) as response:
+                    call.status = response.status_code
+                    if response.status_code != 200:
+                        error_body = await response.aread()
+                        error_preview = error_body[:200].decode("utf-8", "replace") if error_body else "No error details"
+                        logger.warning("OpenAI API error", extra={"status": response.status_code, "body": error_preview})
+                        return None
+
+                    content = ""
+                    scenario_announced = False
+                    async for delta in iter_completion_deltas(response):
+                        content += delta
+                        if scenario_announced or on_scenario_text is None:
+                            continue
+                        # The SCENARIO line is complete once a newline follows it
+                        *complete_lines, _ = content.split("\n")
+                        for line in complete_lines:
+                            scenario_line = _parse_scenario_line(line)
+                            if scenario_line:
+                                on_scenario_text(scenario_line)
+                                scenario_announced = True
+                                break
             
             # Parse the response
             lines = content.strip().split("\n")
@@ -72,8 +112,11 @@ Now generate a unique scenario for: {user_input}"""
             task = ""
             
             for line in lines:
-                if line.startswith("SCENARIO:"):
-                    scenario = line.replace("SCENARIO:", "").strip()
+                line = line.strip()
+                scenario_line = _parse_scenario_line(line)
+                if scenario_line is not None:
+                    # First non-empty SCENARIO line, the same one on_scenario_text was given
+                    scenario = scenario or scenario_line
                 elif line.startswith("TASK:"):
                     task = line.replace("TASK:", "").strip()
             
@@ -88,10 +131,6 @@ Now generate a unique scenario for: {user_input}"""
                 "practice_language": practice_language
             }
             
-    except httpx.HTTPStatusError as e:
-        error_preview = e.response.text[:200] if e.response.text else "No error details"
-        print(f"OpenAI API error: {e.response.status_code} - {error_preview}")
-        return None
     except Exception as e:
-        print(f"Error generating scenario: {str(e)}")
-        return None
\ No newline at end of file
+        logger.error("Error generating scenario", extra={"error": str(e)})
+        return None
@@ -1,14 +1,16 @@
 """ElevenLabs Speech-to-Text service."""
+import logging
 import httpx
 from pathlib import Path
 from typing import Optional
 import uuid
 
-from ..config import (
-    ELEVENLABS_API_KEY,
-    ELEVENLABS_BASE_URL,
-    AUDIO_DIR
-)
+from ..config import get_settings
+from ..deadline import stage_timeout
+from ..log import redact
+from ..metrics import ELEVENLABS_STT, track_upstream
+
+logger = logging.getLogger(__name__)
 
 
 async def speech_to_text(audio_data: bytes, language: Optional[str] = None) -> Optional[str]:
@@ -22,15 +24,16 @@ async def speech_to_text(audio_data: bytes, language: Optional[str] = None) -> O
     Returns:
         Transcribed text or None if error
     """
-    if not ELEVENLABS_API_KEY:
-        print("Warning: ELEVENLABS_API_KEY not set")
+    settings = get_settings()
+    if not settings.ELEVENLABS_API_KEY:
+        logger.warning("ELEVENLABS_API_KEY not set")
         return None
     
     # ElevenLabs Scribe v2 STT endpoint
-    url = f"{ELEVENLABS_BASE_URL}/speech-to-text"
+    url = f"{settings.ELEVENLABS_BASE_URL}/speech-to-text"
     
     headers = {
-        "xi-api-key": ELEVENLABS_API_KEY
+        "xi-api-key": settings.ELEVENLABS_API_KEY
     }
     
     # # Save audio temporarily
@@ -89,7 +92,7 @@ async def speech_to_text(audio_data: bytes, language: Optional[str] = None) -> O
         
     #     return None
     try:
-        print(f"Sending {len(audio_data)} bytes to ElevenLabs STT...")
+        logger.debug("Sending audio to ElevenLabs STT", extra={"bytes": len(audio_data)})
         
         # Prepare multipart form data
         files = {
@@ -101,31 +104,33 @@ async def speech_to_text(audio_data: bytes, language: Optional[str] = None) -> O
         }
         
         # Use longer timeout for audio processing
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                url, 
-                files=files,
-                data=data,
-                headers=headers
-            )
+        async with httpx.AsyncClient(timeout=stage_timeout(60.0)) as client:
+            with track_upstream(ELEVENLABS_STT) as call:
+                call.sent(len(audio_data))
+                response = await client.post(
+                    url, 
+                    files=files,
+                    data=data,
+                    headers=headers
+                )
+                call.status = response.status_code
             response.raise_for_status()
             
             result = response.json()
             transcript = result.get("text", "")
             
-            print(f"✅ Transcription successful: {transcript[:100]}...")
+            logger.debug("Transcription successful", extra={"transcript": redact(transcript)})
             return transcript
                 
     except httpx.TimeoutException:
-        print("❌ STT Error: Request timed out")
+        logger.warning("STT request timed out")
         return None
     except httpx.HTTPStatusError as e:
-        error_preview = e.response.text[:300] if e.response.text else "No error details"
-        print(f"❌ ElevenLabs STT API error: {e.response.status_code}")
-        print(f"Error details: {error_preview}")
+        error_preview = e.response.text[:200] if e.response.text else "No error details"
+        logger.warning("ElevenLabs STT API error", extra={"status": e.response.status_code, "body": error_preview})
         return None
     except Exception as e:
-        print(f"❌ Error in STT: {str(e)}")
+        logger.error("Error in STT", extra={"error": str(e)})
         return None
 
 # async def transcribe_audio_file(file_path: Path, language: Optional[str] = None) -> Optional[str]:
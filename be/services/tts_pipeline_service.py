@@ -0,0 +1,215 @@
+"""Sentence-pipelined text-to-speech for long texts.
+
+Segments render in the process that created the playlist, but each one
+is stored under the content hash of its sentence like any other TTS
+audio, and the playlist's sentences are kept in the shared cache. Any
+worker can therefore answer the status and stream routes: from its own
+running playlist when it has one, otherwise from the segment files,
+rendering a missing segment itself when a stream reaches it.
+"""
+import asyncio
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional
+
+from ..cache import get_cache
+from ..config import get_settings
+from ..deadline import detached
+from .audio_lifecycle_service import get_audio_manager
+from .tts_service import text_to_speech, tts_cache_key, audio_path_for_key, audio_url_for_key
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_URL_PREFIX = "/api/tts/playlist"
+MAX_PLAYLISTS = 500
+PLAYLIST_CACHE_NAMESPACE = "tts_playlists"
+PLAYLIST_TTL_SECONDS = 3600
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# A sentence ends with terminal punctuation (Latin or CJK) followed by
+# whitespace or the end of the text.
+SENTENCE_PATTERN = re.compile(r"[^.!?。！？]+(?:[.!?。！？]+|$)")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, keeping their terminal punctuation."""
+    sentences = [match.group(0).strip() for match in SENTENCE_PATTERN.finditer(text)]
+    return [sentence for sentence in sentences if sentence]
+
+
+@dataclass
+class Playlist:
+    """Ordered audio segments for one pipelined synthesis."""
+    id: str
+    sentences: List[str]
+    audio_urls: List[Optional[str]] = field(default_factory=list)
+    ready: List[asyncio.Event] = field(default_factory=list)
+    tasks: List[asyncio.Task] = field(default_factory=list)
+    output_format: Optional[str] = None
+    language: Optional[str] = None
+    started_at: float = field(default_factory=time.perf_counter)
+    time_to_first_audio: Optional[float] = None
+
+    @property
+    def complete(self) -> bool:
+        return all(event.is_set() for event in self.ready)
+
+    def to_dict(self) -> dict:
+        segments = []
+        for index, sentence in enumerate(self.sentences):
+            if not self.ready[index].is_set():
+                status = "pending"
+            elif self.audio_urls[index]:
+                status = "ready"
+            else:
+                status = "failed"
+            segments.append({
+                "index": index,
+                "text": sentence,
+                "audio_url": self.audio_urls[index],
+                "status": status
+            })
+        return {
+            "id": self.id,
+            "segments": segments,
+            "complete": self.complete,
+            "stream_url": f"{PLAYLIST_URL_PREFIX}/{self.id}/stream",
+            "time_to_first_audio_ms": (
+                round(self.time_to_first_audio * 1000)
+                if self.time_to_first_audio is not None else None
+            )
+        }
+
+
+_playlists: "OrderedDict[str, Playlist]" = OrderedDict()
+
+
+async def get_playlist(playlist_id: str) -> Optional[Playlist]:
+    """
+    Return a playlist: the running one if this process created it, otherwise
+    one rebuilt from the shared cache whose segments are ready once their
+    files exist. None if the playlist is unknown or has expired.
+    """
+    playlist = _playlists.get(playlist_id)
+    if playlist is not None:
+        return playlist
+    stored = await get_cache(PLAYLIST_CACHE_NAMESPACE).get(playlist_id)
+    if stored is None:
+        return None
+    return _playlist_from_files(playlist_id, stored)
+
+
+def _playlist_from_files(playlist_id: str, stored: dict) -> Playlist:
+    playlist = Playlist(
+        id=playlist_id,
+        sentences=stored["sentences"],
+        output_format=stored["output_format"],
+        language=stored["language"]
+    )
+    for sentence in playlist.sentences:
+        key = tts_cache_key(sentence, playlist.output_format)
+        ready = asyncio.Event()
+        if audio_path_for_key(key, playlist.output_format).exists():
+            playlist.audio_urls.append(audio_url_for_key(key, playlist.output_format))
+            ready.set()
+        else:
+            playlist.audio_urls.append(None)
+        playlist.ready.append(ready)
+    return playlist
+
+
+def _register(playlist: Playlist) -> None:
+    _playlists[playlist.id] = playlist
+    while len(_playlists) > MAX_PLAYLISTS:
+        _, evicted = _playlists.popitem(last=False)
+        for task in evicted.tasks:
+            task.cancel()
+
+
+async def _render_segment(playlist: Playlist, index: int, semaphore: asyncio.Semaphore) -> None:
+    try:
+        async with semaphore:
+            # Same cache as whole-text synthesis
+            playlist.audio_urls[index] = await text_to_speech(
+                playlist.sentences[index],
+                language=playlist.language,
+                output_format=playlist.output_format
+            )
+        if index == 0:
+            playlist.time_to_first_audio = time.perf_counter() - playlist.started_at
+            logger.info(
+                "Playlist first audio ready",
+                extra={"playlist_id": playlist.id, "time_to_first_audio_ms": round(playlist.time_to_first_audio * 1000)}
+            )
+    finally:
+        playlist.ready[index].set()
+
+
+async def synthesize_pipelined(
+    text: str,
+    language: Optional[str] = None,
+    output_format: Optional[str] = None
+) -> Optional[Playlist]:
+    """
+    Synthesize text sentence by sentence with bounded parallelism.
+
+    Returns as soon as the first sentence has been rendered; the remaining
+    segments keep rendering in the background and are exposed through the
+    playlist.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return None
+
+    playlist = Playlist(id=uuid.uuid4().hex, sentences=sentences, output_format=output_format, language=language)
+    playlist.audio_urls = [None] * len(sentences)
+    playlist.ready = [asyncio.Event() for _ in sentences]
+
+    # Tasks are created in order so the first sentence acquires the semaphore first
+    semaphore = asyncio.Semaphore(get_settings().TTS_PIPELINE_CONCURRENCY)
+    playlist.tasks = [
+        detached(_render_segment(playlist, index, semaphore))
+        for index in range(len(sentences))
+    ]
+    _register(playlist)
+    # Lets other workers answer for the playlist
+    await get_cache(PLAYLIST_CACHE_NAMESPACE).set(
+        playlist.id,
+        {"sentences": sentences, "output_format": output_format, "language": language},
+        ttl=PLAYLIST_TTL_SECONDS
+    )
+
+    await playlist.ready[0].wait()
+    return playlist
+
+
+async def stream_playlist(playlist: Playlist) -> AsyncIterator[bytes]:
+    """Yield the playlist's segments as one concatenated stream, in order."""
+    for index, sentence in enumerate(playlist.sentences):
+        if not playlist.tasks and not playlist.ready[index].is_set():
+            # Rebuilt from the cache and not rendered yet: the segment cache makes this a
+            # file lookup if the creating worker has finished it meanwhile
+            playlist.audio_urls[index] = await text_to_speech(
+                sentence,
+                language=playlist.language,
+                output_format=playlist.output_format
+            )
+            playlist.ready[index].set()
+        await playlist.ready[index].wait()
+        if not playlist.audio_urls[index]:
+            continue
+        audio_path = audio_path_for_key(tts_cache_key(sentence, playlist.output_format), playlist.output_format)
+        try:
+            with get_audio_manager().pin(audio_path.name), open(audio_path, "rb") as f:
+                while True:
+                    chunk = await asyncio.to_thread(f.read, STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        except FileNotFoundError:
+            logger.warning("Playlist segment missing", extra={"file": audio_path.name})
+            continue
@@ -1,73 +1,453 @@
-"""ElevenLabs text-to-speech service."""
+"""ElevenLabs text-to-speech service.
+
+Clients may ask for a compact output format (OUTPUT_FORMATS, e.g.
+opus_48000_32 or mp3_22050_32 for slow mobile networks); ElevenLabs
+renders it directly via its output_format parameter. Every format is
+cached separately: the format is part of the cache key and sets the file
+extension. Keys for the provider default (mp3_44100_128) are unchanged,
+so audio cached before formats existed stays valid.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
 import httpx
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import uuid
 # import os
 
-from ..config import (
-    ELEVENLABS_API_KEY,
-    ELEVENLABS_VOICE_ID,
-    ELEVENLABS_BASE_URL,
-    AUDIO_DIR
-)
+from ..cache import get_cache
+from ..config import get_settings
+from ..deadline import detached, remaining, stage_timeout
+from ..metrics import AUDIO_BYTES_SERVED, ELEVENLABS_TTS, start_upstream, track_upstream
+from .audio_lifecycle_service import get_audio_manager
+
+logger = logging.getLogger(__name__)
+
+TTS_MODEL_ID = "eleven_multilingual_v2"  # Supports multiple languages
+TTS_VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.75
+}
+
+# ElevenLabs output_format -> (file extension, media type)
+OUTPUT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "mp3_44100_128": ("mp3", "audio/mpeg"),
+    "mp3_44100_64": ("mp3", "audio/mpeg"),
+    "mp3_22050_32": ("mp3", "audio/mpeg"),
+    "opus_48000_64": ("opus", "audio/ogg"),
+    "opus_48000_32": ("opus", "audio/ogg"),
+}
+# What ElevenLabs renders when no output_format is sent
+PROVIDER_DEFAULT_FORMAT = "mp3_44100_128"
+
+
+class _SharedSynthesis:
+    """A synthesis running in its own task, and the number of callers awaiting it."""
+
+    __slots__ = ("task", "callers")
+
+    def __init__(self, task: "asyncio.Task[Optional[str]]"):
+        self.task = task
+        self.callers = 0
+
+
+# Syntheses currently in flight, keyed by cache key, so that concurrent
+# first requests for the same audio share a single upstream call.
+_inflight: Dict[str, _SharedSynthesis] = {}
+
+# Texts registered for streaming playback live in the shared cache, keyed by
+# cache key, so any worker can serve the stream URL. The TTL drops URLs that
+# are never fetched.
+STREAM_URL_PREFIX = "/api/tts/stream"
+STREAM_CACHE_NAMESPACE = "tts_streams"
+STREAM_TTL_SECONDS = 3600
+
+
+def resolve_output_format(output_format: Optional[str]) -> str:
+    """Return the requested format, or TTS_DEFAULT_OUTPUT_FORMAT if none; ValueError if unknown."""
+    if not output_format:
+        output_format = get_settings().TTS_DEFAULT_OUTPUT_FORMAT
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported audio format '{output_format}'. Choose one of: {', '.join(OUTPUT_FORMATS)}")
+    return output_format
 
 
-async def text_to_speech(text: str, language: Optional[str] = None) -> Optional[str]:
+def media_type_for_format(output_format: Optional[str]) -> str:
+    return OUTPUT_FORMATS[resolve_output_format(output_format)][1]
+
+
+def tts_cache_key(text: str, output_format: Optional[str] = None) -> str:
+    """
+    Build the content-addressed cache key for a TTS request.
+    The key covers everything that changes the rendered audio.
+    """
+    fields = {
+        "text": text,
+        "voice_id": get_settings().ELEVENLABS_VOICE_ID,
+        "model_id": TTS_MODEL_ID,
+        "voice_settings": TTS_VOICE_SETTINGS,
+    }
+    output_format = resolve_output_format(output_format)
+    if output_format != PROVIDER_DEFAULT_FORMAT:
+        fields["output_format"] = output_format
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def audio_filename_for_key(key: str, output_format: Optional[str] = None) -> str:
+    return f"{key}.{OUTPUT_FORMATS[resolve_output_format(output_format)][0]}"
+
+
+def audio_path_for_key(key: str, output_format: Optional[str] = None) -> Path:
+    """Return the on-disk location of the cached audio for a key."""
+    return get_settings().AUDIO_DIR / audio_filename_for_key(key, output_format)
+
+
+def audio_url_for_key(key: str, output_format: Optional[str] = None) -> str:
+    """Return the public URL path (relative to /static/audio) for a key."""
+    return f"/static/audio/{audio_filename_for_key(key, output_format)}"
+
+
+def cached_audio_url(text: str, output_format: Optional[str] = None) -> Optional[str]:
+    """Return the URL of already rendered audio for text, without synthesizing."""
+    key = tts_cache_key(text, output_format)
+    if audio_path_for_key(key, output_format).exists():
+        get_audio_manager().touch(audio_filename_for_key(key, output_format))
+        return audio_url_for_key(key, output_format)
+    return None
+
+
+async def metered(chunks: AsyncIterator[bytes], source: str, output_format: Optional[str]) -> AsyncIterator[bytes]:
+    """Pass audio chunks through, counting the bytes sent to the client."""
+    counter = AUDIO_BYTES_SERVED.labels(source, OUTPUT_FORMATS[resolve_output_format(output_format)][0])
+    async for chunk in chunks:
+        counter.inc(len(chunk))
+        yield chunk
+
+
+def _request_params(output_format: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Query parameters and headers for an ElevenLabs synthesis in output_format."""
+    settings = get_settings()
+    headers = {
+        "Accept": OUTPUT_FORMATS[output_format][1],
+        "Content-Type": "application/json",
+        "xi-api-key": settings.ELEVENLABS_API_KEY
+    }
+    return {"output_format": output_format}, headers
+
+
+def _temp_path_for(audio_path: Path) -> Path:
+    """Return a unique hidden temp path next to the final audio file."""
+    return audio_path.with_name(f".{audio_path.name}.{uuid.uuid4().hex}.part")
+
+
+def _write_audio_atomic(audio_path: Path, content: bytes) -> None:
+    """Write audio to a temp file and rename it so readers never see partial files."""
+    temp_path = _temp_path_for(audio_path)
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(content)
+        os.replace(temp_path, audio_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+async def text_to_speech(
+    text: str,
+    language: Optional[str] = None,
+    output_format: Optional[str] = None
+) -> Optional[str]:
     """
     Convert text to speech using ElevenLabs API.
     Returns the URL path to the generated audio file.
+
+    Audio is cached under a hash of the text, voice, model, voice settings
+    and output format, so repeated requests reuse the existing file without
+    an upstream call.
+
+    Concurrent callers for the same audio share one synthesis, run in its
+    own task without any request's deadline. Each caller waits at most until
+    its own deadline; the synthesis is cancelled only once no caller is left.
     """
-    if not ELEVENLABS_API_KEY:
-        print("Warning: ELEVENLABS_API_KEY not set")
+    if not get_settings().ELEVENLABS_API_KEY:
+        logger.warning("ELEVENLABS_API_KEY not set")
+        return None
+
+    output_format = resolve_output_format(output_format)
+    cached_url = cached_audio_url(text, output_format)
+    if cached_url is not None:
+        return cached_url
+    key = tts_cache_key(text, output_format)
+
+    # Join a synthesis already running for the same key
+    shared = _inflight.get(key)
+    if shared is None:
+        shared = _inflight[key] = _SharedSynthesis(detached(_synthesize(text, key, output_format, language)))
+        shared.task.add_done_callback(lambda _: _release_inflight(key, shared))
+
+    shared.callers += 1
+    try:
+        return await asyncio.wait_for(asyncio.shield(shared.task), timeout=remaining())
+    except asyncio.TimeoutError:
+        logger.warning("TTS not ready before the request deadline", extra={"key": key[:16]})
         return None
-    
+    finally:
+        shared.callers -= 1
+        if not shared.callers and not shared.task.done():
+            # Nobody is waiting any more (e.g. every client disconnected)
+            _release_inflight(key, shared)
+            shared.task.cancel()
+
+
+def _release_inflight(key: str, shared: _SharedSynthesis) -> None:
+    if _inflight.get(key) is shared:
+        del _inflight[key]
+
+
+async def _synthesize(text: str, key: str, output_format: str, language: Optional[str] = None) -> Optional[str]:
+    """Call ElevenLabs and store the rendered audio under its cache key."""
+    settings = get_settings()
     # url = f"{ELEVENLABS_BASE_URL}/text-to-speech/{ELEVENLABS_VOICE_ID}"
-    url = f"{ELEVENLABS_BASE_URL}/text-to-speech/{ELEVENLABS_VOICE_ID}"
-    
-    headers = {
-        "Accept": "audio/mpeg",
-        "Content-Type": "application/json",
-        "xi-api-key": ELEVENLABS_API_KEY
-    }
-    
+    url = f"{settings.ELEVENLABS_BASE_URL}/text-to-speech/{settings.ELEVENLABS_VOICE_ID}"
+    params, headers = _request_params(output_format)
+
     data = {
         "text": text,
-        "model_id": "eleven_multilingual_v2",  # Supports multiple languages
-        "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.75
-        }
+        "model_id": TTS_MODEL_ID,
+        "voice_settings": TTS_VOICE_SETTINGS
     }
-    
+
     # Add language hint if provided (for better pronunciation)
     if language:
         # ElevenLabs can detect language, but we can add it as metadata
         # The multilingual model will handle it automatically
         pass
-    
+
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=data, headers=headers)
+        async with httpx.AsyncClient(timeout=stage_timeout(30.0)) as client:
+            with track_upstream(ELEVENLABS_TTS) as call:
+                response = await client.post(url, params=params, json=data, headers=headers)
+                call.status = response.status_code
+                call.received(len(response.content))
             response.raise_for_status()
-            
-            # Generate a unique filename
-            audio_filename = f"{uuid.uuid4()}.mp3"
-            audio_path = AUDIO_DIR / audio_filename
-            
+
+            audio_filename = audio_filename_for_key(key, output_format)
+            audio_path = audio_path_for_key(key, output_format)
+
             # Save the audio file
-            with open(audio_path, "wb") as f:
-                f.write(response.content)
-            print(f"Audio generated successfully: {audio_filename}")
+            _write_audio_atomic(audio_path, response.content)
+            get_audio_manager().record(audio_path)
+            logger.debug("Audio generated", extra={"file": audio_filename, "bytes": len(response.content)})
             # Return the URL path (relative to /static/audio)
-            return f"/static/audio/{audio_filename}"
-            
+            return audio_url_for_key(key, output_format)
+
     except httpx.HTTPStatusError as e:
         # Log error details (server-side only, truncate response to avoid logging sensitive data)
         error_preview = e.response.text[:200] if e.response.text else "No error details"
-        print(f"ElevenLabs API error: {e.response.status_code} - {error_preview}")
+        logger.warning("ElevenLabs API error", extra={"status": e.response.status_code, "body": error_preview})
         return None
     except Exception as e:
         # Log error (server-side only)
-        print(f"Error generating TTS: {str(e)}")
+        logger.error("Error generating TTS", extra={"error": str(e)})
+        return None
+
+
+async def register_stream(text: str, output_format: Optional[str] = None) -> Optional[str]:
+    """
+    Register text for streaming playback and return a URL the client can play.
+
+    Returns the static file URL directly when the audio is already cached,
+    otherwise a stream URL that synthesizes on first fetch. The URL names
+    the format, so the cached file can be found after the stream completes.
+    """
+    if not get_settings().ELEVENLABS_API_KEY:
+        logger.warning("ELEVENLABS_API_KEY not set")
+        return None
+
+    output_format = resolve_output_format(output_format)
+    cached_url = cached_audio_url(text, output_format)
+    if cached_url is not None:
+        return cached_url
+
+    key = tts_cache_key(text, output_format)
+    await get_cache(STREAM_CACHE_NAMESPACE).set(key, text, ttl=STREAM_TTL_SECONDS)
+    return f"{STREAM_URL_PREFIX}/{key}?output_format={output_format}"
+
+
+async def get_stream_text(key: str) -> Optional[str]:
+    """Return the text registered for a stream key, if any."""
+    return await get_cache(STREAM_CACHE_NAMESPACE).get(key)
+
+
+class SpeechStreamError(Exception):
+    """The upstream synthesis failed after audio had started streaming."""
+
+
+class _SharedRelay:
+    """
+    One upstream synthesis stream per cache key, shared by every listener.
+
+    Chunks are kept in memory as they arrive, so a listener that joins late
+    still gets the audio from the start. The relay runs in its own task and
+    is cancelled once no listener is left.
+    """
+
+    def __init__(self, key: str, output_format: str):
+        self.key = key
+        self.output_format = output_format
+        self.chunks: List[bytes] = []
+        self.finished = False
+        self.error: Optional[Exception] = None
+        self.listeners = 0
+        self.opened: "asyncio.Future[bool]" = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    async def run(self, text: str) -> None:
+        """Open the upstream stream, then relay it into the chunk list and a temp file."""
+        settings = get_settings()
+        url = f"{settings.ELEVENLABS_BASE_URL}/text-to-speech/{settings.ELEVENLABS_VOICE_ID}/stream"
+        params, headers = _request_params(self.output_format)
+        data = {
+            "text": text,
+            "model_id": TTS_MODEL_ID,
+            "voice_settings": TTS_VOICE_SETTINGS
+        }
+
+        audio_path = audio_path_for_key(self.key, self.output_format)
+        temp_path = _temp_path_for(audio_path)
+        client = httpx.AsyncClient(timeout=stage_timeout(30.0))
+        call = start_upstream(ELEVENLABS_TTS)
+        response: Optional[httpx.Response] = None
+        completed = False
+        received = 0
+        try:
+            try:
+                request = client.build_request("POST", url, params=params, json=data, headers=headers)
+                response = await client.send(request, stream=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Error starting TTS stream", extra={"error": str(e)})
+                return
+
+            call.status = response.status_code
+            if response.status_code != 200:
+                error_body = await response.aread()
+                error_preview = error_body[:200].decode("utf-8", "replace") if error_body else "No error details"
+                logger.warning("ElevenLabs API error", extra={"status": response.status_code, "body": error_preview})
+                return
+
+            self.opened.set_result(True)
+            try:
+                with open(temp_path, "wb") as f:
+                    async for chunk in response.aiter_bytes():
+                        f.write(chunk)
+                        received += len(chunk)
+                        async with self._changed:
+                            self.chunks.append(chunk)
+                            self._changed.notify_all()
+                completed = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Error relaying TTS stream", extra={"error": str(e)})
+                self.error = e
+        except asyncio.CancelledError:
+            # Every listener went away; the partial file is discarded below
+            call.finish(cancelled=True)
+            raise
+        finally:
+            if not self.opened.done():
+                self.opened.set_result(False)
+            if response is not None:
+                await response.aclose()
+            await client.aclose()
+            call.received(received)
+            call.finish(ok=completed)
+            if completed:
+                os.replace(temp_path, audio_path)
+                get_audio_manager().record(audio_path)
+                await get_cache(STREAM_CACHE_NAMESPACE).delete(self.key)
+                logger.debug("Audio streamed", extra={"file": audio_path.name, "bytes": received})
+            elif temp_path.exists():
+                temp_path.unlink()
+            self._release()
+            async with self._changed:
+                self.finished = True
+                self._changed.notify_all()
+
+    async def listen(self) -> AsyncIterator[bytes]:
+        """Yield every chunk from the start; raises SpeechStreamError if the upstream failed."""
+        sent = 0
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: sent < len(self.chunks) or self.finished)
+                    pending = self.chunks[sent:]
+                    finished = self.finished
+                for chunk in pending:
+                    yield chunk
+                sent += len(pending)
+                if finished and sent == len(self.chunks):
+                    break
+            if self.error is not None:
+                raise SpeechStreamError("TTS stream failed") from self.error
+        finally:
+            self.leave()
+
+    def leave(self) -> None:
+        self.listeners -= 1
+        if not self.listeners and self.task is not None and not self.task.done():
+            self._release()
+            self.task.cancel()
+
+    def _release(self) -> None:
+        if _relays.get(self.key) is self:
+            del _relays[self.key]
+
+
+# Streaming syntheses in flight, keyed by cache key, so concurrent fetches of
+# the same stream URL share one upstream stream.
+_relays: Dict[str, _SharedRelay] = {}
+
+
+async def open_speech_stream(text: str, output_format: Optional[str] = None) -> Optional[AsyncIterator[bytes]]:
+    """
+    Start a streaming synthesis with ElevenLabs, or join one already running
+    for the same audio.
+
+    Returns an async iterator of audio chunks once the upstream response has
+    been accepted, or None if the request failed. Chunks are teed into the
+    cache file, which is only published once the stream completes. If the
+    upstream fails mid-stream the iterator raises SpeechStreamError, so the
+    response is aborted rather than ended as if the audio were complete.
+    """
+    if not get_settings().ELEVENLABS_API_KEY:
+        logger.warning("ELEVENLABS_API_KEY not set")
+        return None
+
+    output_format = resolve_output_format(output_format)
+    key = tts_cache_key(text, output_format)
+    relay = _relays.get(key)
+    if relay is None:
+        relay = _relays[key] = _SharedRelay(key, output_format)
+        relay.task = detached(relay.run(text))
+
+    relay.listeners += 1
+    try:
+        opened = await asyncio.wait_for(asyncio.shield(relay.opened), timeout=remaining())
+    except asyncio.TimeoutError:
+        relay.leave()
+        return None
+    except BaseException:
+        relay.leave()
+        raise
+    if not opened:
+        relay.leave()
         return None
+    return relay.listen()
@@ -0,0 +1,90 @@
+"""OpenAI service for generating spoken tutor replies."""
+import logging
+import httpx
+from typing import AsyncIterator, Dict, List, Optional
+from ..config import get_settings
+from ..deadline import stage_timeout
+from ..metrics import OPENAI_CHAT, track_upstream
+from .completion_stream import iter_completion_deltas
+
+logger = logging.getLogger(__name__)
+
+
+async def stream_tutor_reply(
+    text: str,
+    practice_language: str = "en",
+    native_language: str = "en",
+    topic: Optional[str] = None,
+    history: Optional[List[Dict[str, str]]] = None
+) -> AsyncIterator[str]:
+    """
+    Stream a short conversational tutor reply to the learner's text.
+
+    Yields content deltas as they arrive so callers can forward them
+    before the reply is complete.
+
+    Args:
+        text: What the learner said
+        practice_language: Language being practiced; the reply is in this language
+        native_language: User's native language
+        topic: Optional conversation topic to stay on
+        history: Optional earlier messages (summary and recent turns) placed before the text
+    """
+    settings = get_settings()
+    if not settings.OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY not set")
+
+    url = f"{settings.OPENAI_BASE_URL}/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+    system_prompt = f"""You are a friendly conversation partner for a beginner learning {practice_language} (native language: {native_language}).
+Reply only in {practice_language}, in 1-3 short sentences, and keep the conversation going with a simple question.
+Do not correct mistakes; corrections are handled separately."""
+    if topic:
+        system_prompt += f"\nThe conversation is about: {topic}"
+
+    data = {
+        "model": settings.OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            *(history or []),
+            {"role": "user", "content": text}
+        ],
+        "temperature": 0.8,
+        "max_tokens": 150,
+        "stream": True
+    }
+
+    try:
+        async with httpx.AsyncClient(timeout=stage_timeout(30.0)) as client:
+            with track_upstream(OPENAI_CHAT) as call:
+                async with client.stream("POST", url, json=data, headers=headers) as response:
+                    call.status = response.status_code
+                    if response.status_code != 200:
+                        error_body = await response.aread()
+                        error_preview = error_body[:200].decode("utf-8", "replace") if error_body else "No error details"
+                        logger.warning("OpenAI API error", extra={"status": response.status_code, "body": error_preview})
+                        raise Exception("Failed to generate reply. Please try again.")
+
+                    async for delta in iter_completion_deltas(response):
+                        yield delta
+    except httpx.HTTPError as e:
+        logger.error("Error generating tutor reply", extra={"error": str(e)})
+        raise Exception("Failed to generate reply. Please try again.")
+
+
+async def generate_tutor_reply(
+    text: str,
+    practice_language: str = "en",
+    native_language: str = "en",
+    topic: Optional[str] = None,
+    history: Optional[List[Dict[str, str]]] = None
+) -> str:
+    """The whole tutor reply as one string (see stream_tutor_reply)."""
+    parts = []
+    async for delta in stream_tutor_reply(text, practice_language, native_language, topic, history):
+        parts.append(delta)
+    return "".join(parts)
@@ -0,0 +1,122 @@
+"""Background warm-up of predictable TTS audio and popular scenarios."""
+import asyncio
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..config import get_settings
+from .language_service import SUPPORTED_LANGUAGES
+from .scenario_pool_service import get_scenario_pool
+from .tts_service import text_to_speech, cached_audio_url
+
+logger = logging.getLogger(__name__)
+
+# Fixed phrases spoken by the app, keyed by phrase id and language.
+# Languages without a translation fall back to English.
+DEFAULT_PHRASE_CATALOG: Dict[str, Dict[str, str]] = {
+    "practice_prompt": {
+        "en": "What do you want to practice for today?",
+        "es": "¿Qué quieres practicar hoy?",
+        "fr": "Qu'est-ce que tu veux pratiquer aujourd'hui ?",
+        "de": "Was möchtest du heute üben?",
+        "it": "Cosa vuoi praticare oggi?",
+        "pt": "O que você quer praticar hoje?",
+        "zh": "你今天想练习什么？",
+        "ja": "今日は何を練習したいですか？",
+        "ko": "오늘은 무엇을 연습하고 싶으세요?"
+    },
+    "great_job": {
+        "en": "Great job! Keep going.",
+        "es": "¡Muy bien! Sigue así.",
+        "fr": "Très bien ! Continue comme ça.",
+        "de": "Sehr gut! Mach weiter so."
+    },
+    "try_again": {
+        "en": "Let's try that again.",
+        "es": "Intentémoslo de nuevo.",
+        "fr": "Essayons encore une fois.",
+        "de": "Versuchen wir es noch einmal."
+    },
+    "didnt_catch": {
+        "en": "Sorry, I didn't catch that. Could you say it again?",
+        "es": "Perdona, no te he entendido. ¿Puedes repetirlo?",
+        "fr": "Désolé, je n'ai pas compris. Tu peux répéter ?",
+        "de": "Entschuldigung, das habe ich nicht verstanden. Kannst du es wiederholen?"
+    }
+}
+
+
+@lru_cache(maxsize=None)
+def get_phrase_catalog() -> Dict[str, Dict[str, str]]:
+    """Merge the optional catalog file over the built-in phrases (loaded once)."""
+    catalog = {phrase_id: dict(texts) for phrase_id, texts in DEFAULT_PHRASE_CATALOG.items()}
+    catalog_file = get_settings().TTS_WARMUP_CATALOG
+    if not catalog_file:
+        return catalog
+    try:
+        with open(Path(catalog_file), "r", encoding="utf-8") as f:
+            extra = json.load(f)
+        for phrase_id, texts in extra.items():
+            catalog.setdefault(phrase_id, {}).update(texts)
+    except (OSError, json.JSONDecodeError, AttributeError) as e:
+        logger.warning("Could not load phrase catalog", extra={"file": catalog_file, "error": str(e)})
+    return catalog
+
+
+def get_phrase(phrase_id: str, language: str = "en") -> Optional[str]:
+    """Return the text of a catalog phrase in a language, falling back to English."""
+    texts = get_phrase_catalog().get(phrase_id)
+    if not texts:
+        return None
+    return texts.get(language.lower()) or texts.get("en")
+
+
+def phrase_audio_url(phrase_id: str, language: str = "en") -> Optional[str]:
+    """Return the pre-rendered audio URL of a catalog phrase, if it is cached."""
+    text = get_phrase(phrase_id, language)
+    return cached_audio_url(text) if text else None
+
+
+def _warmup_languages() -> List[str]:
+    languages = get_settings().TTS_WARMUP_LANGUAGES
+    if languages:
+        return [code.strip() for code in languages.split(",") if code.strip()]
+    return list(SUPPORTED_LANGUAGES)
+
+
+async def warm_up() -> None:
+    """
+    Render the phrase catalog for every warm-up language and start filling
+    the scenario pool for popular topics. Runs in the background after startup.
+    """
+    settings = get_settings()
+    if settings.OPENAI_API_KEY:
+        get_scenario_pool().fill_all()
+
+    semaphore = asyncio.Semaphore(settings.TTS_WARMUP_CONCURRENCY)
+
+    async def bounded(coro):
+        async with semaphore:
+            try:
+                await coro
+            except Exception as e:
+                logger.warning("Warm-up task failed", extra={"error": str(e)})
+
+    jobs = []
+    if settings.ELEVENLABS_API_KEY:
+        # Identical texts (e.g. English fallbacks) share one cache entry
+        texts = {
+            get_phrase(phrase_id, language)
+            for phrase_id in get_phrase_catalog()
+            for language in _warmup_languages()
+        }
+        jobs.extend(text_to_speech(text) for text in texts if text and not cached_audio_url(text))
+
+    if not jobs:
+        return
+
+    logger.info("Warm-up started", extra={"items": len(jobs)})
+    await asyncio.gather(*(bounded(job) for job in jobs))
+    logger.info("Warm-up done")
@@ -1,40 +1,247 @@
-"""Storage operations for notebook entries using JSON file."""
+"""Storage operations for notebook entries using JSON file.
+
+Every write bumps a version number kept in a small file next to the
+notes (notes.version). It only ever increases, survives restarts and is
+shared by all workers, so readers can tell whether anything changed
+without loading the notes.
+
+add_entry checks new entries against a MinHash/LSH index of
+original_text per practice language (see be.minhash). A near-duplicate
+of an earlier entry is merged into it (the entry keeps its id, takes the
+latest attempt and counts repeats) or, in link mode, stored with
+duplicate_of pointing at it. The index lives in each process and is
+updated with every write it makes. When the storage version shows that
+another process wrote, only the entries it appended or merged into are
+folded in; the index is rebuilt from the notes only if entries were
+removed or reordered (the dedup_notes pass).
+"""
 import json
+import logging
+import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import threading
 import uuid
 
-from .config import NOTES_FILE, STORAGE_DIR
+try:
+    import fcntl
+except ImportError:  # Windows: writes are then only serialized within one process
+    fcntl = None
+
+from .config import get_settings
+from .metrics import NOTES_DEDUPLICATED, track_storage
+from .minhash import LSHIndex, signature
 from .models import NotebookEntry
+from .serialization import loads
+
+logger = logging.getLogger(__name__)
+
+_write_lock = threading.Lock()
+
+
+def _version_file() -> Path:
+    return get_settings().NOTES_FILE.with_suffix(".version")
+
+
+@contextmanager
+def _exclusive_write() -> Iterator[None]:
+    """Serialize read-modify-write cycles across threads and worker processes."""
+    lock_file = get_settings().NOTES_FILE.with_suffix(".lock")
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with _write_lock, open(lock_file, "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+
+
+def get_storage_version() -> int:
+    """Current notes version; 0 before the first write. Reads one small file, never the notes."""
+    try:
+        return int(_version_file().read_text() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _bump_version() -> int:
+    # Called under _exclusive_write; os.replace keeps readers from seeing a half-written number
+    version = get_storage_version() + 1
+    version_file = _version_file()
+    temp_file = version_file.with_suffix(f".version.{os.getpid()}.tmp")
+    temp_file.write_text(str(version))
+    os.replace(temp_file, version_file)
+    return version
 
 
 def load_notes() -> List[dict]:
     """Load all notes from JSON file."""
-    if not NOTES_FILE.exists():
+    notes_file = get_settings().NOTES_FILE
+    if not notes_file.exists():
         return []
     
     try:
-        with open(NOTES_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with track_storage("read") as operation:
+            with open(notes_file, "rb") as f:
+                raw = f.read()
+            operation.payload(len(raw))
+            data = loads(raw)
             return data if isinstance(data, list) else []
-    except (json.JSONDecodeError, FileNotFoundError):
+    except (ValueError, FileNotFoundError):
+        # orjson and json both raise ValueError subclasses on bad input
         return []
 
 
-def save_notes(notes: List[dict]) -> None:
-    """Save notes to JSON file."""
-    NOTES_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(NOTES_FILE, "w", encoding="utf-8") as f:
-        json.dump(notes, f, ensure_ascii=False, indent=2, default=str)
+def save_notes(notes: List[dict]) -> int:
+    """Save notes to JSON file and bump the storage version; returns the new version."""
+    notes_file = get_settings().NOTES_FILE
+    notes_file.parent.mkdir(parents=True, exist_ok=True)
+    with track_storage("write") as operation:
+        raw = json.dumps(notes, ensure_ascii=False, indent=2, default=str).encode("utf-8")
+        # Readers don't take the write lock; os.replace keeps them from seeing a half-written file
+        temp_file = notes_file.with_suffix(f".json.{os.getpid()}.tmp")
+        with open(temp_file, "wb") as f:
+            f.write(raw)
+        os.replace(temp_file, notes_file)
+        operation.payload(len(raw))
+    return _bump_version()
+
 
+class NearDuplicateIndex:
+    """LSH indexes of original_text per practice language, over one list of notes."""
 
-def add_entry(entry: NotebookEntry) -> None:
-    """Add a new notebook entry."""
-    notes = load_notes()
-    entry_dict = entry.model_dump()
-    notes.append(entry_dict)
-    save_notes(notes)
+    def __init__(self, threshold: float, version: int = 0):
+        self.threshold = threshold
+        self.version = version
+        self._languages: Dict[str, LSHIndex] = {}
+        self._positions: Dict[str, int] = {}
+        self._merged_into: Dict[str, str] = {}
+        # Latest original_text indexed per id, to spot entries another process merged into
+        self._texts: Dict[str, str] = {}
+
+    @classmethod
+    def from_notes(cls, notes: List[dict], threshold: float, version: int) -> "NearDuplicateIndex":
+        index = cls(threshold, version)
+        index._fold_in(notes, 0)
+        return index
+
+    def catch_up(self, notes: List[dict], version: int) -> bool:
+        """
+        Fold in what other processes wrote since this index was built: appended
+        entries and new wordings merged into known ones. Returns False, leaving
+        the index unusable, if entries were removed or reordered (a rebuild is needed).
+        """
+        known = len(self._positions)
+        if len(notes) < known:
+            return False
+        for position, note in enumerate(notes[:known]):
+            note_id = note.get("id")
+            if self._positions.get(note_id) != position:
+                return False
+            text = self._texts.get(note_id)
+            if text is not None and note.get("original_text", "") != text:
+                self._index(note)
+        self._fold_in(notes, known)
+        self.version = version
+        return True
+
+    def _fold_in(self, notes: List[dict], start: int) -> None:
+        for position in range(start, len(notes)):
+            note = notes[position]
+            self._positions[note.get("id")] = position
+            if not note.get("duplicate_of"):
+                self._index(note)
+
+    def _index(self, note: dict) -> None:
+        text = note.get("original_text", "")
+        language_index = self._languages.setdefault(note.get("practice_language", ""), LSHIndex())
+        language_index.add(note.get("id"), signature(text))
+        self._texts[note.get("id")] = text
+
+    def _original_of(self, note: dict) -> Optional[str]:
+        linked = self._merged_into.get(note.get("duplicate_of"), note.get("duplicate_of"))
+        if linked in self._positions:
+            return linked
+        language_index = self._languages.get(note.get("practice_language", ""))
+        if language_index is None:
+            return None
+        match = language_index.query(signature(note.get("original_text", "")), self.threshold)
+        return match[0] if match else None
+
+    def place(self, notes: List[dict], note: dict, mode: str) -> dict:
+        """
+        Put note into notes: appended, linked to a near-duplicate (mode "link")
+        or merged into it (mode "merge"). Returns the note as stored.
+        """
+        original_id = self._original_of(note)
+        if original_id is None:
+            if note.get("duplicate_of"):
+                # Its original is gone
+                note = dict(note, duplicate_of=None)
+            notes.append(note)
+            self._positions[note.get("id")] = len(notes) - 1
+            self._index(note)
+            return note
+
+        if mode == "link":
+            if note.get("duplicate_of") != original_id:
+                NOTES_DEDUPLICATED.labels("linked").inc()
+            note = dict(note, duplicate_of=original_id)
+            notes.append(note)
+            self._positions[note.get("id")] = len(notes) - 1
+            return note
+
+        # The latest attempt replaces the text and analysis; id and position stay
+        position = self._positions[original_id]
+        original = notes[position]
+        merged = dict(
+            note,
+            id=original_id,
+            repeat_count=original.get("repeat_count", 1) + note.get("repeat_count", 1),
+            duplicate_of=None
+        )
+        notes[position] = merged
+        self._merged_into[note.get("id")] = original_id
+        # Keep matching both wordings
+        self._index(merged)
+        NOTES_DEDUPLICATED.labels("merged").inc()
+        return merged
+
+
+_near_duplicates: Optional[NearDuplicateIndex] = None
+
+
+def _near_duplicate_index(notes: List[dict]) -> NearDuplicateIndex:
+    # Called under _exclusive_write with the freshly loaded notes
+    global _near_duplicates
+    threshold = get_settings().NOTES_DEDUP_THRESHOLD
+    version = get_storage_version()
+    if _near_duplicates is None or _near_duplicates.threshold != threshold:
+        _near_duplicates = NearDuplicateIndex.from_notes(notes, threshold, version)
+    elif _near_duplicates.version != version and not _near_duplicates.catch_up(notes, version):
+        _near_duplicates = NearDuplicateIndex.from_notes(notes, threshold, version)
+    return _near_duplicates
+
+
+def add_entry(entry: NotebookEntry) -> NotebookEntry:
+    """Add a new notebook entry, merging or linking a near-duplicate. Returns the stored entry."""
+    global _near_duplicates
+    mode = get_settings().NOTES_DEDUP_MODE
+    with _exclusive_write():
+        notes = load_notes()
+        entry_dict = entry.model_dump()
+        if mode not in ("merge", "link"):
+            notes.append(entry_dict)
+            save_notes(notes)
+            return entry
+        try:
+            index = _near_duplicate_index(notes)
+            stored = index.place(notes, entry_dict, mode)
+            index.version = save_notes(notes)
+        except Exception:
+            # The index may now describe notes that were never written
+            _near_duplicates = None
+            raise
+    return NotebookEntry.model_validate(stored)
 
 
 def get_all_entries() -> List[NotebookEntry]:
@@ -43,12 +250,10 @@ def get_all_entries() -> List[NotebookEntry]:
     entries = []
     for note in notes_data:
         try:
-            # Convert timestamp string back to datetime if needed
-            if isinstance(note.get("timestamp"), str):
-                note["timestamp"] = datetime.fromisoformat(note["timestamp"])
-            entries.append(NotebookEntry(**note))
+            # One pydantic-core call; it also parses the stored timestamp string
+            entries.append(NotebookEntry.model_validate(note))
         except Exception as e:
-            print(f"Error parsing entry: {e}")
+            logger.warning("Error parsing entry", extra={"entry_id": note.get("id"), "error": str(e)})
             continue
     return entries
 
@@ -59,11 +264,9 @@ def get_entry_by_id(entry_id: str) -> Optional[NotebookEntry]:
     for note in notes_data:
         if note.get("id") == entry_id:
             try:
-                if isinstance(note.get("timestamp"), str):
-                    note["timestamp"] = datetime.fromisoformat(note["timestamp"])
-                return NotebookEntry(**note)
+                return NotebookEntry.model_validate(note)
             except Exception as e:
-                print(f"Error parsing entry: {e}")
+                logger.warning("Error parsing entry", extra={"entry_id": entry_id, "error": str(e)})
                 return None
     return None
 
@@ -74,7 +277,7 @@ def generate_entry_id() -> str:
 
 
 # User storage
-USERS_FILE = STORAGE_DIR / "users.json"
+# USERS_FILE = get_settings().STORAGE_DIR / "users.json"
 
 
 # def load_users() -> List[dict]:
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Settings are read once per process, so point storage somewhere disposable before be is imported
+_tmp = Path(tempfile.mkdtemp(prefix="be-tests-"))
+os.environ.setdefault("STORAGE_DIR", str(_tmp / "storage"))
+os.environ.setdefault("AUDIO_DIR", str(_tmp / "audio"))
+os.environ.setdefault("TTS_WARMUP_ENABLED", "false")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,84 @@
+"""The get/set/TTL/eviction/delete contract, run against every cache backend."""
+import asyncio
+
+import pytest
+
+from be.cache import MemoryBackend, RedisBackend, SQLiteBackend
+
+MAX_ENTRIES = 3
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        backend = MemoryBackend(MAX_ENTRIES)
+    elif request.param == "sqlite":
+        backend = SQLiteBackend(tmp_path / "cache.sqlite3", MAX_ENTRIES)
+        # Enforce the bound and refresh access times on every call, so the test doesn't depend on timing
+        backend.EVICT_EVERY = 1
+        backend.ACCESS_REFRESH_SECONDS = 0
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        import redis.asyncio
+
+        monkeypatch.setattr(redis.asyncio, "from_url", lambda url: fakeredis.FakeAsyncRedis())
+        backend = RedisBackend("redis://test", MAX_ENTRIES)
+    yield backend
+    asyncio.run(backend.close())
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_set_get_and_overwrite(backend):
+    async def scenario():
+        assert await backend.get("ns:a") is None
+        await backend.set("ns:a", b"1")
+        assert await backend.get("ns:a") == b"1"
+        await backend.set("ns:a", b"2")
+        assert await backend.get("ns:a") == b"2"
+
+    run(scenario())
+
+
+def test_delete(backend):
+    async def scenario():
+        await backend.set("ns:a", b"1")
+        await backend.delete("ns:a")
+        assert await backend.get("ns:a") is None
+        await backend.delete("ns:missing")
+
+    run(scenario())
+
+
+def test_ttl_expires_and_counts_as_expiration(backend):
+    async def scenario():
+        await backend.set("ns:short", b"1", ttl=0.05)
+        await backend.set("ns:long", b"2", ttl=60)
+        await asyncio.sleep(0.1)
+        assert await backend.get("ns:short") is None
+        assert await backend.get("ns:long") == b"2"
+        assert backend.expirations == 1
+        assert backend.evictions == 0
+
+    run(scenario())
+
+
+def test_evicts_least_recently_used_beyond_max_entries(backend):
+    async def scenario():
+        for key in ("ns:a", "ns:b", "ns:c"):
+            await backend.set(key, b"x")
+            await asyncio.sleep(0.01)
+        # Reading a makes b the least recently used
+        assert await backend.get("ns:a") == b"x"
+        await asyncio.sleep(0.01)
+        await backend.set("ns:d", b"x")
+
+        assert await backend.get("ns:b") is None
+        for key in ("ns:a", "ns:c", "ns:d"):
+            assert await backend.get(key) == b"x"
+        assert backend.evictions == 1
+        assert backend.expirations == 0
+
+    run(scenario())
@@ -0,0 +1,44 @@
+import asyncio
+
+from be.services import chat_session_service as chat
+
+
+def test_summary_written_during_a_turn_is_kept(monkeypatch):
+    monkeypatch.setattr(chat.get_settings(), "CHAT_SESSION_VERBATIM_TURNS", 2)
+    summary_started = asyncio.Event()
+    finish_summary = asyncio.Event()
+    folded_counts = []
+
+    async def summarize(summary, turns, practice_language, native_language):
+        folded_counts.append(len(turns))
+        summary_started.set()
+        await finish_summary.wait()
+        return f"{summary}+{len(turns)}"
+
+    monkeypatch.setattr(chat, "summarize", summarize)
+
+    async def scenario():
+        session = chat.new_session("en", "en", None)
+        for i in range(3):
+            await chat.record_turn(await chat.load_session(session["id"]) or session, f"u{i}", f"a{i}")
+        await summary_started.wait()
+
+        # A request loads the session, then the summary lands while it is still running
+        stale = await chat.load_session(session["id"])
+        finish_summary.set()
+        await chat.wait_for_summaries()
+        await chat.record_turn(stale, "u3", "a3")
+
+        stored = await chat.load_session(session["id"])
+        assert stored["summary"] == "+1"
+        assert stored["summarized_turns"] == 1
+        assert [turn["user"] for turn in stored["turns"]] == ["u1", "u2", "u3"]
+
+        # The next summary folds only the turns added since
+        await chat.wait_for_summaries()
+        stored = await chat.load_session(session["id"])
+        assert folded_counts == [1, 1]
+        assert stored["summary"] == "+1+1"
+        assert [turn["user"] for turn in stored["turns"]] == ["u2", "u3"]
+
+    asyncio.run(scenario())
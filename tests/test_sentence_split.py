@@ -0,0 +1,21 @@
+import pytest
+
+from be.services.analyze_service import split_sentences
+
+
+@pytest.mark.parametrize("text, language, expected", [
+    ("I met Mr. Smith yesterday. It was fun!", "en", ["I met Mr. Smith yesterday.", "It was fun!"]),
+    ("Buy fruit, e.g. apples. Then go home.", "en", ["Buy fruit, e.g. apples.", "Then go home."]),
+    ("J. R. R. Tolkien wrote it. I read it.", "en", ["J. R. R. Tolkien wrote it.", "I read it."]),
+    ("Ich sah z.B. einen Hund. Er war groß.", "de", ["Ich sah z.B. einen Hund.", "Er war groß."]),
+    ("Hola Sr. Pérez. ¿Qué tal?", "es", ["Hola Sr. Pérez.", "¿Qué tal?"]),
+    ("I went home. Then I slept.", "en", ["I went home.", "Then I slept."])
+])
+def test_abbreviations_and_initials_do_not_end_a_sentence(text, language, expected):
+    pieces = split_sentences(text, language)
+    assert [sentence for sentence, _ in pieces] == expected
+    assert "".join(sentence + space for sentence, space in pieces) == text
+
+
+def test_line_break_after_an_abbreviation_still_ends_the_sentence():
+    assert [sentence for sentence, _ in split_sentences("Dear Mr.\nThanks.")] == ["Dear Mr.", "Thanks."]